@@ -0,0 +1,73 @@
+"""
+Latency of type-ahead queries, prefix index against the ILIKE search.
+
+A synthetic address book of one User is seeded into a throwaway SQLite
+database. Every query is run through ContactRepository.search_contact, which
+scans four columns with ILIKE, and through the in-memory prefix index that
+serves the autocomplete endpoint, built from the same rows.
+
+    python -m benchmarks.bench_autocomplete --contacts 100000 --iterations 200
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import select
+
+from src.database.db import DatabaseSessionManager
+from src.database.models import Base, User
+from src.repository.contacts import ContactRepository
+from src.services.autocomplete import PrefixIndex
+from src.services.seed import SeedService, SyntheticDataGenerator
+
+QUERIES = ("o", "ole", "olena r", "kovalenko", "050", "+38067", "zz")
+
+
+async def timed(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def run(contacts: int, iterations: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = DatabaseSessionManager(
+            f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        )
+        async with manager.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        generator = SyntheticDataGenerator(seed=1, users=1, contacts=contacts)
+        await SeedService(manager).seed(generator)
+        async with manager.session() as db:
+            user = (await db.execute(select(User))).scalar_one()
+            repository = ContactRepository(db)
+            start = time.perf_counter()
+            index = PrefixIndex.build(await repository.get_autocomplete_rows(user))
+            build = time.perf_counter() - start
+            print(f"index of {contacts} contacts built in {build * 1000:.0f} ms")
+
+            print(f"{'query':<12}{'ILIKE us':>12}{'index us':>12}")
+            for q in QUERIES:
+
+                async def ilike():
+                    await repository.search_contact(q, 0, 10, user)
+
+                async def prefix():
+                    index.search(q, 10)
+
+                before = await timed(ilike, max(iterations // 10, 1))
+                after = await timed(prefix, iterations)
+                print(f"{q:<12}{before:>12.1f}{after:>12.1f}")
+        await manager.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--contacts", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.contacts, args.iterations))
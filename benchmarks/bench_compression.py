@@ -0,0 +1,64 @@
+"""
+Bytes on the wire against CPU time for every available response encoding.
+
+Payloads are contact pages of a few sizes built from the synthetic data
+generator and serialized the way the API returns them. Each encoding is
+run at its levels with a fresh compressor per payload, as the compression
+middleware does.
+
+    python -m benchmarks.bench_compression --iterations 200
+"""
+
+import argparse
+import json
+import time
+from datetime import date
+
+from src.services.compression import ENCODERS
+from src.services.seed import SyntheticDataGenerator
+
+PAGE_SIZES = (10, 100, 1000)
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 5, 11), "zstd": (1, 3, 19)}
+
+
+def payload(size: int) -> bytes:
+    generator = SyntheticDataGenerator(seed=1, users=1, contacts=size)
+    page = [
+        {"id": index + 1, **contact}
+        for index, (_, contact) in enumerate(generator.contacts(date(2024, 1, 1)))
+    ]
+    for contact in page:
+        del contact["phone_normalized"], contact["email_normalized"]
+    return json.dumps(page, default=str).encode()
+
+
+def compress(encoder_class, level: int, body: bytes) -> bytes:
+    encoder = encoder_class(level)
+    return encoder.compress(body) + encoder.finish()
+
+
+def run(iterations: int) -> None:
+    print(
+        f"{'payload':>8}{'encoding':>10}{'level':>7}{'bytes':>10}{'ratio':>8}{'us':>10}"
+    )
+    for size in PAGE_SIZES:
+        body = payload(size)
+        print(f"{size:>8}{'identity':>10}{'-':>7}{len(body):>10}{1:>8.2f}{0:>10.1f}")
+        for name, (encoder_class, _) in ENCODERS.items():
+            for level in LEVELS[name]:
+                compressed = compress(encoder_class, level, body)
+                start = time.process_time()
+                for _ in range(iterations):
+                    compress(encoder_class, level, body)
+                cpu = (time.process_time() - start) / iterations * 1e6
+                ratio = len(body) / len(compressed)
+                print(
+                    f"{size:>8}{name:>10}{level:>7}{len(compressed):>10}"
+                    f"{ratio:>8.2f}{cpu:>10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    run(parser.parse_args().iterations)
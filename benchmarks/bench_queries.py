@@ -0,0 +1,112 @@
+"""
+Microbenchmark of the per-query Python overhead of hot repository lookups.
+
+Each lookup is run against a throwaway SQLite database, once with the
+statement rebuilt on every call (as the repositories used to do) and once
+through the repository with its prebuilt statement. SQLite round trips are
+cheap, so the difference is dominated by statement construction and cache
+key generation.
+
+    python -m benchmarks.bench_queries --iterations 2000
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import select
+
+from src.database.db import DatabaseSessionManager
+from src.database.models import Base, Contact, User
+from src.repository.contacts import ContactRepository
+from src.repository.users import UserRepository
+
+
+async def timed(fn, iterations: int) -> float:
+    for _ in range(min(iterations, 100)):
+        await fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def run(iterations: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = DatabaseSessionManager(
+            f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        )
+        async with manager.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with manager.session() as db:
+            user = User(
+                username="bench", email="bench@example.com", hashed_password="x"
+            )
+            db.add(user)
+            await db.flush()
+            db.add_all(
+                Contact(
+                    name=f"Name{i}",
+                    surname="Surname",
+                    email=f"contact{i}@example.com",
+                    phone=f"050{i:07d}",
+                    user_id=user.id,
+                )
+                for i in range(100)
+            )
+            await db.commit()
+
+            contacts = ContactRepository(db)
+            users = UserRepository(db)
+
+            async def rebuilt_contact_by_id():
+                stmt = select(Contact).filter_by(
+                    id=50, user_id=user.id, deleted_at=None
+                )
+                (await db.execute(stmt)).scalar_one_or_none()
+
+            async def rebuilt_contacts():
+                stmt = (
+                    select(Contact)
+                    .filter_by(user_id=user.id, deleted_at=None)
+                    .offset(0)
+                    .limit(20)
+                )
+                (await db.execute(stmt)).scalars().all()
+
+            async def rebuilt_user_by_username():
+                stmt = select(User).filter_by(username="bench", deleted_at=None)
+                (await db.execute(stmt)).scalar_one_or_none()
+
+            cases = [
+                (
+                    "get_contact_by_id",
+                    rebuilt_contact_by_id,
+                    lambda: contacts.get_contact_by_id(50, user),
+                ),
+                (
+                    "get_contacts",
+                    rebuilt_contacts,
+                    lambda: contacts.get_contacts(0, 20, user),
+                ),
+                (
+                    "get_user_by_username",
+                    rebuilt_user_by_username,
+                    lambda: users.get_user_by_username("bench"),
+                ),
+            ]
+            print(f"{'query':<24}{'rebuilt us':>12}{'prebuilt us':>13}{'saved':>8}")
+            for name, rebuilt, prebuilt in cases:
+                before = await timed(rebuilt, iterations)
+                after = await timed(prebuilt, iterations)
+                saved = (before - after) / before * 100
+                print(f"{name:<24}{before:>12.1f}{after:>13.1f}{saved:>7.1f}%")
+        await manager.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    asyncio.run(run(parser.parse_args().iterations))
@@ -0,0 +1,128 @@
+"""
+Benchmark of concurrent reads and writes against an embedded SQLite database.
+
+The same mixed workload is run against a throwaway database file, once with
+the default engine (rollback journal, one shared pool for everything) and
+once in the tuned SQLite mode (WAL and pragmas, a read-only pool and a single
+serialized writer). Readers page through Contacts, writers create them.
+
+    python -m benchmarks.bench_sqlite --seconds 5 --readers 16 --writers 4
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from src.database.db import DatabaseSessionManager
+from src.database.models import Base, Contact, User
+from src.repository.contacts import ContactRepository
+from src.schemas.contacts import ContactBase
+
+
+async def make_manager(path: Path, sqlite_tuned: bool) -> DatabaseSessionManager:
+    manager = DatabaseSessionManager(
+        f"sqlite+aiosqlite:///{path}", sqlite_tuned=sqlite_tuned
+    )
+    async with manager.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with manager.session() as db:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        db.add_all(
+            Contact(
+                name=f"Name{i}",
+                surname="Surname",
+                email=f"contact{i}@example.com",
+                phone=f"050{i:07d}",
+                user_id=user.id,
+            )
+            for i in range(1000)
+        )
+        await db.commit()
+    return manager
+
+
+async def workload(
+    manager: DatabaseSessionManager, seconds: float, readers: int, writers: int
+) -> dict:
+    async with manager.session() as db:
+        user = (await db.execute(select(User))).scalar_one()
+    deadline = time.perf_counter() + seconds
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    write_latencies = []
+    sequence = iter(range(1_000_000))
+
+    async def read() -> None:
+        while time.perf_counter() < deadline:
+            try:
+                async with manager.session() as db:
+                    await ContactRepository(db).get_contacts(
+                        random.randrange(0, 1000, 20), 20, user
+                    )
+                counts["reads"] += 1
+            except OperationalError:
+                counts["errors"] += 1
+
+    async def write() -> None:
+        while time.perf_counter() < deadline:
+            i = next(sequence)
+            body = ContactBase(
+                name=f"Writer{i}",
+                surname="Surname",
+                email=f"writer{i}@example.com",
+                phone=f"067{i:07d}",
+                birthday=date(1990, 1 + i % 12, 1),
+                additional_data="",
+            )
+            start = time.perf_counter()
+            try:
+                async with manager.session() as db:
+                    await ContactRepository(db).create_contact(body, user)
+                counts["writes"] += 1
+                write_latencies.append(time.perf_counter() - start)
+            except OperationalError:
+                counts["errors"] += 1
+
+    await asyncio.gather(
+        *(read() for _ in range(readers)), *(write() for _ in range(writers))
+    )
+    write_latencies.sort()
+    counts["write_p95_ms"] = (
+        write_latencies[int(len(write_latencies) * 0.95)] * 1000
+        if write_latencies
+        else 0.0
+    )
+    return counts
+
+
+async def run(seconds: float, readers: int, writers: int) -> None:
+    print(
+        f"{'mode':<10}{'reads/s':>10}{'writes/s':>10}{'write p95 ms':>14}{'errors':>8}"
+    )
+    for name, sqlite_tuned in (("default", False), ("tuned", True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = await make_manager(Path(tmp) / "bench.db", sqlite_tuned)
+            result = await workload(manager, seconds, readers, writers)
+            await manager.dispose()
+        print(
+            f"{name:<10}{result['reads'] / seconds:>10.0f}"
+            f"{result['writes'] / seconds:>10.0f}"
+            f"{result['write_p95_ms']:>14.1f}{result['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(args.seconds, args.readers, args.writers))
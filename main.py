@@ -1,12 +1,60 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI, Request
 from slowapi.errors import RateLimitExceeded
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from starlette.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from src.conf import messages
-from src.api import contacts, utils, auth, users
+from src.conf.config import settings
+from src.database.db import sessionmanager
+from src.api import contacts, utils, auth, users, batch, profiles
+from src.services.birthdays import birthday_digest_scheduler, refresh_birthday_digest
+from src.services.cache import RedisCacheBackend, backend as cache_backend
+from src.services.events import broker, RedisContactEventBroker
+from src.services.health import prober
+from src.services import idempotency
+from src.services.admission import AdaptiveLimiter, AdmissionMiddleware
+from src.services.compression import CompressionGovernor, CompressionMiddleware
+from src.services.log import AccessLogMiddleware, setup_logging
+from src.services.profiling import ProfilingMiddleware, store
+from src.services.purge import purge_scheduler
+from src.services.tracing import TracingMiddleware, instrument_engine, tracer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener = setup_logging(settings.LOG_LEVEL)
+    tasks = [asyncio.create_task(refresh_birthday_digest())]
+    if settings.BIRTHDAY_DIGEST_HOUR is not None:
+        tasks.append(
+            asyncio.create_task(
+                birthday_digest_scheduler(settings.BIRTHDAY_DIGEST_HOUR)
+            )
+        )
+    if settings.PURGE_INTERVAL_SECONDS is not None:
+        tasks.append(
+            asyncio.create_task(purge_scheduler(settings.PURGE_INTERVAL_SECONDS))
+        )
+    if isinstance(broker, RedisContactEventBroker):
+        tasks.append(asyncio.create_task(broker.listen()))
+    if isinstance(cache_backend, RedisCacheBackend):
+        tasks.append(asyncio.create_task(cache_backend.listen()))
+    if settings.HEALTH_PROBE_INTERVAL_SECONDS:
+        tasks.append(
+            asyncio.create_task(prober.run(settings.HEALTH_PROBE_INTERVAL_SECONDS))
+        )
+    yield
+    for task in tasks:
+        task.cancel()
+    if tracer is not None:
+        tracer.flush()
+    log_listener.stop()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["<http://localhost:8000>"]
 app.add_middleware(
@@ -15,6 +63,56 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Total-Count",
+        "X-Total-Count-Exact",
+        "X-Profile-Id",
+        "Idempotent-Replayed",
+        "X-Request-ID",
+    ],
+)
+app.add_middleware(
+    idempotency.IdempotencyMiddleware,
+    store=idempotency.store,
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+    lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS,
+    wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+)
+if settings.PROFILE_DIR:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=store,
+        sample_rate=settings.PROFILE_SAMPLE_RATE,
+        interval=settings.PROFILE_INTERVAL_SECONDS,
+    )
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(
+        AdmissionMiddleware,
+        limiter=AdaptiveLimiter(
+            settings.ADMISSION_INITIAL_LIMIT,
+            settings.ADMISSION_MIN_LIMIT,
+            settings.ADMISSION_MAX_LIMIT,
+            settings.ADMISSION_LATENCY_TOLERANCE,
+            settings.ADMISSION_WINDOW_SECONDS,
+        ),
+        retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+    )
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        min_size=settings.COMPRESSION_MIN_SIZE,
+        governor=CompressionGovernor(
+            settings.COMPRESSION_CPU_HIGH, settings.COMPRESSION_CPU_CRITICAL
+        ),
+    )
+if tracer is not None:
+    for engine in [sessionmanager.engine, *sessionmanager.shard_engines]:
+        instrument_engine(engine)
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+app.add_middleware(
+    AccessLogMiddleware,
+    sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+    slow_seconds=settings.ACCESS_LOG_SLOW_SECONDS,
 )
 
 
@@ -26,11 +124,35 @@ async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
     )
 
 
+def overloaded_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": messages.SERVICE_OVERLOADED},
+        headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+    )
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return overloaded_response()
+
+
+@app.exception_handler(DBAPIError)
+async def statement_timeout_handler(request: Request, exc: DBAPIError):
+    # 57014 is query_canceled, raised when statement_timeout is exceeded
+    if getattr(exc.orig, "sqlstate", None) == "57014":
+        return overloaded_response()
+    raise exc
+
+
 app.include_router(utils.router, prefix="/api")
 app.include_router(contacts.router, prefix="/api")
 app.include_router(auth.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
+app.include_router(batch.router, prefix="/api")
+app.include_router(profiles.router, prefix="/api")
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
+    # Requests are logged by AccessLogMiddleware, with sampling
+    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True, access_log=False)
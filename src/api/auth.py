@@ -7,8 +7,9 @@ from src.services.users import UserService
 from src.database.db import get_db
 from src.conf import messages
 from src.services.email import send_email
+from src.services.tracing import TracedRoute
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=TracedRoute)
 
 
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
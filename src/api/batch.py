@@ -0,0 +1,39 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf import messages
+from src.conf.config import settings
+from src.database.db import get_db
+from src.database.models import User
+from src.schemas.batch import BatchItemResponse, BatchRequest
+from src.services.auth import get_current_user
+from src.services.batch import BatchService, is_batchable
+from src.services.tracing import TracedRoute
+
+router = APIRouter(prefix="/batch", tags=["batch"], route_class=TracedRoute)
+
+
+@router.post(
+    "/", response_model=List[BatchItemResponse], status_code=status.HTTP_200_OK
+)
+async def batch(
+    body: BatchRequest,
+    request: Request,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if len(body.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=messages.BATCH_TOO_LARGE,
+        )
+    for item in body.requests:
+        if not is_batchable(item.path):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=messages.BATCH_PATH_NOT_ALLOWED,
+            )
+    batch_service = BatchService(request.app, request.scope, db, user)
+    return await batch_service.run(body.requests)
@@ -1,29 +1,81 @@
-from typing import List
+from typing import List, Tuple
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf.config import settings
 from src.database.db import get_db
 from src.database.models import User
-from src.schemas.contacts import ContactBase, ContactResponse, ContactBirthdayRequest
+from src.schemas.contacts import (
+    CONTACT_FIELDS,
+    ContactBase,
+    ContactChanges,
+    ContactResponse,
+    ContactBirthdayRequest,
+    ContactStatistics,
+    ContactSuggestion,
+    ContactMergeRequest,
+    DuplicateGroup,
+    SyncToken,
+    contact_fields_adapter,
+)
 from src.services.auth import get_current_user
 from src.services.contacts import ContactService
+from src.services.events import broker
+from src.services.tracing import TracedRoute
 
 from src.conf import messages
 
-router = APIRouter(prefix="/contacts", tags=["contacts"])
+router = APIRouter(prefix="/contacts", tags=["contacts"], route_class=TracedRoute)
+
+
+def set_total_count(response: Response, total: int, bound: int | None = None):
+    exact = bound is None or total <= bound
+    response.headers["X-Total-Count"] = str(total if exact else bound)
+    response.headers["X-Total-Count-Exact"] = "true" if exact else "false"
+
+
+def contact_fields(fields: str | None = None) -> Tuple[str, ...] | None:
+    if fields is None:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(CONTACT_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{messages.UNKNOWN_CONTACT_FIELDS}: {', '.join(sorted(unknown))}",
+        )
+    requested.add("id")
+    return tuple(field for field in CONTACT_FIELDS if field in requested)
+
+
+def render_contacts(contacts, fields, response: Response, many: bool = True):
+    if fields is None:
+        return contacts
+    adapter = contact_fields_adapter(fields, many)
+    return Response(
+        adapter.dump_json(adapter.validate_python(contacts)),
+        media_type="application/json",
+        headers=response.headers,
+    )
 
 
 @router.get("/", response_model=List[ContactResponse], status_code=status.HTTP_200_OK)
 async def read_contacts(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    count: bool = False,
+    fields: Tuple[str, ...] | None = Depends(contact_fields),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     contact_service = ContactService(db)
-    contacts = await contact_service.get_contacts(skip, limit, user)
-    return contacts
+    contacts = await contact_service.get_contacts(skip, limit, user, fields)
+    if count:
+        set_total_count(response, await contact_service.count_contacts(user))
+    return render_contacts(contacts, fields, response)
 
 
 @router.get(
@@ -31,18 +83,131 @@ async def read_contacts(
 )
 async def search_contact(
     q: str,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    count: bool = False,
+    fields: Tuple[str, ...] | None = Depends(contact_fields),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     contact_service = ContactService(db)
-    contacts = await contact_service.search_contact(q, skip, limit, user)
+    contacts = await contact_service.search_contact(q, skip, limit, user, fields)
     if contacts is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=messages.CONTACT_NOT_FOUND
         )
-    return contacts
+    if count:
+        bound = settings.CONTACTS_COUNT_BOUND
+        total = await contact_service.count_search(q, user, bound)
+        set_total_count(response, total, bound)
+    return render_contacts(contacts, fields, response)
+
+
+@router.get(
+    "/autocomplete",
+    response_model=List[ContactSuggestion],
+    status_code=status.HTTP_200_OK,
+)
+async def autocomplete_contacts(
+    q: str,
+    limit: int = 10,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    contact_service = ContactService(db)
+    return await contact_service.autocomplete(q, limit, user)
+
+
+@router.get(
+    "/lookup", response_model=List[ContactResponse], status_code=status.HTTP_200_OK
+)
+async def lookup_contacts(
+    response: Response,
+    phone: str | None = None,
+    email: str | None = None,
+    fields: Tuple[str, ...] | None = Depends(contact_fields),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if phone is None and email is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=messages.LOOKUP_VALUE_REQUIRED,
+        )
+    contact_service = ContactService(db)
+    contacts = await contact_service.lookup_contacts(user, phone, email, fields)
+    return render_contacts(contacts, fields, response)
+
+
+@router.get("/stats", response_model=ContactStatistics, status_code=status.HTTP_200_OK)
+async def read_stats(
+    user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+):
+    contact_service = ContactService(db)
+    return await contact_service.get_stats(user)
+
+
+@router.get(
+    "/duplicates", response_model=List[DuplicateGroup], status_code=status.HTTP_200_OK
+)
+async def read_duplicates(
+    limit: int = 100,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    contact_service = ContactService(db)
+    return await contact_service.find_duplicates(user, limit)
+
+
+@router.get("/changes", response_model=ContactChanges, status_code=status.HTTP_200_OK)
+async def read_changes(
+    since: str | None = None,
+    limit: int = 100,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        token = SyncToken.decode(since) if since else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=messages.WRONG_SYNC_TOKEN,
+        )
+    contact_service = ContactService(db)
+    changes = await contact_service.get_changes(
+        user,
+        token,
+        settings.SYNC_SAFETY_LAG_SECONDS,
+        limit,
+        settings.TOMBSTONE_RETENTION_DAYS,
+    )
+    if changes is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE, detail=messages.SYNC_TOKEN_EXPIRED
+        )
+    contacts, deletions, token, has_more = changes
+    return {
+        "upserts": contacts,
+        "deletions": deletions,
+        "next": token.encode(),
+        "has_more": has_more,
+    }
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def contact_events(
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    user_id = user.id
+    # Give the connection back to the pool instead of holding it while streaming
+    await db.close()
+    return StreamingResponse(
+        broker.stream(user_id, settings.EVENTS_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get(
@@ -50,16 +215,18 @@ async def search_contact(
 )
 async def read_contact(
     contact_id: int,
+    response: Response,
+    fields: Tuple[str, ...] | None = Depends(contact_fields),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     contact_service = ContactService(db)
-    contact = await contact_service.get_contact(contact_id, user)
+    contact = await contact_service.get_contact(contact_id, user, fields)
     if contact is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=messages.CONTACT_NOT_FOUND
         )
-    return contact
+    return render_contacts(contact, fields, response, many=False)
 
 
 @router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED)
@@ -88,6 +255,22 @@ async def update_contact(
     return contact
 
 
+@router.post("/{contact_id}/merge", response_model=ContactResponse)
+async def merge_contacts(
+    body: ContactMergeRequest,
+    contact_id: int,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    contact_service = ContactService(db)
+    contact = await contact_service.merge_contacts(contact_id, body.duplicate_ids, user)
+    if contact is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=messages.CONTACT_NOT_FOUND
+        )
+    return contact
+
+
 @router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_contact(
     contact_id: int,
@@ -108,11 +291,18 @@ async def delete_contact(
 )
 async def get_birthdays(
     body: ContactBirthdayRequest,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    count: bool = False,
+    fields: Tuple[str, ...] | None = Depends(contact_fields),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     contact_service = ContactService(db)
-    contacts = await contact_service.get_birthdays(body.days, skip, limit, user)
-    return contacts
+    contacts = await contact_service.get_birthdays(body.days, skip, limit, user, fields)
+    if count:
+        bound = settings.CONTACTS_COUNT_BOUND
+        total = await contact_service.count_birthdays(body.days, user, bound)
+        set_total_count(response, total, bound)
+    return render_contacts(contacts, fields, response)
@@ -0,0 +1,30 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from src.conf import messages
+from src.services.auth import require_admin
+from src.services.profiling import store
+from src.services.tracing import TracedRoute
+
+router = APIRouter(prefix="/profiles", tags=["profiles"], route_class=TracedRoute)
+
+
+@router.get("/", response_model=List[dict], dependencies=[Depends(require_admin)])
+async def list_profiles():
+    return store.list()
+
+
+@router.get(
+    "/{profile_id}",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_admin)],
+)
+async def get_profile(profile_id: str):
+    profile = store.load(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=messages.PROFILE_NOT_FOUND
+        )
+    return profile
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.db import get_db
 from src.schemas.users import User
 from src.services.auth import get_current_user
+from src.services.tracing import TracedRoute
+from src.services.users import UserService
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=TracedRoute)
 limiter = Limiter(key_func=get_remote_address)
 
 
@@ -15,3 +20,13 @@ async def me(
     user: User = Depends(get_current_user),
 ):
     return user
+
+
+@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_me(
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    user_service = UserService(db)
+    await user_service.delete_user(user)
+    return
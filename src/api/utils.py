@@ -1,11 +1,21 @@
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 from src.database.db import get_db
 from src.conf import messages
+from src.conf.config import settings
+from src.services.auth import require_admin
+from src.services.cache import contact_cache
+from src.services.health import prober
+from src.services.tracing import TracedRoute
+
+logger = logging.getLogger(__name__)
 
-router = APIRouter(tags=["utils"])
+router = APIRouter(tags=["utils"], route_class=TracedRoute)
 
 @router.get("/healthchecker")
 async def healthchecker(db: AsyncSession = Depends(get_db)):
@@ -19,9 +29,33 @@ async def healthchecker(db: AsyncSession = Depends(get_db)):
                 detail=messages.SERVER_CONFIG_ERROR,
             )
         return {"message": "Welcome to FastAPI!"}
-    except Exception as e:
-        print(e)
+    except Exception:
+        logger.exception("Database health check failed")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=messages.SERVER_CONNECTION_ERROR,
         )
+
+
+@router.get("/cache/stats", dependencies=[Depends(require_admin)])
+async def cache_stats():
+    return contact_cache.stats() if contact_cache is not None else {}
+
+
+@router.get("/health/live")
+async def liveness():
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    state = prober.readiness(
+        max_age=settings.HEALTH_PROBE_INTERVAL_SECONDS * 3,
+        max_saturation=settings.HEALTH_MAX_POOL_SATURATION,
+    )
+    status_code = (
+        status.HTTP_200_OK
+        if state["status"] == "ready"
+        else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    return JSONResponse(state, status_code=status_code)
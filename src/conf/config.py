@@ -1,14 +1,27 @@
 from pathlib import Path
 
-from pydantic import ConfigDict, EmailStr
+from pydantic import ConfigDict, EmailStr, model_validator
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     DB_URL: str
+    CONTACT_SHARD_URLS: list[str] = []
+    CONTACT_ID_BLOCK_SIZE: int = 1000
+    DB_POOL_TIMEOUT_SECONDS: float = 5
+    DB_STATEMENT_TIMEOUT_MS: int | None = 5000
+    DB_COMPILED_CACHE_SIZE: int = 500
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    SQLITE_TUNED: bool = True
+    SQLITE_READ_POOL_SIZE: int = 8
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_SECONDS: int = 3600
+    # Sent as X-Admin-Token to the profiling and cache statistics endpoints
+    ADMIN_TOKEN: str | None = None
 
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
@@ -21,9 +34,98 @@ class Settings(BaseSettings):
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
     TEMPLATE_FOLDER: Path = Path(__file__).parent.parent / "services" / "templates"
+
+    BIRTHDAY_DIGEST_HOUR: int | None = None
+    BIRTHDAY_DIGEST_EMAILS: bool = False
+    BIRTHDAY_DIGEST_DAYS: int = 7
+
+    CONTACTS_COUNT_BOUND: int = 1000
+    DEFAULT_PHONE_COUNTRY_CODE: str = "380"
+    # Rows are stamped when written but seen when committed, at most a statement
+    # timeout later, so the lag may not be shorter than DB_STATEMENT_TIMEOUT_MS
+    SYNC_SAFETY_LAG_SECONDS: int = 10
+    TOMBSTONE_RETENTION_DAYS: int = 30
+
+    PURGE_INTERVAL_SECONDS: int | None = None
+    PURGE_CHUNK_SIZE: int = 500
+    PURGE_PAUSE_SECONDS: float = 0.5
+
+    EVENTS_REDIS_URL: str | None = None
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_HEARTBEAT_SECONDS: float = 15
+
+    BATCH_MAX_REQUESTS: int = 20
+
+    PROFILE_DIR: str | None = None
+    # Deprecated, used when ADMIN_TOKEN is not set
+    PROFILE_ADMIN_TOKEN: str | None = None
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL_SECONDS: float = 0.005
+    PROFILE_MAX_FILES: int = 100
+
+    IDEMPOTENCY_REDIS_URL: str | None = None
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_SECONDS: int = 30
+    IDEMPOTENCY_WAIT_SECONDS: float = 10
+
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_INITIAL_LIMIT: int = 20
+    ADMISSION_MIN_LIMIT: int = 4
+    ADMISSION_MAX_LIMIT: int = 200
+    # Latency, relative to the fastest seen, that cuts the limit
+    ADMISSION_LATENCY_TOLERANCE: float = 2.0
+    ADMISSION_WINDOW_SECONDS: float = 1.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+
+    CONTACT_CACHE_ENABLED: bool = True
+    CONTACT_CACHE_REDIS_URL: str | None = None
+    CONTACT_CACHE_SIZE: int = 10000
+    CONTACT_CACHE_LOCAL_TTL_SECONDS: float = 5
+    CONTACT_CACHE_TTL_SECONDS: float = 300
+    CONTACT_CACHE_TOMBSTONE_SECONDS: float = 30
+    AUTOCOMPLETE_MAX_TERMS: int = 1_000_000
+    AUTOCOMPLETE_TTL_SECONDS: float = 300
+
+    HEALTH_PROBE_INTERVAL_SECONDS: float = 5
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 2
+    HEALTH_CHECK_SMTP: bool = True
+    HEALTH_MAX_POOL_SATURATION: float = 0.9
+
+    DUPLICATES_MIN_SCORE: float = 0.6
+    DUPLICATES_MAX_BLOCK_SIZE: int = 200
+
+    LOG_LEVEL: str = "INFO"
+    ACCESS_LOG_SAMPLE_RATE: float = 0.1
+    ACCESS_LOG_SLOW_SECONDS: float = 1
+
+    # "otlp", "file" or None to disable tracing
+    TRACING_EXPORTER: str | None = None
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318"
+    TRACING_FILE: str = "spans.jsonl"
+    TRACING_SERVICE_NAME: str = "contacts-api"
+    TRACING_SAMPLE_RATE: float = 0.01
+    TRACING_BATCH_SIZE: int = 512
+    TRACING_FLUSH_SECONDS: float = 5
+
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_CPU_HIGH: float = 0.7
+    COMPRESSION_CPU_CRITICAL: float = 0.9
     model_config = ConfigDict(
         extra="ignore", env_file=".env", env_file_encoding="utf-8", case_sensitive=True
     )
 
+    @model_validator(mode="after")
+    def check_sync_safety_lag(self) -> "Settings":
+        if (
+            self.DB_STATEMENT_TIMEOUT_MS
+            and self.SYNC_SAFETY_LAG_SECONDS * 1000 < self.DB_STATEMENT_TIMEOUT_MS
+        ):
+            raise ValueError(
+                "SYNC_SAFETY_LAG_SECONDS must not be shorter than "
+                "DB_STATEMENT_TIMEOUT_MS"
+            )
+        return self
+
 
 settings = Settings()
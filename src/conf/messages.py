@@ -10,3 +10,13 @@ EMAIL_ALREADY_CONFIRMED = "Email was already confirmed"
 EMAIL_CHECK = "Check your email for confirmation"
 WRONG_TOKEN = "Wrong token for email check"
 REQUEST_LIMIT_EXCEEDED = "Request limit exceeded. Try again later"
+UNKNOWN_CONTACT_FIELDS = "Unknown contact fields requested"
+WRONG_SYNC_TOKEN = "Wrong sync token"
+SYNC_TOKEN_EXPIRED = "Sync token expired, a full sync is required"
+LOOKUP_VALUE_REQUIRED = "Either phone or email is required"
+BATCH_TOO_LARGE = "Too many requests in one batch"
+BATCH_PATH_NOT_ALLOWED = "Path is not allowed in a batch"
+ADMIN_TOKEN_REQUIRED = "Admin token is required"
+PROFILE_NOT_FOUND = "Profile not found"
+IDEMPOTENCY_IN_PROGRESS = "A request with this Idempotency-Key is still in progress"
+SERVICE_OVERLOADED = "Service is overloaded. Try again later"
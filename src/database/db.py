@@ -1,39 +1,423 @@
+import asyncio
 import contextlib
+import zlib
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Sequence, Tuple
 
-from sqlalchemy.exc import SQLAlchemyError
+from fastapi import Request
+from sqlalchemy import select, update, func, cast, event, make_url, DateTime
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
+    AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import Session
 
 from src.conf.config import settings
+from src.database.models import SHARD_METADATA, Base, IdBlock, User, clock_now
+
+
+def engine_options(url: str) -> dict:
+    """
+    Get the engine options configured in settings that apply to a database URL.
+
+    Every engine gets the configured compiled statement cache. PostgreSQL also
+    gets a sized prepared statement cache per connection, a bounded wait for a
+    pooled connection and a per-statement timeout, so that under overload
+    requests fail fast instead of queueing.
+
+    Args:
+        url: The database URL.
+
+    Returns:
+        Keyword arguments for create_async_engine.
+    """
+    options = {"query_cache_size": settings.DB_COMPILED_CACHE_SIZE}
+    if not url.startswith("postgresql"):
+        return options
+    options["pool_timeout"] = settings.DB_POOL_TIMEOUT_SECONDS
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg"):
+        connect_args["prepared_statement_cache_size"] = (
+            settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+        )
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {
+            "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)
+        }
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def is_sqlite_file(url: str) -> bool:
+    """Check whether a database URL is an SQLite database stored in a file."""
+    url = make_url(url)
+    database = url.database or ""
+    return (
+        url.get_backend_name() == "sqlite"
+        and database not in ("", ":memory:")
+        and not database.startswith("file::memory:")
+        and url.query.get("mode") != "memory"
+    )
+
+
+def sqlite_pragmas(read_only: bool = False) -> List[str]:
+    """
+    Get the PRAGMA statements run on every new SQLite connection.
+
+    WAL lets readers run alongside the writer, and with it synchronous=NORMAL
+    only syncs at checkpoints instead of on every commit, which is still safe
+    against corruption. Memory mapping and a larger page cache save copying
+    and re-reading pages, and busy_timeout makes a connection wait for a lock
+    instead of failing with "database is locked".
+
+    Args:
+        read_only: Whether the connection must refuse to write.
+    """
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        # Negative sizes are in KiB rather than pages
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def create_engines(
+    url: str, sqlite_tuned: bool
+) -> Tuple[AsyncEngine, AsyncEngine | None]:
+    """
+    Create the engine of a database URL, and a separate read engine for SQLite.
+
+    In the tuned SQLite mode the returned engine is the single writer: its
+    pool holds one connection, so writers queue for it in the pool instead of
+    contending for the database lock. Reads go through a pool of read-only
+    connections, which WAL lets run while a write is in progress.
+
+    Args:
+        url: The database URL.
+        sqlite_tuned: Whether SQLite file databases use the tuned mode.
+
+    Returns:
+        The engine, and the read engine or None if reads share the engine.
+    """
+    options = engine_options(url)
+    if not (sqlite_tuned and is_sqlite_file(url)):
+        return create_async_engine(url, **options), None
+    options["pool_timeout"] = settings.DB_POOL_TIMEOUT_SECONDS
+    writer = create_async_engine(url, pool_size=1, max_overflow=0, **options)
+    reader = create_async_engine(
+        url, pool_size=settings.SQLITE_READ_POOL_SIZE, max_overflow=0, **options
+    )
+    for engine, read_only in ((writer, False), (reader, True)):
+        pragmas = sqlite_pragmas(read_only)
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def apply_pragmas(dbapi_connection, connection_record, pragmas=pragmas):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return writer, reader
+
+
+class RoutingSession(Session):
+    """
+    A session that sends reads to a read engine and writes to the main one.
+
+    Plain SELECTs go to `read_bind`. Everything else, i.e. flushes, DML,
+    SELECT ... FOR UPDATE and textual statements, goes to the main bind, and
+    so does every statement after it until the transaction ends, so that a
+    transaction reads its own writes and holds the writer until it commits.
+    """
+
+    def __init__(self, *args, read_bind=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_bind = read_bind
+        self.writing = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.read_bind is None or self.writing:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if clause is None and not self._flushing:
+            # Asked for the dialect, or a connection without a statement
+            return self.read_bind
+        if (
+            not self._flushing
+            and getattr(clause, "is_select", False)
+            and getattr(clause, "_for_update_arg", None) is None
+        ):
+            return self.read_bind
+        self.writing = True
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _release_writer(session: RoutingSession, transaction) -> None:
+    if transaction.parent is None:
+        session.writing = False
 
 
 class DatabaseSessionManager:
-    def __init__(self, url: str):
-        self._engine: AsyncEngine | None = create_async_engine(url)
-        self._session_maker: async_sessionmaker = async_sessionmaker(
-            autoflush=False, autocommit=False, bind=self._engine
+    def __init__(
+        self,
+        url: str,
+        shard_urls: Sequence[str] = (),
+        id_block_size: int = 1000,
+        sqlite_tuned: bool = None,
+    ):
+        if sqlite_tuned is None:
+            sqlite_tuned = settings.SQLITE_TUNED
+        self._engine, self._read_engine = create_engines(url, sqlite_tuned)
+        self._session_maker: async_sessionmaker = self._make_session_maker(
+            self._engine, self._read_engine
+        )
+        shards = [create_engines(shard_url, sqlite_tuned) for shard_url in shard_urls]
+        self._shard_engines: List[AsyncEngine] = [engine for engine, _ in shards]
+        self._shard_read_engines: List[AsyncEngine | None] = [
+            read_engine for _, read_engine in shards
+        ]
+        self._shard_makers: List[async_sessionmaker] = [
+            self._make_session_maker(engine, read_engine)
+            for engine, read_engine in shards
+        ]
+        self._id_block_size = id_block_size
+        self._id_blocks: Dict[str, Tuple[int, int]] = {}
+        self._id_lock = asyncio.Lock()
+
+    @staticmethod
+    def _make_session_maker(
+        engine: AsyncEngine, read_engine: AsyncEngine | None = None
+    ) -> async_sessionmaker:
+        if read_engine is None:
+            return async_sessionmaker(
+                autoflush=False, autocommit=False, expire_on_commit=False, bind=engine
+            )
+        return async_sessionmaker(
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False,
+            bind=engine,
+            sync_session_class=RoutingSession,
+            read_bind=read_engine.sync_engine,
         )
 
+    @property
+    def engine(self) -> AsyncEngine:
+        return self._engine
+
+    @property
+    def shard_engines(self) -> List[AsyncEngine]:
+        return self._shard_engines
+
+    @property
+    def pooled_engines(self) -> List[AsyncEngine]:
+        """
+        Get the engines whose pools serve requests, one per database.
+
+        In the tuned SQLite mode that is the read engine, since the writer
+        pool has a single connection that is busy whenever anything writes.
+        """
+        return [
+            read_engine or engine
+            for engine, read_engine in zip(
+                [self._engine, *self._shard_engines],
+                [self._read_engine, *self._shard_read_engines],
+            )
+        ]
+
+    async def dispose(self) -> None:
+        """Close the connections of all engines."""
+        for engine in (
+            self._engine,
+            self._read_engine,
+            *self._shard_engines,
+            *self._shard_read_engines,
+        ):
+            if engine is not None:
+                await engine.dispose()
+
+    @property
+    def shard_count(self) -> int:
+        return len(self._shard_makers)
+
+    def shard_for(self, user: User) -> int:
+        """
+        Get the shard that holds the Contacts of a User.
+
+        Users are placed by a stable hash of their id, unless the rebalancing
+        tool has moved them and recorded their shard on the User row.
+        """
+        if user.contacts_shard is not None:
+            return user.contacts_shard
+        return zlib.crc32(str(user.id).encode()) % self.shard_count
+
+    def shard_session(self, session: AsyncSession, shard: int) -> AsyncSession:
+        """
+        Get a session on a shard, tied to the lifetime of `session`.
+
+        Args:
+            session: A session created by this manager.
+            shard: The index of the shard.
+
+        Returns:
+            The shard session, created on first use and closed together with
+            `session`.
+        """
+        shards = session.info.setdefault("shards", {})
+        if shard not in shards:
+            shards[shard] = self._shard_makers[shard]()
+        return shards[shard]
+
     @contextlib.asynccontextmanager
     async def session(self):
         if self._session_maker is None:
             raise Exception("Database session is not initialized")
-        session = self._session_maker()
+        session = self._session_maker(info={"sessionmanager": self})
         try:
             yield session
         except SQLAlchemyError as e:
             await session.rollback()
+            for shard in session.info.get("shards", {}).values():
+                await shard.rollback()
             raise  # Re-raise the original error
         finally:
+            for shard in session.info.get("shards", {}).values():
+                await shard.close()
             await session.close()
 
+    async def create_shard_schema(self, shard: int) -> None:
+        """Create the tables of a shard that do not exist yet."""
+        async with self._shard_engines[shard].begin() as conn:
+            await conn.run_sync(SHARD_METADATA.create_all)
+
+    def contact_sessions(self, session: AsyncSession) -> List[AsyncSession]:
+        """Get one session per database that holds Contacts."""
+        if not self.shard_count:
+            return [session]
+        return [self.shard_session(session, shard) for shard in range(self.shard_count)]
+
+    async def allocate_id(self, name: str) -> int:
+        """
+        Allocate an id that is unique across all shards.
+
+        Ids are reserved from the main database in blocks, so only one in
+        `id_block_size` calls does a round trip.
+
+        Args:
+            name: The name of the id sequence.
+
+        Returns:
+            The allocated id.
+        """
+        async with self._id_lock:
+            next_value, end = self._id_blocks.get(name, (0, 0))
+            if next_value >= end:
+                async with self._session_maker() as session:
+                    end = await reserve_id_block(
+                        session, name, self._id_block_size, lambda: self.max_id(name)
+                    )
+                next_value = end - self._id_block_size
+            next_value += 1
+            self._id_blocks[name] = (next_value, end)
+            return next_value
+
+    async def max_id(self, name: str) -> int:
+        """Get the greatest id of a table across the main database and all shards."""
+        table = Base.metadata.tables[name]
+        stmt = select(func.coalesce(func.max(table.c.id), 0))
+        max_id = 0
+        for maker in (self._session_maker, *self._shard_makers):
+            async with maker() as session:
+                max_id = max(max_id, (await session.execute(stmt)).scalar_one())
+        return max_id
+
 
-sessionmanager = DatabaseSessionManager(settings.DB_URL)
+async def reserve_id_block(
+    session: AsyncSession,
+    name: str,
+    size: int,
+    start: Callable[[], Awaitable[int]] | None = None,
+) -> int:
+    """
+    Reserve the next `size` ids of a sequence and return the last of them.
 
+    A sequence that doesn't exist yet is created to continue after `start()`,
+    the greatest id already in use, e.g. by rows from before sharding.
+    """
+    stmt = (
+        update(IdBlock)
+        .where(IdBlock.name == name)
+        .values(next_value=IdBlock.next_value + size)
+        .returning(IdBlock.next_value)
+    )
+    end = (await session.execute(stmt)).scalar_one_or_none()
+    if end is None:
+        end = (await start() if start is not None else 0) + size
+        session.add(IdBlock(name=name, next_value=end))
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            return await reserve_id_block(session, name, size)
+        return end
+    await session.commit()
+    return end
+
+
+def shard_session(session: AsyncSession, user: User) -> AsyncSession:
+    """
+    Get the session that holds the Contacts of `user`.
+
+    Without configured shards, or for sessions that were not created by a
+    DatabaseSessionManager, this is `session` itself.
+    """
+    manager = session.info.get("sessionmanager")
+    if manager is None or not manager.shard_count:
+        return session
+    return manager.shard_session(session, manager.shard_for(user))
+
+
+def contact_sessions(session: AsyncSession) -> List[AsyncSession]:
+    """
+    Get one session per database that holds Contacts.
+
+    Without configured shards, or for sessions that were not created by a
+    DatabaseSessionManager, this is only `session` itself.
+    """
+    manager = session.info.get("sessionmanager")
+    if manager is None:
+        return [session]
+    return manager.contact_sessions(session)
 
-async def get_db():
+
+sessionmanager = DatabaseSessionManager(
+    settings.DB_URL, settings.CONTACT_SHARD_URLS, settings.CONTACT_ID_BLOCK_SIZE
+)
+
+
+async def get_db(request: Request):
+    # Sub-requests of a batch run on the session of the batch request
+    session = request.scope.get("batch_session")
+    if session is not None:
+        yield session
+        return
     async with sessionmanager.session() as session:
         yield session
+
+
+async def db_now(session: AsyncSession) -> datetime:
+    """Get the current time of the database clock, as stored in timestamp columns."""
+    now = clock_now()
+    if session.get_bind().dialect.name == "postgresql":
+        # Timestamp columns hold the session's local time without zone
+        now = cast(now, DateTime)
+    return (await session.execute(select(now))).scalar_one()
@@ -1,15 +1,52 @@
 from datetime import date, datetime
 
-from sqlalchemy import Column, Integer, String, Boolean, func, Table
+from sqlalchemy import Column, Integer, String, Boolean, Table, Index, MetaData, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 from sqlalchemy.orm import relationship, mapped_column, Mapped, DeclarativeBase
 from sqlalchemy.sql.schema import ForeignKey, PrimaryKeyConstraint
-from sqlalchemy.sql.sqltypes import Date, DateTime
+from sqlalchemy.sql.sqltypes import JSON, Date, DateTime, LargeBinary
+
+
+# SQLite stores func.now() without fractional seconds, bound parameters have to
+# use the same format for timestamp comparisons to be correct.
+Timestamp = DateTime().with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d "
+        "%(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
+
+class clock_now(FunctionElement):
+    """
+    The time the statement runs at.
+
+    func.now() is the start of the transaction on PostgreSQL, so a row written
+    late in a long transaction would be stamped earlier than rows committed
+    while it ran and be missed by readers that page by timestamp.
+    """
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(clock_now)
+def _clock_now(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(clock_now, "postgresql")
+def _clock_now_postgresql(element, compiler, **kw):
+    return "clock_timestamp()"
 
 
 class Base(DeclarativeBase):
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    created_at: Mapped[datetime] = mapped_column(Timestamp, default=clock_now())
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, default=func.now(), onupdate=func.now()
+        Timestamp, default=clock_now(), onupdate=clock_now()
     )
 
 
@@ -22,12 +59,46 @@ class Contact(Base):
     phone: Mapped[str] = mapped_column(String(13), nullable=False)
     birthday: Mapped[date] = mapped_column(Date, nullable=True)
     additional_data: Mapped[str] = mapped_column(String(200), nullable=True)
+    deleted_at: Mapped[datetime] = mapped_column(Timestamp, nullable=True)
+    phone_normalized: Mapped[str] = mapped_column(String(16), nullable=True)
+    email_normalized: Mapped[str] = mapped_column(String(100), nullable=True)
 
     user_id = mapped_column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), default=None
     )
     user = relationship("User", backref="contacts")
 
+    __table_args__ = (
+        Index("ix_contacts_user_updated", "user_id", "updated_at", "id"),
+        Index(
+            "ix_contacts_live_user",
+            "user_id",
+            "id",
+            postgresql_where=text("deleted_at IS NULL"),
+            sqlite_where=text("deleted_at IS NULL"),
+        ),
+        Index(
+            "ix_contacts_user_phone",
+            "user_id",
+            "phone_normalized",
+            postgresql_where=text("deleted_at IS NULL"),
+            sqlite_where=text("deleted_at IS NULL"),
+        ),
+        Index(
+            "ix_contacts_user_email",
+            "user_id",
+            "email_normalized",
+            postgresql_where=text("deleted_at IS NULL"),
+            sqlite_where=text("deleted_at IS NULL"),
+        ),
+        Index(
+            "ix_contacts_deleted",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
+
 
 class User(Base):
     __tablename__ = "users"
@@ -37,3 +108,109 @@ class User(Base):
     hashed_password: Mapped[str] = mapped_column(String, nullable=False)
     avatar: Mapped[str] = mapped_column(String, nullable=True)
     confirmed: Mapped[bool] = mapped_column(Boolean, default=False)
+    deleted_at: Mapped[datetime] = mapped_column(Timestamp, nullable=True)
+    contacts_shard: Mapped[int] = mapped_column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_users_deleted",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
+
+
+class BirthdayDigest(Base):
+    __tablename__ = "birthday_digest"
+    contact_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("contacts.id", ondelete="CASCADE"), primary_key=True
+    )
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    next_birthday: Mapped[date] = mapped_column(Date, nullable=False)
+
+    __table_args__ = (
+        Index("ix_birthday_digest_user_next", "user_id", "next_birthday"),
+        Index("ix_birthday_digest_next", "next_birthday"),
+    )
+
+
+class ContactStats(Base):
+    __tablename__ = "contact_stats"
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Contacts per birth month ("1".."12") and per email domain
+    birth_months: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    email_domains: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    # Contacts added per day ("YYYY-MM-DD"), for the last 30 days
+    added_per_day: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+
+
+class ContactTombstone(Base):
+    __tablename__ = "contact_tombstones"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    contact_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_contact_tombstones_user_updated", "user_id", "updated_at", "id"),
+    )
+
+
+class IdBlock(Base):
+    __tablename__ = "id_blocks"
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    next_value: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class JobRun(Base):
+    __tablename__ = "job_runs"
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    # The last day a worker claimed the job for
+    last_run: Mapped[date] = mapped_column(Date, nullable=False)
+
+
+class IdempotencyRecord(Base):
+    __tablename__ = "idempotency_records"
+    # sha256 of owner, Idempotency-Key header and request body
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # None while the first request is still in flight
+    status_code: Mapped[int] = mapped_column(Integer, nullable=True)
+    headers: Mapped[str] = mapped_column(String, nullable=True)
+    body: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(Timestamp, nullable=False)
+
+    __table_args__ = (Index("ix_idempotency_records_expires", "expires_at"),)
+
+
+# Tables that live next to the contacts of a user, on the user's shard
+SHARD_TABLES = [
+    Contact.__table__,
+    BirthdayDigest.__table__,
+    ContactStats.__table__,
+    ContactTombstone.__table__,
+]
+
+
+def _shard_metadata() -> MetaData:
+    # Users stay in the main database, a shard cannot reference them
+    metadata = MetaData()
+    for table in SHARD_TABLES:
+        copy = table.to_metadata(metadata)
+        for constraint in list(copy.foreign_key_constraints):
+            if constraint.elements[0].target_fullname.startswith("users."):
+                copy.constraints.discard(constraint)
+                for key in constraint.elements:
+                    key.parent.foreign_keys.discard(key)
+                    copy.foreign_keys.discard(key)
+    return metadata
+
+
+# The schema of a shard database
+SHARD_METADATA = _shard_metadata()
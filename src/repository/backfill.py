@@ -0,0 +1,60 @@
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import Contact
+from src.repository.normalize import normalize_email, normalize_phone
+
+
+class ContactBackfillRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize a ContactBackfillRepository.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+        self.db = session
+
+    async def normalize_contacts(self, after_id: int, chunk_size: int) -> int | None:
+        """
+        Fill normalized phone and email of one chunk of Contacts.
+
+        Contacts are walked in id order, so every chunk is a range scan of the
+        primary key and rows written by the application meanwhile are simply
+        overwritten with the same values.
+
+        Args:
+            after_id: Only Contacts with a greater id are processed.
+            chunk_size: The maximum number of Contacts processed.
+
+        Returns:
+            The id of the last processed Contact, or None when there are none left.
+        """
+        rows = (
+            await self.db.execute(
+                select(Contact.id, Contact.phone, Contact.email)
+                .where(Contact.id > after_id)
+                .order_by(Contact.id)
+                .limit(chunk_size)
+            )
+        ).all()
+        if not rows:
+            return None
+        await self.db.execute(
+            update(Contact.__table__)
+            .where(Contact.id == bindparam("b_id"))
+            .values(
+                phone_normalized=bindparam("b_phone"),
+                email_normalized=bindparam("b_email"),
+            ),
+            [
+                {
+                    "b_id": contact_id,
+                    "b_phone": normalize_phone(phone),
+                    "b_email": normalize_email(email),
+                }
+                for contact_id, phone, email in rows
+            ],
+        )
+        await self.db.commit()
+        return rows[-1].id
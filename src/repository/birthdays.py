@@ -0,0 +1,282 @@
+from datetime import date, timedelta
+from typing import Dict, List
+
+from sqlalchemy import select, update, delete, insert, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import BirthdayDigest, Contact
+
+
+def next_birthday(birthday: date, today: date) -> date:
+    """
+    Get the next occurrence of a birthday, counting from `today`.
+
+    People born on February 29 celebrate on February 28 in non-leap years.
+
+    Args:
+        birthday: The date of birth.
+        today: The date to count from.
+
+    Returns:
+        The first date on or after `today` that is the birthday anniversary.
+    """
+    for year in (today.year, today.year + 1):
+        try:
+            candidate = birthday.replace(year=year)
+        except ValueError:
+            candidate = date(year, 2, 28)
+        if candidate >= today:
+            return candidate
+    raise ValueError("Birthday is out of range")
+
+
+class BirthdayDigestRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize a BirthdayDigestRepository.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+        self.db = session
+
+    async def patch(
+        self, contact_id: int, user_id: int, birthday: date | None, today: date = None
+    ) -> None:
+        """
+        Add, move or drop the digest row of a single Contact.
+
+        The caller is responsible for committing the session, so the digest is
+        changed in the same transaction as the Contact itself.
+
+        Args:
+            contact_id: The id of the Contact.
+            user_id: The id of the User who owns the Contact.
+            birthday: The birthday of the Contact, or None to drop the row.
+            today: The date to count from, defaults to the current date.
+        """
+        if birthday is None:
+            await self.remove(contact_id)
+            return
+        upcoming = next_birthday(birthday, today or date.today())
+        result = await self.db.execute(
+            update(BirthdayDigest)
+            .where(BirthdayDigest.contact_id == contact_id)
+            .values(next_birthday=upcoming)
+        )
+        if result.rowcount == 0:
+            self.db.add(
+                BirthdayDigest(
+                    contact_id=contact_id, user_id=user_id, next_birthday=upcoming
+                )
+            )
+
+    async def remove(self, contact_id: int) -> None:
+        """
+        Drop the digest row of a Contact without committing.
+
+        Args:
+            contact_id: The id of the Contact.
+        """
+        await self.db.execute(
+            delete(BirthdayDigest).where(BirthdayDigest.contact_id == contact_id)
+        )
+
+    def upcoming_ids(self, user_id: int, days: int, today: date = None):
+        """
+        Build a query for ids of Contacts with birthday within `days` days.
+
+        Args:
+            user_id: The id of the User who owns the Contacts.
+            days: Number of days.
+            today: The date to count from, defaults to the current date.
+
+        Returns:
+            A Select of Contact ids.
+        """
+        today = today or date.today()
+        return select(BirthdayDigest.contact_id).where(
+            BirthdayDigest.user_id == user_id,
+            BirthdayDigest.next_birthday.between(today, today + timedelta(days=days)),
+        )
+
+    def upcoming(self, stmt, user_id: int, days: int, today: date = None):
+        """
+        Narrow a Contact query to birthdays within the next `days` days.
+
+        Args:
+            stmt: A Select over Contact or some of its columns.
+            user_id: The id of the User who owns the Contacts.
+            days: Number of days.
+            today: The date to count from, defaults to the current date.
+
+        Returns:
+            The Select joined to the digest and ordered by next birthday.
+        """
+        today = today or date.today()
+        return (
+            stmt.join(BirthdayDigest, BirthdayDigest.contact_id == Contact.id)
+            .where(
+                BirthdayDigest.user_id == user_id,
+                BirthdayDigest.next_birthday.between(
+                    today, today + timedelta(days=days)
+                ),
+            )
+            .order_by(BirthdayDigest.next_birthday, BirthdayDigest.contact_id)
+        )
+
+    async def get_upcoming(
+        self, user_id: int, days: int, skip: int, limit: int, today: date = None
+    ) -> List[Contact]:
+        """
+        Get Contacts of a User whose birthday is within the next `days` days.
+
+        Args:
+            user_id: The id of the User who owns the Contacts.
+            days: Number of days.
+            skip: The number of Contacts to skip.
+            limit: The maximum number of Contacts to return.
+            today: The date to count from, defaults to the current date.
+
+        Returns:
+            A list of Contacts ordered by their next birthday.
+        """
+        stmt = self.upcoming(
+            select(Contact).where(Contact.deleted_at.is_(None)), user_id, days, today
+        )
+        contacts = await self.db.execute(stmt.offset(skip).limit(limit))
+        return contacts.scalars().all()
+
+    async def _move(self, rows, today: date) -> None:
+        await self.db.execute(
+            update(BirthdayDigest.__table__)
+            .where(BirthdayDigest.contact_id == bindparam("b_contact_id"))
+            .values(next_birthday=bindparam("b_next_birthday")),
+            [
+                {
+                    "b_contact_id": contact_id,
+                    "b_next_birthday": next_birthday(birthday, today),
+                }
+                for contact_id, birthday in rows
+            ],
+        )
+
+    async def roll_forward(self, user_id: int, today: date = None) -> int:
+        """
+        Move the rows of a User whose birthday has passed to the next year.
+
+        Called before reading, so upcoming birthdays are right without relying
+        on the daily refresh. Usually there is nothing to move and this is a
+        single index probe. The caller is responsible for committing.
+
+        Args:
+            user_id: The id of the User who owns the Contacts.
+            today: The date to count from, defaults to the current date.
+
+        Returns:
+            The number of moved rows.
+        """
+        today = today or date.today()
+        stale = await self.db.execute(
+            select(BirthdayDigest.contact_id, Contact.birthday)
+            .join(Contact, Contact.id == BirthdayDigest.contact_id)
+            .where(
+                BirthdayDigest.user_id == user_id,
+                BirthdayDigest.next_birthday < today,
+            )
+        )
+        rows = stale.all()
+        if rows:
+            await self._move(rows, today)
+        return len(rows)
+
+    async def refresh(self, today: date = None, chunk_size: int = 1000) -> int:
+        """
+        Bring the whole digest up to date for all Users.
+
+        Rows whose birthday has already passed are moved to the next year and
+        Contacts that have no row yet (e.g. created before the digest existed)
+        are added. Work is done and committed in chunks.
+
+        Args:
+            today: The date to count from, defaults to the current date.
+            chunk_size: The maximum number of rows written per statement.
+
+        Returns:
+            The number of rows that were moved or added.
+        """
+        today = today or date.today()
+        changed = 0
+
+        while True:
+            stale = await self.db.execute(
+                select(BirthdayDigest.contact_id, Contact.birthday)
+                .join(Contact, Contact.id == BirthdayDigest.contact_id)
+                .where(BirthdayDigest.next_birthday < today)
+                .limit(chunk_size)
+            )
+            rows = stale.all()
+            if not rows:
+                break
+            await self._move(rows, today)
+            await self.db.commit()
+            changed += len(rows)
+
+        while True:
+            missing = await self.db.execute(
+                select(Contact.id, Contact.user_id, Contact.birthday)
+                .outerjoin(BirthdayDigest, BirthdayDigest.contact_id == Contact.id)
+                .where(Contact.birthday.is_not(None))
+                .where(Contact.deleted_at.is_(None))
+                .where(BirthdayDigest.contact_id.is_(None))
+                .limit(chunk_size)
+            )
+            rows = missing.all()
+            if not rows:
+                break
+            await self.db.execute(
+                insert(BirthdayDigest),
+                [
+                    {
+                        "contact_id": contact_id,
+                        "user_id": user_id,
+                        "next_birthday": next_birthday(birthday, today),
+                    }
+                    for contact_id, user_id, birthday in rows
+                ],
+            )
+            await self.db.commit()
+            changed += len(rows)
+
+        return changed
+
+    async def get_digests(
+        self, days: int, today: date = None
+    ) -> Dict[int, List[Contact]]:
+        """
+        Get upcoming birthdays of all Users, grouped by User.
+
+        Args:
+            days: Number of days.
+            today: The date to count from, defaults to the current date.
+
+        Returns:
+            A mapping of user id to its Contacts with upcoming birthdays,
+            ordered by next birthday.
+        """
+        today = today or date.today()
+        stmt = (
+            select(Contact)
+            .join(BirthdayDigest, BirthdayDigest.contact_id == Contact.id)
+            .where(
+                Contact.deleted_at.is_(None),
+                BirthdayDigest.next_birthday.between(
+                    today, today + timedelta(days=days)
+                ),
+            )
+            .order_by(BirthdayDigest.user_id, BirthdayDigest.next_birthday)
+        )
+        digests = {}
+        for contact in (await self.db.execute(stmt)).scalars().all():
+            digests.setdefault(contact.user_id, []).append(contact)
+        return digests
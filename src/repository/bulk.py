@@ -0,0 +1,70 @@
+from typing import List
+
+from sqlalchemy import Table, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class BulkLoadRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize a BulkLoadRepository.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+        self.db = session
+
+    @property
+    def _dialect(self) -> str:
+        return self.db.get_bind().dialect.name
+
+    async def max_id(self, table: Table) -> int:
+        """Get the greatest id in a table, 0 for an empty table."""
+        stmt = select(func.coalesce(func.max(table.c.id), 0))
+        return (await self.db.execute(stmt)).scalar_one()
+
+    async def load(self, table: Table, rows: List[dict]) -> None:
+        """
+        Insert rows as fast as the database allows and commit.
+
+        PostgreSQL (asyncpg) gets the rows through COPY, other databases
+        through a single executemany. All rows must have the same keys.
+
+        Args:
+            table: The table to insert into.
+            rows: The rows, as mappings of column name to value.
+        """
+        if not rows:
+            return
+        if (
+            self._dialect == "postgresql"
+            and self.db.get_bind().dialect.driver == "asyncpg"
+        ):
+            columns = list(rows[0])
+            connection = await self.db.connection()
+            raw = await connection.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                table.name,
+                records=[tuple(row[column] for column in columns) for row in rows],
+                columns=columns,
+            )
+        else:
+            await self.db.execute(insert(table), rows)
+        await self.db.commit()
+
+    async def reset_sequence(self, table: Table) -> None:
+        """
+        Move the id sequence of a table past rows inserted with explicit ids.
+
+        Only PostgreSQL needs this, SQLite picks the next id from the table.
+        """
+        if self._dialect != "postgresql":
+            return
+        await self.db.execute(
+            text(
+                "SELECT setval(pg_get_serial_sequence(:table, 'id'), "
+                f"(SELECT coalesce(max(id), 1) FROM {table.name}))"
+            ),
+            {"table": table.name},
+        )
+        await self.db.commit()
@@ -1,14 +1,30 @@
-from datetime import date
-from typing import List
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
 
 import sqlalchemy
-from sqlalchemy import select, or_, extract, func, Integer, cast
+from sqlalchemy import select, or_, extract, func, Integer, cast, tuple_, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.sql.sqltypes import Date, DateTime
 
-from src.database.models import Contact, User
-from src.schemas.contacts import ContactBase, ContactResponse
+from src.database.db import db_now, shard_session
+from src.database.models import Contact, ContactTombstone, User, clock_now
+from src.repository.birthdays import BirthdayDigestRepository
+from src.repository.normalize import normalize_email, normalize_phone
+from src.repository.stats import ContactFacts, ContactStatsRepository
+from src.schemas.contacts import ContactBase, SyncToken
+
+
+class Candidate(NamedTuple):
+    """The attributes of a Contact that duplicates are detected by."""
+
+    id: int
+    name: str
+    surname: str
+    email_normalized: str | None
+    phone_normalized: str | None
+    birthday: object
 
 
 class ContactRepository:
@@ -21,7 +37,65 @@ class ContactRepository:
         """
         self.db = session
 
-    async def get_contacts(self, skip: int, limit: int, user: User) -> List[Contact]:
+    def _session(self, user: User) -> AsyncSession:
+        return shard_session(self.db, user)
+
+    @staticmethod
+    def _select(fields: Tuple[str, ...] | None):
+        if fields is None:
+            stmt = select(Contact)
+        else:
+            stmt = select(*(getattr(Contact, field) for field in fields))
+        return stmt.where(Contact.deleted_at.is_(None))
+
+    # Hot statements are built once per column set with bound parameters, so
+    # every call reuses the same construct and its cached compiled form
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _page_stmt(fields: Tuple[str, ...] | None):
+        return (
+            ContactRepository._select(fields)
+            .where(Contact.user_id == bindparam("user_id"))
+            .offset(bindparam("skip"))
+            .limit(bindparam("limit"))
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _by_id_stmt(fields: Tuple[str, ...] | None):
+        return ContactRepository._select(fields).where(
+            Contact.id == bindparam("contact_id"),
+            Contact.user_id == bindparam("user_id"),
+        )
+
+    @staticmethod
+    def _all(result, fields: Tuple[str, ...] | None):
+        return result.scalars().all() if fields is None else result.all()
+
+    @staticmethod
+    def _normalize(contact: Contact) -> None:
+        contact.phone_normalized = normalize_phone(contact.phone)
+        contact.email_normalized = normalize_email(contact.email)
+
+    @staticmethod
+    def _search_filter(q: str):
+        return or_(
+            Contact.name.ilike(f"%{q}%"),
+            Contact.surname.ilike(f"%{q}%"),
+            Contact.email.ilike(f"%{q}%"),
+            Contact.phone.ilike(f"%{q}%"),
+        )
+
+    @staticmethod
+    async def _bounded_count(db: AsyncSession, stmt, bound: int) -> int:
+        limited = stmt.limit(bound + 1).subquery()
+        return (
+            await db.execute(select(func.count()).select_from(limited))
+        ).scalar_one()
+
+    async def get_contacts(
+        self, skip: int, limit: int, user: User, fields: Tuple[str, ...] = None
+    ) -> List[Contact]:
         """
         Get a list of Contacts owned by `user` with pagination.
 
@@ -29,91 +103,325 @@ class ContactRepository:
             skip: The number of Contacts to skip.
             limit: The maximum number of Contacts to return.
             user: The owner of the Contacts to retrieve.
+            fields: Only select these columns, returning rows instead of Contacts.
 
         Returns:
             A list of Contacts.
         """
-        stmt = select(Contact).filter_by(user=user).offset(skip).limit(limit)
-        contacts = await self.db.execute(stmt)
-        return contacts.scalars().all()
+        contacts = await self._session(user).execute(
+            self._page_stmt(fields), {"user_id": user.id, "skip": skip, "limit": limit}
+        )
+        return self._all(contacts, fields)
 
-    async def get_contact_by_id(self, contact_id: int, user: User) -> Contact | None:
+    async def get_contact_by_id(
+        self, contact_id: int, user: User, fields: Tuple[str, ...] = None
+    ) -> Contact | None:
         """
         Get a Contact by its id.
 
         Args:
             contact_id: The id of the Contact to retrieve.
             user: The owner of the Contact to retrieve.
+            fields: Only select these columns, returning a row instead of a Contact.
 
         Returns:
             The Contact with the specified id, or None if no such Contact exists.
         """
-        stmt = select(Contact).filter_by(id=contact_id, user=user)
-        contact = await self.db.execute(stmt)
+        contact = await self._session(user).execute(
+            self._by_id_stmt(fields), {"contact_id": contact_id, "user_id": user.id}
+        )
+        if fields is not None:
+            return contact.one_or_none()
         return contact.scalar_one_or_none()
 
-    async def search_contact(self, q: str, skip: int, limit: int, user: User):
+    async def search_contact(
+        self, q: str, skip: int, limit: int, user: User, fields: Tuple[str, ...] = None
+    ):
         """
         Get a Contact by its field value.
 
         Args:
             q: Query string to search in fields.
             user: The owner of the Contact to retrieve.
+            fields: Only select these columns, returning rows instead of Contacts.
 
         Returns:
             The Contact with the field, which has query value.
         """
         stmt = (
-            select(Contact)
-            .filter_by(user=user)
-            .filter(
-                or_(
-                    Contact.name.ilike(f"%{q}%"),
-                    Contact.surname.ilike(f"%{q}%"),
-                    Contact.email.ilike(f"%{q}%"),
-                    Contact.phone.ilike(f"%{q}%"),
-                )
-            )
+            self._select(fields)
+            .filter_by(user_id=user.id)
+            .filter(self._search_filter(q))
             .offset(skip)
             .limit(limit)
         )
-        contacts = await self.db.execute(stmt)
-        return contacts.scalars().all()
+        contacts = await self._session(user).execute(stmt)
+        return self._all(contacts, fields)
+
+    async def lookup_contacts(
+        self,
+        user: User,
+        phone: str = None,
+        email: str = None,
+        fields: Tuple[str, ...] = None,
+    ) -> List[Contact]:
+        """
+        Get Contacts by exact phone number and/or email.
+
+        Both values are normalized the same way as on write, so the lookup
+        is an index probe instead of a scan.
+
+        Args:
+            user: The owner of the Contacts.
+            phone: A phone number in any common format.
+            email: An email address in any letter case.
+            fields: Only select these columns, returning rows instead of Contacts.
+
+        Returns:
+            A list of matching Contacts, empty if a value can't be normalized.
+        """
+        stmt = self._select(fields).filter_by(user_id=user.id)
+        if phone is not None:
+            phone = normalize_phone(phone)
+            if phone is None:
+                return []
+            stmt = stmt.filter_by(phone_normalized=phone)
+        if email is not None:
+            email = normalize_email(email)
+            if email is None:
+                return []
+            stmt = stmt.filter_by(email_normalized=email)
+        contacts = await self._session(user).execute(stmt)
+        return self._all(contacts, fields)
+
+    async def get_duplicate_candidates(self, user: User) -> List[Candidate]:
+        """
+        Get the attributes duplicates are detected by for all Contacts of a User.
+
+        Args:
+            user: The owner of the Contacts.
+
+        Returns:
+            A list of Candidates.
+        """
+        stmt = select(*(getattr(Contact, name) for name in Candidate._fields))
+        stmt = stmt.filter_by(user_id=user.id, deleted_at=None)
+        rows = await self._session(user).execute(stmt)
+        return [Candidate(*row) for row in rows]
+
+    async def get_autocomplete_rows(self, user: User) -> List[tuple]:
+        """
+        Get the attributes Contacts are autocompleted by for all Contacts of a User.
+
+        Args:
+            user: The owner of the Contacts.
+
+        Returns:
+            A list of rows of id, name, surname, email and phone.
+        """
+        stmt = select(
+            Contact.id, Contact.name, Contact.surname, Contact.email, Contact.phone
+        ).filter_by(user_id=user.id, deleted_at=None)
+        return (await self._session(user).execute(stmt)).all()
+
+    async def get_contacts_by_ids(self, ids: List[int], user: User) -> List[Contact]:
+        """
+        Get Contacts of a User by their ids.
+
+        Args:
+            ids: The ids of the Contacts.
+            user: The owner of the Contacts.
+
+        Returns:
+            A list of the found Contacts, ordered by id.
+        """
+        stmt = (
+            select(Contact)
+            .where(Contact.id.in_(ids))
+            .filter_by(user_id=user.id, deleted_at=None)
+            .order_by(Contact.id)
+        )
+        return (await self._session(user).execute(stmt)).scalars().all()
+
+    async def count_contacts(self, user: User) -> int:
+        """
+        Get the number of Contacts owned by `user`.
+
+        The number comes from a counter maintained by the write methods, so
+        the Contacts are not counted on every call.
+
+        Args:
+            user: The owner of the Contacts.
+
+        Returns:
+            The number of Contacts.
+        """
+        return await ContactStatsRepository(self._session(user)).get_total(user.id)
+
+    async def get_stats(self, user: User) -> dict:
+        """
+        Get the statistics of the Contacts owned by a User.
+
+        Args:
+            user: The User who owns the Contacts.
+
+        Returns:
+            A dict with the fields of ContactStatistics.
+        """
+        return await ContactStatsRepository(self._session(user)).get_stats(user.id)
+
+    async def count_search(self, q: str, user: User, bound: int) -> int:
+        """
+        Count Contacts matching a search query, stopping at `bound` + 1.
+
+        Args:
+            q: Query string to search in fields.
+            user: The owner of the Contacts.
+            bound: The number of matches after which counting stops.
+
+        Returns:
+            The number of matches, or `bound` + 1 if there are more.
+        """
+        stmt = (
+            select(Contact.id)
+            .filter_by(user_id=user.id, deleted_at=None)
+            .filter(self._search_filter(q))
+        )
+        return await self._bounded_count(self._session(user), stmt, bound)
+
+    async def count_birthdays(self, days: int, user: User, bound: int) -> int:
+        """
+        Count Contacts with birthday on the next x days, stopping at `bound` + 1.
+
+        Args:
+            days: Number of days.
+            user: The owner of the Contacts.
+            bound: The number of matches after which counting stops.
+
+        Returns:
+            The number of matches, or `bound` + 1 if there are more.
+        """
+        db = self._session(user)
+        stmt = BirthdayDigestRepository(db).upcoming_ids(user.id, days)
+        return await self._bounded_count(db, stmt, bound)
 
     async def get_birthdays(
-        self, days: int, skip: int, limit: int, user: User
+        self,
+        days: int,
+        skip: int,
+        limit: int,
+        user: User,
+        fields: Tuple[str, ...] = None,
     ) -> List[Contact]:
         """
         Get list of contacts, who have birthday on the next x days.
 
+        Contacts are read from the precomputed birthday digest, so the cost
+        depends on the size of the result only. Rows of the User whose
+        birthday has passed are moved to the next year first.
+
         Args:
             days: Number of days.
             skip: The number of Contacts to skip.
             limit: The maximum number of Contacts to return.
             user: The User who owns the Contact.
+            fields: Only select these columns, returning rows instead of Contacts.
 
         Returns:
             A list of Contacts.
         """
-        stmt = (
-            select(Contact)
-            .filter_by(user=user)
-            .where(
-                (
-                    func.make_date(
-                        date.today().year,
-                        cast(func.extract("month", Contact.birthday), Integer),
-                        cast(func.extract("day", Contact.birthday), Integer),
+        db = self._session(user)
+        digest = BirthdayDigestRepository(db)
+        if await digest.roll_forward(user.id):
+            await db.commit()
+        stmt = digest.upcoming(self._select(fields), user.id, days)
+        contacts = await db.execute(stmt.offset(skip).limit(limit))
+        return self._all(contacts, fields)
+
+    async def get_changes(
+        self,
+        user: User,
+        since: SyncToken | None,
+        lag: int,
+        limit: int,
+        retention: int = None,
+    ) -> Tuple[List[Contact], List[int], SyncToken, bool] | None:
+        """
+        Get Contacts changed and deleted after a sync token.
+
+        Changes are read in (updated_at, id) order for both Contacts and
+        tombstones, stopping `lag` seconds before the database clock so that
+        transactions still in flight are picked up by the next call. Clients
+        should apply deletions before upserts.
+
+        Args:
+            user: The owner of the Contacts.
+            since: The token returned by the previous call, or None for a
+                full sync.
+            lag: The safety lag in seconds.
+            limit: The maximum number of upserts and of deletions to return.
+            retention: The number of days tombstones are kept for.
+
+        Returns:
+            The changed Contacts, the ids of deleted Contacts, the token to
+            continue from and whether there are more changes right away, or
+            None if the token is older than the tombstone retention.
+        """
+        db = self._session(user)
+        now = await db_now(db)
+        horizon = now - timedelta(seconds=lag)
+        if (
+            retention is not None
+            and since is not None
+            and since.deletions is not None
+            and since.deletions[0] < now - timedelta(days=retention)
+        ):
+            return None
+        token = SyncToken(
+            contacts=since.contacts if since else None,
+            deletions=since.deletions if since else (horizon, 0),
+        )
+
+        stmt = self._select(None).where(
+            Contact.user_id == user.id, Contact.updated_at < horizon
+        )
+        if token.contacts:
+            stmt = stmt.where(
+                tuple_(Contact.updated_at, Contact.id)
+                > tuple_(*token.contacts, types=(Contact.updated_at.type, Integer))
+            )
+        stmt = stmt.order_by(Contact.updated_at, Contact.id).limit(limit + 1)
+        contacts = (await db.execute(stmt)).scalars().all()
+        has_more = len(contacts) > limit
+        contacts = contacts[:limit]
+        if contacts:
+            token.contacts = (contacts[-1].updated_at, contacts[-1].id)
+
+        deletions = []
+        if since is not None:
+            stmt = select(ContactTombstone).where(
+                ContactTombstone.user_id == user.id,
+                ContactTombstone.updated_at < horizon,
+            )
+            if token.deletions:
+                stmt = stmt.where(
+                    tuple_(ContactTombstone.updated_at, ContactTombstone.id)
+                    > tuple_(
+                        *token.deletions,
+                        types=(ContactTombstone.updated_at.type, Integer),
                     )
-                    - date.today()
                 )
-                <= days
-            )
-            .offset(skip)
-            .limit(limit)
-        )
-        contacts = await self.db.execute(stmt)
-        return contacts.scalars().all()
+            stmt = stmt.order_by(
+                ContactTombstone.updated_at, ContactTombstone.id
+            ).limit(limit + 1)
+            tombstones = (await db.execute(stmt)).scalars().all()
+            has_more = has_more or len(tombstones) > limit
+            tombstones = tombstones[:limit]
+            if tombstones:
+                token.deletions = (tombstones[-1].updated_at, tombstones[-1].id)
+            deletions = [tombstone.contact_id for tombstone in tombstones]
+
+        return contacts, deletions, token, has_more
 
     async def create_contact(self, body: ContactBase, user: User) -> Contact:
         """
@@ -126,16 +434,35 @@ class ContactRepository:
         Returns:
             A Contact with the assigned attributes.
         """
-        contact = Contact(**body.model_dump(exclude_unset=True), user=user)
-        self.db.add(contact)
-        await self.db.commit()
-        await self.db.refresh(contact)
-        return await self.get_contact_by_id(contact.id, user)
+        db = self._session(user)
+        contact = Contact(**body.model_dump(exclude_unset=True), user_id=user.id)
+        if db is not self.db:
+            # Contacts move between shards, so ids must be unique across all of them
+            contact.id = await self.db.info["sessionmanager"].allocate_id("contacts")
+        self._normalize(contact)
+        db.add(contact)
+        await db.flush()
+        await BirthdayDigestRepository(db).patch(contact.id, user.id, contact.birthday)
+        await ContactStatsRepository(db).record(
+            user.id, added=[ContactFacts.of(contact, added=True)]
+        )
+        await db.commit()
+        await db.refresh(contact)
+        return contact
+
+    @staticmethod
+    async def _mark_deleted(db: AsyncSession, contact: Contact) -> None:
+        await BirthdayDigestRepository(db).remove(contact.id)
+        db.add(ContactTombstone(contact_id=contact.id, user_id=contact.user_id))
+        contact.deleted_at = clock_now()
 
     async def delete_contact(self, contact_id: int, user: User) -> Contact | None:
         """
         Delete a Contact by its id.
 
+        The Contact is only marked as deleted, rows are removed later by the
+        purge job.
+
         Args:
             contact_id: The id of the Contact to delete.
             user: The owner of the Contact to delete.
@@ -145,8 +472,13 @@ class ContactRepository:
         """
         contact = await self.get_contact_by_id(contact_id, user)
         if contact:
-            await self.db.delete(contact)
-            await self.db.commit()
+            db = self._session(user)
+            await self._mark_deleted(db, contact)
+            await db.flush()
+            await ContactStatsRepository(db).record(
+                user.id, removed=[ContactFacts.of(contact)]
+            )
+            await db.commit()
         return contact
 
     async def update_contact(
@@ -165,10 +497,64 @@ class ContactRepository:
         """
         contact = await self.get_contact_by_id(contact_id, user)
         if contact:
+            before = ContactFacts.of(contact)
             for key, value in body.model_dump(exclude_unset=True).items():
                 setattr(contact, key, value)
+            self._normalize(contact)
+            db = self._session(user)
+            await BirthdayDigestRepository(db).patch(
+                contact.id, user.id, contact.birthday
+            )
+            after = ContactFacts.of(contact)
+            if after != before:
+                await db.flush()
+                await ContactStatsRepository(db).record(
+                    user.id, removed=[before], added=[after]
+                )
+
+            await db.commit()
+            await db.refresh(contact)
+
+        return contact
+
+    async def merge_contacts(
+        self, contact_id: int, duplicate_ids: List[int], user: User
+    ) -> Contact | None:
+        """
+        Merge duplicates into a Contact in one transaction.
+
+        The Contact keeps its own attributes, empty ones are filled from the
+        duplicates in id order. The duplicates are deleted.
+
+        Args:
+            contact_id: The id of the Contact to keep.
+            duplicate_ids: The ids of the Contacts to merge into it.
+            user: The owner of the Contacts.
 
-            await self.db.commit()
-            await self.db.refresh(contact)
+        Returns:
+            The merged Contact, or None if any of the Contacts doesn't exist.
+        """
+        duplicate_ids = sorted(set(duplicate_ids) - {contact_id})
+        contacts = await self.get_contacts_by_ids([contact_id, *duplicate_ids], user)
+        if len(contacts) != len(duplicate_ids) + 1:
+            return None
+        contact = next(c for c in contacts if c.id == contact_id)
+        duplicates = [c for c in contacts if c.id != contact_id]
 
+        db = self._session(user)
+        before = ContactFacts.of(contact)
+        for duplicate in duplicates:
+            for key in ("birthday", "additional_data"):
+                if not getattr(contact, key) and getattr(duplicate, key):
+                    setattr(contact, key, getattr(duplicate, key))
+            await self._mark_deleted(db, duplicate)
+        await BirthdayDigestRepository(db).patch(contact.id, user.id, contact.birthday)
+        await db.flush()
+        await ContactStatsRepository(db).record(
+            user.id,
+            removed=[before] + [ContactFacts.of(c) for c in duplicates],
+            added=[ContactFacts.of(contact)],
+        )
+        await db.commit()
+        await db.refresh(contact)
         return contact
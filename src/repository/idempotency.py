@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.db import db_now
+from src.database.models import IdempotencyRecord
+
+
+class IdempotencyRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize an IdempotencyRepository.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+        self.db = session
+
+    async def claim(self, key: str, lock_seconds: int) -> IdempotencyRecord | None:
+        """
+        Claim a key for a request that is about to run.
+
+        Args:
+            key: The hashed idempotency key.
+            lock_seconds: How long the claim holds if the request never completes.
+
+        Returns:
+            None if the key was claimed, otherwise the existing record, which
+            has no status code while the first request is still in flight.
+        """
+        now = await db_now(self.db)
+        record = await self.db.get(IdempotencyRecord, key)
+        if record is not None and record.expires_at <= now:
+            await self.db.delete(record)
+            await self.db.flush()
+            record = None
+        if record is not None:
+            return record
+        self.db.add(
+            IdempotencyRecord(key=key, expires_at=now + timedelta(seconds=lock_seconds))
+        )
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            return await self.db.get(IdempotencyRecord, key, populate_existing=True)
+        return None
+
+    async def complete(
+        self, key: str, status_code: int, headers: str, body: bytes, ttl: int
+    ) -> None:
+        """
+        Store the response of a claimed key.
+
+        Args:
+            key: The hashed idempotency key.
+            status_code: The status code of the response.
+            headers: The headers of the response, JSON encoded.
+            body: The body of the response.
+            ttl: Seconds the response is replayed for.
+        """
+        now = await db_now(self.db)
+        await self.db.execute(
+            update(IdempotencyRecord)
+            .where(IdempotencyRecord.key == key)
+            .values(
+                status_code=status_code,
+                headers=headers,
+                body=body,
+                expires_at=now + timedelta(seconds=ttl),
+            )
+        )
+        await self.db.commit()
+
+    async def release(self, key: str) -> None:
+        """
+        Drop the claim of a key whose request failed, so it can be retried.
+
+        Args:
+            key: The hashed idempotency key.
+        """
+        await self.db.execute(
+            delete(IdempotencyRecord).where(IdempotencyRecord.key == key)
+        )
+        await self.db.commit()
@@ -0,0 +1,49 @@
+from datetime import date
+
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import JobRun
+
+
+class JobRunRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize a JobRunRepository.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+        self.db = session
+
+    async def claim(self, name: str, day: date) -> bool:
+        """
+        Claim the run of a job for a day and commit.
+
+        Every worker runs the schedulers, the claim is a conditional write so
+        that exactly one of them gets to run the job each day.
+
+        Args:
+            name: The name of the job.
+            day: The day to run the job for.
+
+        Returns:
+            True if the caller should run the job, False if another worker
+            already claimed it for `day`.
+        """
+        dialect = self.db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        result = await self.db.execute(
+            insert(JobRun)
+            .values(name=name, last_run=day)
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        if result.rowcount != 1:
+            result = await self.db.execute(
+                update(JobRun)
+                .where(JobRun.name == name, JobRun.last_run < day)
+                .values(last_run=day)
+            )
+        await self.db.commit()
+        return result.rowcount == 1
@@ -0,0 +1,46 @@
+import re
+
+from src.conf.config import settings
+
+_NOT_DIGITS = re.compile(r"\D")
+
+
+def normalize_phone(
+    phone: str | None, country_code: str = settings.DEFAULT_PHONE_COUNTRY_CODE
+) -> str | None:
+    """
+    Bring a free-text phone number to E.164 form.
+
+    Numbers without an international prefix are treated as national numbers
+    of `country_code`, with a leading trunk ``0`` dropped.
+
+    Args:
+        phone: The phone number as entered.
+        country_code: The country calling code used for national numbers.
+
+    Returns:
+        The number as ``+`` followed by 8 to 15 digits, or None if it can't
+        be normalized.
+    """
+    if not phone:
+        return None
+    phone = phone.strip()
+    digits = _NOT_DIGITS.sub("", phone)
+    if phone.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif digits.startswith("0"):
+        digits = country_code + digits[1:]
+    elif not digits.startswith(country_code):
+        digits = country_code + digits
+    if not 8 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+
+def normalize_email(email: str | None) -> str | None:
+    """Lower-case an email address for exact, case-insensitive lookups."""
+    if not email:
+        return None
+    return email.strip().lower()
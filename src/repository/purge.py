@@ -0,0 +1,137 @@
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import select, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import (
+    BirthdayDigest,
+    Contact,
+    ContactStats,
+    ContactTombstone,
+    IdempotencyRecord,
+    User,
+)
+
+
+class PurgeRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize a PurgeRepository.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+        self.db = session
+
+    async def get_deleted_user_ids(self, limit: int) -> List[int]:
+        """
+        Get ids of Users marked as deleted.
+
+        Args:
+            limit: The maximum number of ids to return.
+
+        Returns:
+            A list of User ids.
+        """
+        stmt = select(User.id).where(User.deleted_at.is_not(None)).limit(limit)
+        return (await self.db.execute(stmt)).scalars().all()
+
+    async def purge_contacts(self, chunk_size: int, user_ids: List[int] = ()) -> int:
+        """
+        Hard-delete one chunk of deleted Contacts and Contacts of given Users.
+
+        Args:
+            chunk_size: The maximum number of Contacts to delete.
+            user_ids: Ids of deleted Users whose Contacts are deleted as well.
+
+        Returns:
+            The number of deleted Contacts.
+        """
+        condition = Contact.deleted_at.is_not(None)
+        if user_ids:
+            condition = or_(condition, Contact.user_id.in_(user_ids))
+        stmt = select(Contact.id).where(condition).limit(chunk_size)
+        ids = (await self.db.execute(stmt)).scalars().all()
+        if ids:
+            await self.db.execute(
+                delete(BirthdayDigest).where(BirthdayDigest.contact_id.in_(ids))
+            )
+            await self.db.execute(delete(Contact).where(Contact.id.in_(ids)))
+            await self.db.commit()
+        return len(ids)
+
+    async def purge_user_rows(self, user_ids: List[int]) -> None:
+        """
+        Delete tombstones and counters of Users whose Contacts are purged.
+
+        Args:
+            user_ids: Ids of deleted Users.
+        """
+        for model in (ContactTombstone, ContactStats):
+            await self.db.execute(delete(model).where(model.user_id.in_(user_ids)))
+        await self.db.commit()
+
+    async def purge_users(self, user_ids: List[int]) -> int:
+        """
+        Hard-delete Users whose Contacts have already been purged.
+
+        Args:
+            user_ids: Ids of deleted Users.
+
+        Returns:
+            The number of deleted Users.
+        """
+        await self.db.execute(
+            delete(User).where(User.id.in_(user_ids), User.deleted_at.is_not(None))
+        )
+        await self.db.commit()
+        return len(user_ids)
+
+    async def purge_tombstones(self, before: datetime, chunk_size: int) -> int:
+        """
+        Delete one chunk of tombstones older than `before`.
+
+        Args:
+            before: Tombstones last updated before this time are deleted.
+            chunk_size: The maximum number of tombstones to delete.
+
+        Returns:
+            The number of deleted tombstones.
+        """
+        stmt = (
+            select(ContactTombstone.id)
+            .where(ContactTombstone.updated_at < before)
+            .limit(chunk_size)
+        )
+        ids = (await self.db.execute(stmt)).scalars().all()
+        if ids:
+            await self.db.execute(
+                delete(ContactTombstone).where(ContactTombstone.id.in_(ids))
+            )
+            await self.db.commit()
+        return len(ids)
+
+    async def purge_idempotency_records(self, before: datetime, chunk_size: int) -> int:
+        """
+        Delete one chunk of idempotency records that expired before `before`.
+
+        Args:
+            before: Records expiring before this time are deleted.
+            chunk_size: The maximum number of records to delete.
+
+        Returns:
+            The number of deleted records.
+        """
+        stmt = (
+            select(IdempotencyRecord.key)
+            .where(IdempotencyRecord.expires_at < before)
+            .limit(chunk_size)
+        )
+        keys = (await self.db.execute(stmt)).scalars().all()
+        if keys:
+            await self.db.execute(
+                delete(IdempotencyRecord).where(IdempotencyRecord.key.in_(keys))
+            )
+            await self.db.commit()
+        return len(keys)
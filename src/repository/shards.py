@@ -0,0 +1,114 @@
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import select, insert, delete, tuple_, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import (
+    BirthdayDigest,
+    Contact,
+    ContactStats,
+    ContactTombstone,
+)
+
+
+class ShardMoveRepository:
+    def __init__(self, source: AsyncSession, target: AsyncSession):
+        """
+        Initialize a ShardMoveRepository.
+
+        Args:
+            source: An AsyncSession connected to the shard to move from.
+            target: An AsyncSession connected to the shard to move to.
+        """
+        self.source = source
+        self.target = target
+
+    async def copy_contacts(
+        self, user_id: int, after: Tuple[datetime, int] | None, limit: int
+    ) -> Tuple[int, Tuple[datetime, int] | None]:
+        """
+        Copy one chunk of a User's Contacts in (updated_at, id) order.
+
+        Contacts that already exist on the target are replaced, so Contacts
+        updated while the move is running are simply copied again.
+
+        Args:
+            user_id: The id of the User whose Contacts are copied.
+            after: The (updated_at, id) of the last copied Contact, or None.
+            limit: The maximum number of Contacts to copy.
+
+        Returns:
+            The number of copied Contacts and the cursor to continue from.
+        """
+        table = Contact.__table__
+        stmt = select(table).where(table.c.user_id == user_id)
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(table.c.updated_at, table.c.id)
+                > tuple_(*after, types=(table.c.updated_at.type, Integer))
+            )
+        stmt = stmt.order_by(table.c.updated_at, table.c.id).limit(limit)
+        rows = [dict(row) for row in (await self.source.execute(stmt)).mappings()]
+        if not rows:
+            return 0, after
+        await self.target.execute(
+            delete(table).where(table.c.id.in_([row["id"] for row in rows]))
+        )
+        await self.target.execute(insert(table), rows)
+        await self.target.commit()
+        return len(rows), (rows[-1]["updated_at"], rows[-1]["id"])
+
+    async def copy_tombstones(self, user_id: int) -> int:
+        """
+        Copy the tombstones of a User and delete them from the source.
+
+        Args:
+            user_id: The id of the User whose tombstones are moved.
+
+        Returns:
+            The number of moved tombstones.
+        """
+        table = ContactTombstone.__table__
+        stmt = select(
+            table.c.contact_id, table.c.user_id, table.c.created_at, table.c.updated_at
+        ).where(table.c.user_id == user_id)
+        rows = [dict(row) for row in (await self.source.execute(stmt)).mappings()]
+        if rows:
+            await self.target.execute(insert(table), rows)
+            await self.target.commit()
+            await self.source.execute(delete(table).where(table.c.user_id == user_id))
+            await self.source.commit()
+        return len(rows)
+
+    async def reset_stats(self, user_id: int) -> None:
+        """Drop the counters of a User on the target, they are rebuilt on read."""
+        await self.target.execute(
+            delete(ContactStats).where(ContactStats.user_id == user_id)
+        )
+        await self.target.commit()
+
+    async def delete_source(self, user_id: int, chunk_size: int) -> int:
+        """
+        Delete one chunk of a User's Contacts and derived rows from the source.
+
+        Args:
+            user_id: The id of the User whose rows are deleted.
+            chunk_size: The maximum number of Contacts to delete.
+
+        Returns:
+            The number of deleted Contacts.
+        """
+        stmt = select(Contact.id).where(Contact.user_id == user_id).limit(chunk_size)
+        ids = (await self.source.execute(stmt)).scalars().all()
+        if ids:
+            await self.source.execute(
+                delete(BirthdayDigest).where(BirthdayDigest.contact_id.in_(ids))
+            )
+            await self.source.execute(delete(Contact).where(Contact.id.in_(ids)))
+        else:
+            await self.source.execute(
+                delete(ContactStats).where(ContactStats.user_id == user_id)
+            )
+        await self.source.commit()
+        return len(ids)
@@ -0,0 +1,231 @@
+from datetime import date, timedelta
+from typing import NamedTuple, Sequence
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import Contact, ContactStats
+
+# Days of history kept for the recently added counts
+RECENT_DAYS = 30
+# Number of email domains reported
+TOP_DOMAINS = 10
+
+
+class ContactFacts(NamedTuple):
+    """The attributes of a Contact that the statistics are rolled up from."""
+
+    birth_month: int | None
+    email_domain: str
+    # None for a Contact added just now, in the same transaction
+    added_on: date | None
+
+    @classmethod
+    def of(cls, contact, added: bool = False) -> "ContactFacts":
+        email = contact.email_normalized or contact.email.lower()
+        return cls(
+            contact.birthday.month if contact.birthday else None,
+            email.rsplit("@", 1)[-1],
+            None if added else contact.created_at.date(),
+        )
+
+
+def _as_date(value) -> date:
+    # SQLite returns CURRENT_DATE as a string
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def _bump(counts: dict, key, delta: int) -> dict:
+    counts = dict(counts)
+    value = counts.get(str(key), 0) + delta
+    if value > 0:
+        counts[str(key)] = value
+    else:
+        counts.pop(str(key), None)
+    return counts
+
+
+def _apply(stats: ContactStats, facts: ContactFacts, delta: int, today: date) -> None:
+    stats.total += delta
+    if facts.birth_month is not None:
+        stats.birth_months = _bump(stats.birth_months, facts.birth_month, delta)
+    stats.email_domains = _bump(stats.email_domains, facts.email_domain, delta)
+    first_day = today - timedelta(days=RECENT_DAYS - 1)
+    added_on = facts.added_on or today
+    added_per_day = {
+        day: count
+        for day, count in stats.added_per_day.items()
+        if date.fromisoformat(day) >= first_day
+    }
+    if added_on >= first_day:
+        added_per_day = _bump(added_per_day, added_on.isoformat(), delta)
+    stats.added_per_day = added_per_day
+
+
+class ContactStatsRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize a ContactStatsRepository.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+        self.db = session
+
+    async def _compute(self, user_id: int, today: date) -> ContactStats:
+        stats = ContactStats(
+            user_id=user_id,
+            total=0,
+            birth_months={},
+            email_domains={},
+            added_per_day={},
+        )
+        stmt = select(
+            Contact.birthday,
+            Contact.email,
+            Contact.email_normalized,
+            Contact.created_at,
+        ).filter_by(user_id=user_id, deleted_at=None)
+        for contact in await self.db.execute(stmt):
+            _apply(stats, ContactFacts.of(contact), 1, today)
+        return stats
+
+    async def _insert(self, stats: ContactStats) -> bool:
+        """Insert a statistics row, unless another transaction already has."""
+        dialect = self.db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = (
+            insert(ContactStats)
+            .values(
+                user_id=stats.user_id,
+                total=stats.total,
+                birth_months=stats.birth_months,
+                email_domains=stats.email_domains,
+                added_per_day=stats.added_per_day,
+            )
+            .on_conflict_do_nothing(index_elements=["user_id"])
+        )
+        return (await self.db.execute(stmt)).rowcount == 1
+
+    async def _locked(self, user_id: int):
+        stmt = (
+            select(ContactStats, func.current_date())
+            .filter_by(user_id=user_id)
+            .with_for_update()
+        )
+        row = (await self.db.execute(stmt)).one_or_none()
+        if row is None:
+            return None, await self._today()
+        return row[0], _as_date(row[1])
+
+    async def _today(self) -> date:
+        # The database clock, which also fills Contact.created_at
+        return _as_date((await self.db.execute(select(func.current_date()))).scalar())
+
+    async def record(
+        self,
+        user_id: int,
+        removed: Sequence[ContactFacts] = (),
+        added: Sequence[ContactFacts] = (),
+    ) -> None:
+        """
+        Roll a Contact change into the statistics of a User without committing.
+
+        Must be called after the Contact change has been flushed, so that a
+        missing statistics row can be initialized from the current state.
+
+        Args:
+            user_id: The id of the User who owns the Contacts.
+            removed: The facts of deleted Contacts, and of updated ones
+                before the update.
+            added: The facts of created Contacts, and of updated ones after
+                the update.
+        """
+        stats, today = await self._locked(user_id)
+        if stats is None:
+            # The change is already flushed, so a fresh row includes it
+            if await self._insert(await self._compute(user_id, today)):
+                return
+            # Created meanwhile by another transaction, which can't see it
+            stats, today = await self._locked(user_id)
+        for facts in removed:
+            _apply(stats, facts, -1, today)
+        for facts in added:
+            _apply(stats, facts, 1, today)
+
+    async def recompute(self, user_id: int) -> ContactStats:
+        """
+        Rebuild the statistics of a User from the Contacts themselves.
+
+        Args:
+            user_id: The id of the User who owns the Contacts.
+
+        Returns:
+            The rebuilt ContactStats.
+        """
+        await self.db.execute(delete(ContactStats).filter_by(user_id=user_id))
+        stats = await self._compute(user_id, await self._today())
+        self.db.add(stats)
+        await self.db.commit()
+        return stats
+
+    async def get_stats(self, user_id: int) -> dict:
+        """
+        Get the statistics of the Contacts owned by a User.
+
+        This is a single primary key read. The row is created on first use,
+        which is the only time the Contacts are actually scanned.
+
+        Args:
+            user_id: The id of the User who owns the Contacts.
+
+        Returns:
+            A dict with the total, Contacts per birth month, the most common
+            email domains and the number of Contacts added recently.
+        """
+        stmt = select(ContactStats, func.current_date()).filter_by(user_id=user_id)
+        row = (await self.db.execute(stmt)).one_or_none()
+        if row is None:
+            await self._insert(await self._compute(user_id, await self._today()))
+            await self.db.commit()
+            row = (await self.db.execute(stmt)).one()
+        stats, today = row[0], _as_date(row[1])
+
+        def added_since(days: int) -> int:
+            first_day = (today - timedelta(days=days - 1)).isoformat()
+            return sum(
+                count for day, count in stats.added_per_day.items() if day >= first_day
+            )
+
+        domains = sorted(
+            stats.email_domains.items(), key=lambda item: (-item[1], item[0])
+        )
+        return {
+            "total": stats.total,
+            "birth_months": {
+                month: stats.birth_months.get(str(month), 0) for month in range(1, 13)
+            },
+            "email_domains": [
+                {"domain": domain, "count": count}
+                for domain, count in domains[:TOP_DOMAINS]
+            ],
+            "added_last_7_days": added_since(7),
+            "added_last_30_days": added_since(RECENT_DAYS),
+        }
+
+    async def get_total(self, user_id: int) -> int:
+        """
+        Get the number of Contacts owned by a User.
+
+        Args:
+            user_id: The id of the User who owns the Contacts.
+
+        Returns:
+            The number of Contacts.
+        """
+        stmt = select(ContactStats.total).filter_by(user_id=user_id)
+        total = (await self.db.execute(stmt)).scalar_one_or_none()
+        if total is not None:
+            return total
+        return (await self.get_stats(user_id))["total"]
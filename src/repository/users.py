@@ -1,9 +1,22 @@
-from sqlalchemy import select
+from typing import List
+
+from sqlalchemy import select, func, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.models import User
+from src.database.models import User, clock_now
 from src.schemas.users import UserCreate
 
+# Lookups done on every authenticated request, built once with bound parameters
+_USER_BY_ID = select(User).where(
+    User.id == bindparam("user_id"), User.deleted_at.is_(None)
+)
+_USER_BY_USERNAME = select(User).where(
+    User.username == bindparam("username"), User.deleted_at.is_(None)
+)
+_USER_BY_EMAIL = select(User).where(
+    User.email == bindparam("email"), User.deleted_at.is_(None)
+)
+
 
 class UserRepository:
     def __init__(self, session: AsyncSession):
@@ -19,10 +32,23 @@ class UserRepository:
         Returns:
             The User with the specified id, or None if no such User exists.
         """
-        stmt = select(User).filter_by(id=user_id)
-        user = await self.db.execute(stmt)
+        user = await self.db.execute(_USER_BY_ID, {"user_id": user_id})
         return user.scalar_one_or_none()
 
+    async def get_users_by_ids(self, user_ids: List[int]) -> List[User]:
+        """
+        Get Users by their ids.
+
+        Args:
+            user_ids: The ids of the Users to retrieve.
+
+        Returns:
+            A list of the Users that exist.
+        """
+        stmt = select(User).where(User.id.in_(user_ids), User.deleted_at.is_(None))
+        users = await self.db.execute(stmt)
+        return users.scalars().all()
+
     async def get_user_by_username(self, username: str) -> User | None:
         """
         Get a User by its username.
@@ -33,8 +59,7 @@ class UserRepository:
         Returns:
             The User with the specified username, or None if no such User exists.
         """
-        stmt = select(User).filter_by(username=username)
-        user = await self.db.execute(stmt)
+        user = await self.db.execute(_USER_BY_USERNAME, {"username": username})
         return user.scalar_one_or_none()
 
     async def get_user_by_email(self, email: str) -> User | None:
@@ -47,8 +72,7 @@ class UserRepository:
         Returns:
             The User with the specified email, or None if no such User exists.
         """
-        stmt = select(User).filter_by(email=email)
-        user = await self.db.execute(stmt)
+        user = await self.db.execute(_USER_BY_EMAIL, {"email": email})
         return user.scalar_one_or_none()
 
     async def create_user(self, body: UserCreate, avatar: str = None) -> User:
@@ -85,3 +109,19 @@ class UserRepository:
         user = await self.get_user_by_email(email)
         user.confirmed = True
         await self.db.commit()
+
+    async def delete_user(self, user: User) -> None:
+        """
+        Mark a User as deleted.
+
+        The User and its Contacts are removed later by the purge job, so the
+        cost of deleting an account does not depend on its number of Contacts.
+
+        Args:
+            user: The User to delete.
+
+        Returns:
+            None
+        """
+        user.deleted_at = clock_now()
+        await self.db.commit()
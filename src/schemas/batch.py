@@ -0,0 +1,20 @@
+from typing import Any, Dict, List, Literal
+
+from pydantic import BaseModel, Field
+
+
+class BatchItem(BaseModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+    body: Any = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+
+
+class BatchItemResponse(BaseModel):
+    status: int
+    headers: Dict[str, str]
+    body: Any = None
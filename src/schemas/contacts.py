@@ -1,6 +1,16 @@
+import base64
 from datetime import datetime, date
-from typing import List, Optional, Any, Self
-from pydantic import BaseModel, Field, ConfigDict, EmailStr, field_validator
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Self, Tuple
+from pydantic import (
+    BaseModel,
+    Field,
+    ConfigDict,
+    EmailStr,
+    TypeAdapter,
+    create_model,
+    field_validator,
+)
 
 class ContactBase(BaseModel):
     name: str = Field(min_length=2, max_length=25)
@@ -25,3 +35,68 @@ class ContactResponse(ContactBase):
 
 class ContactBirthdayRequest(BaseModel):
     days: int = Field(ge=0, le=366)
+
+class SyncToken(BaseModel):
+    contacts: Optional[Tuple[datetime, int]] = None
+    deletions: Optional[Tuple[datetime, int]] = None
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(self.model_dump_json().encode()).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "SyncToken":
+        return cls.model_validate_json(base64.urlsafe_b64decode(token.encode()))
+
+class ContactChanges(BaseModel):
+    upserts: List[ContactResponse]
+    deletions: List[int]
+    next: str
+    has_more: bool
+
+class DuplicateGroup(BaseModel):
+    score: float
+    contacts: List[ContactResponse]
+
+class ContactMergeRequest(BaseModel):
+    duplicate_ids: List[int] = Field(min_length=1, max_length=100)
+
+class DomainCount(BaseModel):
+    domain: str
+    count: int
+
+class ContactSuggestion(BaseModel):
+    id: int
+    display_name: str
+
+class ContactStatistics(BaseModel):
+    total: int
+    birth_months: Dict[int, int]
+    email_domains: List[DomainCount]
+    added_last_7_days: int
+    added_last_30_days: int
+
+CONTACT_FIELDS = tuple(ContactResponse.model_fields)
+
+
+@lru_cache(maxsize=None)
+def contact_fields_model(fields: Tuple[str, ...]) -> type[BaseModel]:
+    """
+    Build a response model with a subset of ContactResponse fields.
+
+    Models are cached per field set, `fields` must be in CONTACT_FIELDS order.
+    """
+    return create_model(
+        "ContactResponse_" + "_".join(fields),
+        __config__=ConfigDict(from_attributes=True),
+        **{
+            name: (field.annotation, field)
+            for name, field in ContactResponse.model_fields.items()
+            if name in fields
+        },
+    )
+
+
+@lru_cache(maxsize=None)
+def contact_fields_adapter(fields: Tuple[str, ...], many: bool) -> TypeAdapter:
+    model = contact_fields_model(fields)
+    return TypeAdapter(List[model] if many else model)
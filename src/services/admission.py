@@ -0,0 +1,151 @@
+import json
+import time
+from enum import IntEnum
+from typing import Callable
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.conf import messages
+
+CRITICAL_PREFIXES = ("/api/health", "/api/auth")
+BULK_PREFIXES = ("/api/batch", "/api/contacts/changes", "/api/contacts/duplicates")
+# Long-lived streams would hold a slot for as long as the client listens,
+# probes answer from memory and must not be shed
+EXEMPT_PATHS = ("/api/contacts/events", "/api/health/live", "/api/health/ready")
+
+
+class Priority(IntEnum):
+    CRITICAL = 0
+    INTERACTIVE = 1
+    BULK = 2
+
+
+# Share of the concurrency limit each priority class may fill
+PRIORITY_SHARES = {
+    Priority.CRITICAL: 1.0,
+    Priority.INTERACTIVE: 0.9,
+    Priority.BULK: 0.5,
+}
+
+
+def request_priority(path: str) -> Priority:
+    if path.startswith(CRITICAL_PREFIXES):
+        return Priority.CRITICAL
+    if path.startswith(BULK_PREFIXES):
+        return Priority.BULK
+    return Priority.INTERACTIVE
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to observed latency (AIMD).
+
+    Latencies are averaged over windows of `window` seconds and compared to
+    a baseline, the lowest window average seen, which slowly drifts up so the
+    limiter follows a service that got slower for good. A window more than
+    `tolerance` times the baseline cuts the limit by `backoff`, once per
+    window however many slow requests it had. Otherwise the limit grows by
+    about one per limit's worth of requests. Critical requests, e.g. logins
+    that hash passwords, are slow by design and are left out of the signal.
+
+    Lower priority classes may only fill part of the limit, so they are shed
+    first and higher ones keep some headroom.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        tolerance: float = 2.0,
+        window: float = 1.0,
+        backoff: float = 0.9,
+        drift: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self.window = window
+        self.backoff = backoff
+        self.drift = drift
+        self.clock = clock
+        self.baseline: float | None = None
+        self.in_flight = 0
+        self._window_start = clock()
+        self._window_total = 0.0
+        self._window_count = 0
+
+    def try_acquire(self, priority: Priority) -> bool:
+        if self.in_flight >= max(1, int(self.limit * PRIORITY_SHARES[priority])):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: float, priority: Priority) -> None:
+        self.in_flight -= 1
+        if priority == Priority.CRITICAL:
+            return
+        self._window_total += latency
+        self._window_count += 1
+        now = self.clock()
+        if now - self._window_start < self.window:
+            return
+        average = self._window_total / self._window_count
+        count = self._window_count
+        self._window_start = now
+        self._window_total = 0.0
+        self._window_count = 0
+
+        if self.baseline is None or average < self.baseline:
+            self.baseline = average
+        congested = average > self.baseline * self.tolerance
+        self.baseline += self.drift * (average - self.baseline)
+        if congested:
+            self.limit = max(self.minimum, self.limit * self.backoff)
+        else:
+            self.limit = min(self.maximum, self.limit + count / self.limit)
+
+
+class AdmissionMiddleware:
+    """Shed requests above the adaptive concurrency limit with 503."""
+
+    def __init__(self, app: ASGIApp, limiter: AdaptiveLimiter, retry_after: int):
+        self.app = app
+        self.limiter = limiter
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Sub-requests of a batch run within the slot of the batch request
+        if (
+            scope["type"] != "http"
+            or scope["path"] in EXEMPT_PATHS
+            or "batch_session" in scope
+        ):
+            await self.app(scope, receive, send)
+            return
+        priority = request_priority(scope["path"])
+        if not self.limiter.try_acquire(priority):
+            await self._shed(send)
+            return
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(time.monotonic() - start, priority)
+
+    async def _shed(self, send: Send) -> None:
+        body = json.dumps({"detail": messages.SERVICE_OVERLOADED}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -1,8 +1,9 @@
+import secrets
 from datetime import datetime, timedelta, UTC
 from src.conf import messages
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
@@ -11,6 +12,8 @@ from jose import JWTError, jwt
 from src.database.db import get_db
 from src.conf.config import settings
 from src.services.users import UserService
+from src.services import log
+from src.services.tracing import span, traced
 
 import redis
 
@@ -67,9 +70,17 @@ async def get_email_from_token(token: str):
 r = redis.Redis(host="localhost", port=8000, password=None)
 
 
+@traced
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
 ):
+    # Sub-requests of a batch reuse the user authenticated by the batch request
+    user = request.scope.get("batch_user")
+    if user is not None:
+        log.bind(user_id=user.id)
+        return user
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -77,15 +88,17 @@ async def get_current_user(
     )
     try:
         # Decode JWT
-        payload = jwt.decode(
-            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
-        )
+        with span("jwt decode"):
+            payload = jwt.decode(
+                token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
+            )
         username = payload["sub"]
         if username is None:
             raise credentials_exception
     except JWTError as e:
         raise credentials_exception
-    user = r.get("current_user")
+    with span("redis get current_user"):
+        user = r.get("current_user")
     if user is None:
         user_service = UserService(db)
         user = await user_service.get_user_by_username(username)
@@ -93,4 +106,18 @@ async def get_current_user(
             raise credentials_exception
         await r.set("current_user", user)
         await r.expire("current_user", 3600)
+    log.bind(user_id=user.id)
     return user
+
+
+def is_admin_token(token: str | None) -> bool:
+    admin_token = settings.ADMIN_TOKEN or settings.PROFILE_ADMIN_TOKEN
+    return bool(token and admin_token and secrets.compare_digest(token, admin_token))
+
+
+def require_admin(x_admin_token: str | None = Header(default=None)):
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=messages.ADMIN_TOKEN_REQUIRED,
+        )
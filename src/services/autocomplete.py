@@ -0,0 +1,304 @@
+import asyncio
+import bisect
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.db import sessionmanager
+from src.repository.normalize import normalize_phone
+from src.services.events import ContactEventBroker, broker
+
+_NOT_DIGITS = re.compile(r"\D")
+_PHONE_QUERY = re.compile(r"[\d\s()+-]*\d[\d\s()+-]*")
+_SEPARATOR = "\0"
+# Sorts after any character a term can continue a prefix with
+_LAST_CHAR = chr(0x10FFFF)
+
+
+def contact_terms(name: str, surname: str, email: str, phone: str) -> Tuple[str, ...]:
+    """
+    Get the terms a Contact can be found by while typing.
+
+    These are the words of the name and surname, the email address and the
+    digits of the phone number, both as entered and in E.164 form, so that
+    "050..." and "+38050..." find the same Contact.
+    """
+    terms = set(f"{name} {surname}".casefold().split())
+    terms.add(email.casefold())
+    for number in (phone, normalize_phone(phone)):
+        digits = _NOT_DIGITS.sub("", number or "")
+        if digits:
+            terms.add(digits)
+    return tuple(sorted(terms))
+
+
+def _joined(terms: Tuple[str, ...]) -> str:
+    return "".join(_SEPARATOR + term for term in terms)
+
+
+def query_words(q: str) -> List[str]:
+    """Split a typed query into the prefixes that must all match a Contact."""
+    if _PHONE_QUERY.fullmatch(q.strip()):
+        return [_NOT_DIGITS.sub("", q)]
+    return q.replace(_SEPARATOR, "").casefold().split()
+
+
+class PrefixIndex:
+    """
+    Prefix index of the Contacts of one User.
+
+    Terms are kept in one sorted list of (term, contact_id) pairs, so all
+    Contacts with a term starting with a prefix are a contiguous run found by
+    binary search. Every Contact also keeps its terms joined into one string,
+    each preceded by a NUL, so a term prefix is checked with a single `in`.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[str, int]] = []
+        self._contacts: Dict[int, Tuple[str, str]] = {}
+
+    @classmethod
+    def build(cls, rows: Iterable) -> "PrefixIndex":
+        """
+        Build an index from rows of id, name, surname, email and phone.
+
+        Sorting once is much cheaper than inserting the terms one by one.
+        """
+        index = cls()
+        for contact_id, name, surname, email, phone in rows:
+            terms = contact_terms(name, surname, email, phone)
+            index._contacts[contact_id] = (f"{name} {surname}", _joined(terms))
+            index._entries.extend((term, contact_id) for term in terms)
+        index._entries.sort()
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, contact_id: int, name: str, surname: str, email: str, phone: str):
+        """Add a Contact, replacing its previous terms if it's already indexed."""
+        self.remove(contact_id)
+        terms = contact_terms(name, surname, email, phone)
+        self._contacts[contact_id] = (f"{name} {surname}", _joined(terms))
+        for term in terms:
+            bisect.insort(self._entries, (term, contact_id))
+
+    def remove(self, contact_id: int) -> None:
+        """Remove a Contact, if it's indexed."""
+        contact = self._contacts.pop(contact_id, None)
+        if contact is None:
+            return
+        for term in contact[1].split(_SEPARATOR)[1:]:
+            position = bisect.bisect_left(self._entries, (term, contact_id))
+            if self._entries[position] == (term, contact_id):
+                del self._entries[position]
+
+    def search(self, q: str, limit: int) -> List[dict]:
+        """
+        Find Contacts that have a term starting with every word of a query.
+
+        Args:
+            q: The query as typed so far.
+            limit: The maximum number of Contacts to return.
+
+        Returns:
+            Ids and display names of matching Contacts, ordered by the
+            matching term.
+        """
+        words = query_words(q)
+        if not words or limit <= 0:
+            return []
+        # Walk the shortest run of matching terms, check the other words
+        # against the joined terms of each Contact found
+        runs = []
+        for word in words:
+            start = bisect.bisect_left(self._entries, (word,))
+            end = bisect.bisect_left(self._entries, (word + _LAST_CHAR,), start)
+            runs.append((end - start, start, end, word))
+        _, start, end, first = min(runs)
+        others = [_SEPARATOR + word for word in words if word is not first]
+        suggestions = []
+        seen = set()
+        for position in range(start, end):
+            contact_id = self._entries[position][1]
+            if contact_id in seen:
+                continue
+            seen.add(contact_id)
+            display_name, joined = self._contacts[contact_id]
+            if all(word in joined for word in others):
+                suggestions.append({"id": contact_id, "display_name": display_name})
+                if len(suggestions) == limit:
+                    break
+        return suggestions
+
+
+class AutocompleteIndex:
+    """
+    Per-process prefix indexes of Contacts, one per User, for type-ahead.
+
+    An index is built on the first query of a User, from a session of its
+    own since the build is shared by concurrent requests, and then kept up to
+    date by the contact events the broker dispatches, which include writes
+    made by other workers when the broker fans out through Redis. Indexes are
+    also rebuilt after `ttl` seconds, and evicted least recently used first
+    once they hold more than `max_terms` terms in total.
+    """
+
+    def __init__(
+        self,
+        max_terms: int,
+        ttl: float,
+        session_factory,
+        broker: ContactEventBroker | None = None,
+    ):
+        self.max_terms = max_terms
+        self.ttl = ttl
+        self.session_factory = session_factory
+        self.broker = broker
+        # Users whose events the broker delivers for this index
+        self._watched: Set[int] = set()
+        if broker is not None:
+            broker.add_listener(self.apply)
+        self._indexes: OrderedDict[int, Tuple[PrefixIndex, float]] = OrderedDict()
+        self._loading: Dict[int, asyncio.Future] = {}
+        # Writes seen while an index is being built, so that builds that raced
+        # with a write are not kept
+        self._generations: Dict[int, int] = {}
+        self.hits = 0
+        self.builds = 0
+        self.evictions = 0
+
+    def _get(self, user_id: int) -> PrefixIndex | None:
+        entry = self._indexes.get(user_id)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._indexes[user_id]
+            return None
+        self._indexes.move_to_end(user_id)
+        return entry[0]
+
+    def _shrink(self) -> None:
+        terms = sum(len(index) for index, _ in self._indexes.values())
+        while terms > self.max_terms and len(self._indexes) > 1:
+            _, (index, _) = self._indexes.popitem(last=False)
+            terms -= len(index)
+            self.evictions += 1
+
+    async def search(
+        self,
+        user_id: int,
+        q: str,
+        limit: int,
+        load: Callable[[AsyncSession], Awaitable[Iterable]],
+    ) -> List[dict]:
+        """
+        Find Contacts of a User by the prefix typed so far.
+
+        Args:
+            user_id: The id of the User who owns the Contacts.
+            q: The query as typed so far.
+            limit: The maximum number of Contacts to return.
+            load: Loads rows of id, name, surname, email and phone of all
+                Contacts of the User from a session, used when there is no
+                index yet.
+
+        Returns:
+            Ids and display names of matching Contacts.
+        """
+        index = self._get(user_id)
+        if index is not None:
+            self.hits += 1
+            return index.search(q, limit)
+        loading = self._loading.get(user_id)
+        if loading is None:
+            self._generations[user_id] = 0
+            loading = asyncio.ensure_future(self._build(user_id, load))
+            self._loading[user_id] = loading
+            loading.add_done_callback(lambda _: self._done(user_id))
+        index = await asyncio.shield(loading)
+        return index.search(q, limit)
+
+    def _done(self, user_id: int) -> None:
+        self._loading.pop(user_id, None)
+        self._generations.pop(user_id, None)
+
+    async def _watch(self, user_id: int) -> None:
+        if self.broker is None:
+            return
+        # Stop receiving events of Users whose index has been evicted
+        for watched in self._watched - {user_id}:
+            if watched not in self._indexes and watched not in self._loading:
+                self._watched.discard(watched)
+                await self.broker.unwatch(watched)
+        if user_id not in self._watched:
+            self._watched.add(user_id)
+            await self.broker.watch(user_id)
+
+    async def _build(self, user_id: int, load) -> PrefixIndex:
+        generation = self._generations[user_id]
+        # Watch before loading, so writes made meanwhile discard the build
+        await self._watch(user_id)
+        async with self.session_factory() as session:
+            rows = await load(session)
+        # Sorting a large address book is CPU bound, keep the event loop free
+        index = await asyncio.to_thread(PrefixIndex.build, rows)
+        self.builds += 1
+        if self._generations.get(user_id, 0) == generation:
+            self._indexes[user_id] = (index, time.monotonic() + self.ttl)
+            self._shrink()
+        return index
+
+    def apply(self, user_id: int, event: dict) -> None:
+        """
+        Apply a contact event to the index of its User, if there is one.
+
+        Args:
+            user_id: The id of the User who owns the Contact.
+            event: A contact event, as published to the event broker.
+        """
+        if user_id in self._generations:
+            self._generations[user_id] += 1
+        entry = self._indexes.get(user_id)
+        if entry is None:
+            return
+        index = entry[0]
+        if event["type"] == "deleted":
+            index.remove(event["id"])
+        else:
+            contact = event["contact"]
+            index.add(
+                event["id"],
+                contact["name"],
+                contact["surname"],
+                contact["email"],
+                contact["phone"],
+            )
+            self._shrink()
+
+    def clear(self) -> None:
+        """Drop all indexes."""
+        for user_id in self._generations:
+            self._generations[user_id] += 1
+        self._indexes.clear()
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._indexes),
+            "terms": sum(len(index) for index, _ in self._indexes.values()),
+            "hits": self.hits,
+            "builds": self.builds,
+            "evictions": self.evictions,
+        }
+
+
+autocomplete_index = AutocompleteIndex(
+    settings.AUTOCOMPLETE_MAX_TERMS,
+    settings.AUTOCOMPLETE_TTL_SECONDS,
+    sessionmanager.session,
+    broker,
+)
@@ -0,0 +1,49 @@
+import argparse
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.db import contact_sessions, sessionmanager
+from src.repository.backfill import ContactBackfillRepository
+
+
+class ContactBackfillService:
+    def __init__(self, db: AsyncSession):
+        self.shards = [
+            ContactBackfillRepository(session) for session in contact_sessions(db)
+        ]
+
+    async def normalize(self, chunk_size: int, pause: float) -> int:
+        """
+        Fill normalized phone and email of all Contacts, pausing between chunks.
+
+        Args:
+            chunk_size: The maximum number of Contacts updated per transaction.
+            pause: Seconds to wait between chunks.
+
+        Returns:
+            The number of processed chunks.
+        """
+        chunks = 0
+        for shard in self.shards:
+            last_id = 0
+            while (last_id := await shard.normalize_contacts(last_id, chunk_size)):
+                chunks += 1
+                await asyncio.sleep(pause)
+        return chunks
+
+
+async def run_backfill(chunk_size: int, pause: float) -> int:
+    async with sessionmanager.session() as session:
+        return await ContactBackfillService(session).normalize(chunk_size, pause)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fill normalized phone numbers and emails of existing contacts"
+    )
+    parser.add_argument("--chunk-size", type=int, default=settings.PURGE_CHUNK_SIZE)
+    parser.add_argument("--pause", type=float, default=settings.PURGE_PAUSE_SECONDS)
+    args = parser.parse_args()
+    print(asyncio.run(run_backfill(args.chunk_size, args.pause)))
@@ -0,0 +1,155 @@
+import json
+import logging
+from typing import List
+from urllib.parse import urlencode
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import ASGIApp, Scope
+
+from src.database.models import User
+from src.schemas.batch import BatchItem, BatchItemResponse
+from src.services.tracing import traceparent
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_PREFIXES = ("/api/contacts", "/api/users")
+# Streaming endpoints never finish, so they can't be part of a batch
+DENIED_PATHS = ("/api/contacts/events",)
+
+
+def is_batchable(path: str) -> bool:
+    """
+    Check whether a path may be requested as part of a batch.
+
+    Args:
+        path: The path of the sub-request, without query string.
+
+    Returns:
+        True for contact and user endpoints that produce a finite response.
+    """
+    path = path.rstrip("/")
+    return (
+        any(path == p or path.startswith(p + "/") for p in ALLOWED_PREFIXES)
+        and path not in DENIED_PATHS
+    )
+
+
+class BatchService:
+    def __init__(self, app: ASGIApp, scope: Scope, db: AsyncSession, user: User):
+        """
+        Initialize a BatchService.
+
+        Args:
+            app: The application that sub-requests are dispatched to.
+            scope: The ASGI scope of the batch request.
+            db: The session shared by all sub-requests.
+            user: The User authenticated by the batch request.
+        """
+        self.app = app
+        self.scope = scope
+        self.db = db
+        self.user = user
+
+    def _scope(self, item: BatchItem, body: bytes) -> Scope:
+        headers = [
+            (name, value)
+            for name, value in self.scope["headers"]
+            if name in (b"authorization", b"user-agent", b"accept-language")
+        ]
+        # Sub-requests are children of the batch request's trace
+        parent = traceparent()
+        if parent is not None:
+            headers.append((b"traceparent", parent.encode()))
+        headers.append((b"content-type", b"application/json"))
+        headers.append((b"content-length", str(len(body)).encode()))
+        return {
+            "type": "http",
+            "asgi": self.scope.get("asgi", {"version": "3.0"}),
+            "http_version": self.scope.get("http_version", "1.1"),
+            "scheme": self.scope.get("scheme", "http"),
+            "server": self.scope.get("server"),
+            "client": self.scope.get("client"),
+            "root_path": self.scope.get("root_path", ""),
+            "method": item.method,
+            "path": item.path,
+            "raw_path": item.path.encode(),
+            "query_string": urlencode(item.params, doseq=True).encode(),
+            "headers": headers,
+            "state": dict(self.scope.get("state", {})),
+            "batch_session": self.db,
+            "batch_user": self.user,
+        }
+
+    async def _recover(self) -> None:
+        # Roll back what the failed sub-request left pending, then reload the
+        # User, which the rollback expired, for the sub-requests after it
+        for shard in self.db.info.get("shards", {}).values():
+            await shard.rollback()
+        await self.db.rollback()
+        if self.user in self.db:
+            await self.db.refresh(self.user)
+
+    async def dispatch(self, item: BatchItem) -> BatchItemResponse:
+        """
+        Run one sub-request through the application and capture its response.
+
+        Args:
+            item: The sub-request.
+
+        Returns:
+            The status, headers and decoded body of the response.
+        """
+        body = b"" if item.body is None else json.dumps(item.body).encode()
+        received = False
+        response = {"status": 500, "headers": {}, "body": b""}
+
+        async def receive():
+            nonlocal received
+            if received:
+                return {"type": "http.disconnect"}
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = {
+                    name.decode(): value.decode()
+                    for name, value in message.get("headers", ())
+                    if name.lower() != b"content-length"
+                }
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+
+        try:
+            await self.app(self._scope(item, body), receive, send)
+        except Exception:
+            # The error response has been sent by the application already
+            logger.exception("Batch sub-request failed")
+        if response["status"] >= 500:
+            await self._recover()
+
+        content = response["body"]
+        if content and response["headers"].get("content-type", "").startswith(
+            "application/json"
+        ):
+            content = json.loads(content)
+        elif content:
+            content = content.decode()
+        else:
+            content = None
+        return BatchItemResponse(
+            status=response["status"], headers=response["headers"], body=content
+        )
+
+    async def run(self, items: List[BatchItem]) -> List[BatchItemResponse]:
+        """
+        Run sub-requests one after another on the shared session.
+
+        Args:
+            items: The sub-requests, in the order they should run.
+
+        Returns:
+            One response per sub-request, in the same order.
+        """
+        return [await self.dispatch(item) for item in items]
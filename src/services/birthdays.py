@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.db import contact_sessions, sessionmanager
+from src.repository.birthdays import BirthdayDigestRepository, next_birthday
+from src.repository.jobs import JobRunRepository
+from src.services.email import send_birthday_digest
+from src.services.users import UserService
+
+logger = logging.getLogger(__name__)
+
+
+class BirthdayDigestService:
+    def __init__(self, db: AsyncSession):
+        self.user_service = UserService(db)
+        self.repositories = [
+            BirthdayDigestRepository(session) for session in contact_sessions(db)
+        ]
+
+    async def refresh(self, today: date = None):
+        changed = 0
+        for repository in self.repositories:
+            changed += await repository.refresh(today)
+        return changed
+
+    async def send_digests(self, days: int, today: date = None):
+        today = today or date.today()
+        sent = 0
+        for repository in self.repositories:
+            digests = await repository.get_digests(days, today)
+            users = await self.user_service.get_users_by_ids(list(digests))
+            for user in users:
+                if not user.confirmed:
+                    continue
+                await send_birthday_digest(
+                    user.email,
+                    user.username,
+                    days,
+                    [
+                        {
+                            "name": contact.name,
+                            "surname": contact.surname,
+                            "date": next_birthday(contact.birthday, today).isoformat(),
+                        }
+                        for contact in digests[user.id]
+                    ],
+                )
+                sent += 1
+        return sent
+
+
+async def run_birthday_digest(send_emails: bool = False, today: date = None):
+    """
+    Refresh the birthday digest of all users and optionally email it.
+
+    Args:
+        send_emails: Whether to send digest emails after the refresh.
+        today: The date to count from, defaults to the current date.
+    """
+    async with sessionmanager.session() as session:
+        service = BirthdayDigestService(session)
+        await service.refresh(today)
+        if send_emails:
+            await service.send_digests(settings.BIRTHDAY_DIGEST_DAYS, today)
+
+
+async def claim_run(name: str, day: date) -> bool:
+    """Claim a daily job for this worker, False if another one already has."""
+    async with sessionmanager.session() as session:
+        return await JobRunRepository(session).claim(name, day)
+
+
+async def refresh_birthday_digest():
+    """
+    Refresh the birthday digest without sending emails, logging any failure.
+
+    Run in the background at startup by one worker a day, to add rows for
+    Contacts created before the digest existed. Reads roll stale rows forward
+    by themselves.
+    """
+    try:
+        if await claim_run("birthday_digest_refresh", date.today()):
+            await run_birthday_digest()
+    except Exception:
+        logger.exception("Birthday digest refresh failed")
+
+
+async def birthday_digest_scheduler(hour: int):
+    """
+    Run the birthday digest job once a day at the given hour.
+
+    Every worker runs the scheduler, but only the one that claims the day
+    runs the job, so digest emails are sent once.
+
+    Args:
+        hour: The local hour (0-23) to run the job at.
+    """
+    while True:
+        now = datetime.now()
+        run_at = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        await asyncio.sleep((run_at - now).total_seconds())
+        try:
+            if await claim_run("birthday_digest", date.today()):
+                await run_birthday_digest(settings.BIRTHDAY_DIGEST_EMAILS)
+        except Exception:
+            logger.exception("Birthday digest run failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the birthday digest")
+    parser.add_argument("--send-emails", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run_birthday_digest(args.send_emails))
@@ -0,0 +1,326 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import redis.asyncio
+
+from src.conf.config import settings
+from src.schemas.contacts import ContactResponse
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[int, int]
+# Left in the shared tier by invalidations, reads treat it as a miss
+TOMBSTONE = b""
+
+
+class LocalOnlyCacheBackend:
+    """
+    No shared tier, used when no Redis is configured.
+
+    Invalidations only reach the current process, so other workers may serve
+    a stale Contact for as long as the short local TTL.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[str], None]] = []
+
+    async def get(self, key: str) -> bytes | None:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        pass
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return False
+
+    async def publish(self, message: str) -> None:
+        for callback in list(self._subscribers):
+            callback(message)
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str], None]) -> None:
+        self._subscribers.remove(callback)
+
+
+class InMemoryCacheBackend:
+    """
+    Shared tier and invalidation channel kept in process memory.
+
+    A test fake for Redis: several ContactCache instances attached to one
+    backend behave like separate workers.
+    """
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[bytes, float]] = {}
+        self._subscribers: List[Callable[[str], None]] = []
+
+    async def get(self, key: str) -> bytes | None:
+        value = self._values.get(key)
+        if value is None or value[1] <= time.monotonic():
+            self._values.pop(key, None)
+            return None
+        return value[0]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._values[key] = (value, time.monotonic() + ttl)
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        if await self.get(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    def clear(self) -> None:
+        self._values.clear()
+
+    async def publish(self, message: str) -> None:
+        for callback in list(self._subscribers):
+            callback(message)
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str], None]) -> None:
+        self._subscribers.remove(callback)
+
+
+class RedisCacheBackend:
+    """Shared tier in Redis, with invalidations fanned out over pub/sub."""
+
+    channel = "contact-cache:invalidate"
+
+    def __init__(self, url: str):
+        self.redis = redis.asyncio.from_url(url)
+        self._subscribers: List[Callable[[str], None]] = []
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.redis.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.redis.set(key, value, px=int(ttl * 1000))
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(await self.redis.set(key, value, px=int(ttl * 1000), nx=True))
+
+    async def publish(self, message: str) -> None:
+        await self.redis.publish(self.channel, message)
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str], None]) -> None:
+        self._subscribers.remove(callback)
+
+    async def listen(self) -> None:
+        """Pass invalidations published by any worker to local subscribers."""
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        while True:
+            message = await pubsub.get_message(timeout=None)
+            if message is None:
+                continue
+            for callback in list(self._subscribers):
+                callback(message["data"].decode())
+
+
+class ContactCache:
+    """
+    Two-tier read-through cache of single Contacts keyed by (user_id, contact_id).
+
+    The first tier is a per-process LRU with a short TTL, the second one is
+    shared by all workers. Writers invalidate both tiers and broadcast the
+    key so that other workers drop their local copy. Concurrent misses of one
+    key are served by a single load.
+
+    Invalidation leaves a tombstone in the shared tier for `tombstone_ttl`
+    seconds, and loads only fill the shared tier if the key is empty. A
+    worker that read the Contact before a write on another worker, and
+    hasn't received the invalidation yet, can't put the old Contact back.
+    The tombstone must outlive the slowest load.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_size: int,
+        local_ttl: float,
+        ttl: float,
+        tombstone_ttl: float = 30,
+    ):
+        self.max_size = max_size
+        self.local_ttl = local_ttl
+        self.ttl = ttl
+        self.tombstone_ttl = tombstone_ttl
+        self._local: OrderedDict[CacheKey, Tuple[ContactResponse, float]] = (
+            OrderedDict()
+        )
+        self._loading: Dict[CacheKey, asyncio.Future] = {}
+        # Bumped on every invalidation, so loads that raced with a write are
+        # not stored
+        self._generations: Dict[CacheKey, int] = {}
+        self.hits = {"local": 0, "remote": 0}
+        self.misses = 0
+        self.invalidations = 0
+        self.backend = None
+        self.attach(backend)
+
+    def attach(self, backend) -> None:
+        """Use `backend` as the shared tier and invalidation channel."""
+        if self.backend is not None:
+            self.backend.unsubscribe(self._on_invalidate)
+        self.backend = backend
+        backend.subscribe(self._on_invalidate)
+
+    @staticmethod
+    def _remote_key(key: CacheKey) -> str:
+        return f"contact:{key[0]}:{key[1]}"
+
+    def _get_local(self, key: CacheKey) -> ContactResponse | None:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return entry[0]
+
+    def _set_local(self, key: CacheKey, contact: ContactResponse) -> None:
+        self._local[key] = (contact, time.monotonic() + self.local_ttl)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    def _evict(self, key: CacheKey) -> None:
+        self._local.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def _on_invalidate(self, message: str) -> None:
+        user_id, contact_id = message.split(":")
+        self._evict((int(user_id), int(contact_id)))
+
+    async def get(
+        self,
+        user_id: int,
+        contact_id: int,
+        load: Callable[[], Awaitable[object | None]],
+    ) -> ContactResponse | None:
+        """
+        Get a Contact from the cache, loading it on a miss.
+
+        Args:
+            user_id: The id of the owner of the Contact.
+            contact_id: The id of the Contact.
+            load: Loads the Contact from the database, None if it doesn't exist.
+
+        Returns:
+            The Contact, or None if it doesn't exist.
+        """
+        key = (user_id, contact_id)
+        contact = self._get_local(key)
+        if contact is not None:
+            self.hits["local"] += 1
+            return contact
+        loading = self._loading.get(key)
+        if loading is not None:
+            return await asyncio.shield(loading)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            contact = await self._load(key, load)
+            future.set_result(contact)
+            return contact
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the exception, this keeps it from being logged twice
+            future.exception()
+            raise
+        finally:
+            del self._loading[key]
+
+    async def _load(self, key: CacheKey, load) -> ContactResponse | None:
+        generation = self._generations.get(key, 0)
+        try:
+            cached = await self.backend.get(self._remote_key(key))
+        except redis.RedisError:
+            logger.exception("Contact cache read failed")
+            cached = None
+        if cached:
+            self.hits["remote"] += 1
+            contact = ContactResponse.model_validate_json(cached)
+        else:
+            self.misses += 1
+            loaded = await load()
+            if loaded is None:
+                return None
+            contact = ContactResponse.model_validate(loaded)
+            if self._generations.get(key, 0) == generation:
+                try:
+                    await self.backend.add(
+                        self._remote_key(key), contact.model_dump_json(), self.ttl
+                    )
+                except redis.RedisError:
+                    logger.exception("Contact cache write failed")
+        if self._generations.get(key, 0) == generation:
+            self._set_local(key, contact)
+        return contact
+
+    async def invalidate(self, user_id: int, contact_id: int) -> None:
+        """
+        Drop a Contact from both tiers and from other workers' local tiers.
+
+        Args:
+            user_id: The id of the owner of the Contact.
+            contact_id: The id of the Contact.
+        """
+        key = (user_id, contact_id)
+        self.invalidations += 1
+        self._evict(key)
+        try:
+            await self.backend.set(self._remote_key(key), TOMBSTONE, self.tombstone_ttl)
+            await self.backend.publish(f"{user_id}:{contact_id}")
+        except redis.RedisError:
+            logger.exception("Contact cache invalidation failed")
+
+    def clear(self) -> None:
+        """Drop everything from the local tier."""
+        for key in list(self._local):
+            self._evict(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits["local"] + self.hits["remote"] + self.misses
+        return {
+            "local_hits": self.hits["local"],
+            "remote_hits": self.hits["remote"],
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": (lookups - self.misses) / lookups if lookups else 0.0,
+            "local_size": len(self._local),
+        }
+
+
+if settings.CONTACT_CACHE_REDIS_URL:
+    backend = RedisCacheBackend(settings.CONTACT_CACHE_REDIS_URL)
+else:
+    backend = LocalOnlyCacheBackend()
+
+contact_cache = (
+    ContactCache(
+        backend,
+        settings.CONTACT_CACHE_SIZE,
+        settings.CONTACT_CACHE_LOCAL_TTL_SECONDS,
+        settings.CONTACT_CACHE_TTL_SECONDS,
+        settings.CONTACT_CACHE_TOMBSTONE_SECONDS,
+    )
+    if settings.CONTACT_CACHE_ENABLED
+    else None
+)
@@ -0,0 +1,263 @@
+import time
+import zlib
+from typing import Dict, List, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional, served only when installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional, served only when installed
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "text/",
+    "application/javascript",
+    "application/xml",
+)
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# Preferred first, with (normal, fast) levels
+ENCODERS: Dict[str, Tuple[type, Tuple[int, int]]] = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = (ZstdEncoder, (3, 1))
+if brotli is not None:
+    ENCODERS["br"] = (BrotliEncoder, (5, 1))
+ENCODERS["gzip"] = (GzipEncoder, (6, 1))
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """
+    Pick the preferred encoding the client accepts.
+
+    Args:
+        accept_encoding: The value of the Accept-Encoding header.
+
+    Returns:
+        The name of the encoding, or None to send the response as is.
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for name in ENCODERS:
+        if accepted.get(name, accepted.get("*", 0)) > 0:
+            return name
+    return None
+
+
+class CompressionGovernor:
+    """
+    Choose the compression effort from the CPU load of this process.
+
+    The load is the share of wall time the process spent on CPU, sampled at
+    most every `interval` seconds and smoothed, so asking costs two clock
+    reads. Under high load the fast level is used, under critical load
+    responses are sent uncompressed.
+    """
+
+    NORMAL, FAST, OFF = 0, 1, 2
+
+    def __init__(self, high: float, critical: float, interval: float = 1.0):
+        self.high = high
+        self.critical = critical
+        self.interval = interval
+        self.load = 0.0
+        self._wall = time.monotonic()
+        self._cpu = time.process_time()
+
+    def _sample(self) -> None:
+        wall = time.monotonic()
+        if wall - self._wall < self.interval:
+            return
+        cpu = time.process_time()
+        current = (cpu - self._cpu) / (wall - self._wall)
+        self.load = 0.7 * self.load + 0.3 * current
+        self._wall, self._cpu = wall, cpu
+
+    def effort(self) -> int:
+        self._sample()
+        if self.load >= self.critical:
+            return self.OFF
+        if self.load >= self.high:
+            return self.FAST
+        return self.NORMAL
+
+
+class CompressionMiddleware:
+    """
+    Compress compressible responses with zstd, brotli or gzip.
+
+    Bodies sent in one piece are compressed only from `min_size` bytes on.
+    Streaming bodies are compressed chunk by chunk and flushed after every
+    chunk, so streamed events are not held back.
+    """
+
+    def __init__(self, app: ASGIApp, min_size: int, governor: CompressionGovernor):
+        self.app = app
+        self.min_size = min_size
+        self.governor = governor
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+        encoding = negotiate(accept) if accept else None
+        effort = self.governor.effort() if encoding else CompressionGovernor.OFF
+        if effort == CompressionGovernor.OFF or scope["method"] == "HEAD":
+            encoding = None
+        responder = _CompressingResponder(send, encoding, effort, self.min_size)
+        await self.app(scope, receive, responder)
+
+
+def _add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    # Merged into an existing Vary, which may already cover Accept-Encoding
+    for index, (name, value) in enumerate(headers):
+        if name.lower() != b"vary":
+            continue
+        fields = [field.strip().lower() for field in value.split(b",")]
+        if b"*" in fields or b"accept-encoding" in fields:
+            return headers
+        headers = list(headers)
+        headers[index] = (name, value + b", Accept-Encoding")
+        return headers
+    return [*headers, (b"vary", b"Accept-Encoding")]
+
+
+class _CompressingResponder:
+    """
+    Compress a response if its type allows and `encoding` is set.
+
+    Responses of a compressible type carry Vary: Accept-Encoding even when
+    they are sent as is, for a small body, under load or to a client without
+    a usable Accept-Encoding, so shared caches keep the variants apart.
+    """
+
+    def __init__(self, send: Send, encoding: str | None, effort: int, min_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.effort = effort
+        self.min_size = min_size
+        self.start: Message | None = None
+        self.encoder = None
+        self.passthrough = False
+
+    def _compressible(self, headers: List[Tuple[bytes, bytes]]) -> bool:
+        content_type = b""
+        for name, value in headers:
+            if name.lower() == b"content-encoding":
+                return False
+            if name.lower() == b"content-type":
+                content_type = value
+        return content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES)
+
+    def _start(self, length: int | None) -> Message:
+        headers = [
+            (name, value)
+            for name, value in self.start.get("headers", ())
+            if name.lower() != b"content-length"
+        ]
+        headers.append((b"content-encoding", self.encoding.encode()))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode()))
+        return dict(self.start, headers=headers)
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = message.get("headers", [])
+            compressible = self._compressible(headers)
+            if message["status"] in (204, 304):
+                compressible = False
+            if compressible:
+                message = dict(message, headers=_add_vary(headers))
+            self.start = message
+            self.passthrough = not compressible or self.encoding is None
+            if self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        encoder_class, levels = ENCODERS[self.encoding]
+        if self.encoder is None:
+            if not more_body:
+                # Whole body at once
+                if len(body) < self.min_size:
+                    await self.send(self.start)
+                    await self.send(message)
+                    return
+                encoder = encoder_class(levels[self.effort])
+                compressed = encoder.compress(body) + encoder.finish()
+                await self.send(self._start(len(compressed)))
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            self.encoder = encoder_class(levels[self.effort])
+            await self.send(self._start(None))
+        if more_body:
+            chunk = self.encoder.compress(body) + self.encoder.flush()
+        else:
+            chunk = self.encoder.compress(body) + self.encoder.finish()
+        await self.send(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
@@ -1,31 +1,146 @@
+import asyncio
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.models import User
+from src.conf.config import settings
+from src.database.models import Contact, User
 from src.repository.contacts import ContactRepository
 from src.schemas.contacts import ContactBase, ContactResponse
+from src.services import events
+from src.services.autocomplete import autocomplete_index
+from src.services.cache import ContactCache, contact_cache
+from src.services.duplicates import find_duplicates
+from src.services.tracing import traced
 
 
+@traced
 class ContactService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, cache: ContactCache | None = contact_cache):
         self.contact_repository = ContactRepository(db)
+        self.cache = cache
+
+    @staticmethod
+    async def _publish(
+        event_type: str, user_id: int, contact_id: int, contact: Contact = None
+    ) -> None:
+        event = {"type": event_type, "id": contact_id}
+        if contact is not None:
+            event["contact"] = ContactResponse.model_validate(contact).model_dump(
+                mode="json"
+            )
+        await events.broker.publish(user_id, event)
 
     async def create_contact(self, body: ContactBase, user: User):
-        return await self.contact_repository.create_contact(body, user)
+        contact = await self.contact_repository.create_contact(body, user)
+        await self._publish("created", user.id, contact.id, contact)
+        return contact
+
+    async def get_contacts(self, skip: int, limit: int, user: User, fields=None):
+        return await self.contact_repository.get_contacts(skip, limit, user, fields)
 
-    async def get_contacts(self, skip: int, limit: int, user: User):
-        return await self.contact_repository.get_contacts(skip, limit, user)
+    async def get_contact(self, contact_id: int, user: User, fields=None):
+        if self.cache is None:
+            return await self.contact_repository.get_contact_by_id(
+                contact_id, user, fields
+            )
+        # The whole Contact is cached, requested fields are picked on render
+        return await self.cache.get(
+            user.id,
+            contact_id,
+            lambda: self.contact_repository.get_contact_by_id(contact_id, user),
+        )
 
-    async def get_contact(self, contact_id: int, user: User):
-        return await self.contact_repository.get_contact_by_id(contact_id, user)
+    async def lookup_contacts(self, user: User, phone=None, email=None, fields=None):
+        return await self.contact_repository.lookup_contacts(
+            user, phone, email, fields
+        )
 
-    async def search_contact(self, q: str, skip: int, limit: int, user: User):
-        return await self.contact_repository.search_contact(q, skip, limit, user)
+    async def search_contact(
+        self, q: str, skip: int, limit: int, user: User, fields=None
+    ):
+        return await self.contact_repository.search_contact(
+            q, skip, limit, user, fields
+        )
+
+    async def autocomplete(self, q: str, limit: int, user: User):
+        return await autocomplete_index.search(
+            user.id,
+            q,
+            limit,
+            lambda db: ContactRepository(db).get_autocomplete_rows(user),
+        )
 
     async def update_contact(self, contact_id: int, body: ContactBase, user: User):
-        return await self.contact_repository.update_contact(contact_id, body, user)
+        contact = await self.contact_repository.update_contact(contact_id, body, user)
+        if self.cache is not None:
+            await self.cache.invalidate(user.id, contact_id)
+        if contact is not None:
+            await self._publish("updated", user.id, contact_id, contact)
+        return contact
 
     async def delete_contact(self, contact_id: int, user: User):
-        return await self.contact_repository.delete_contact(contact_id, user)
+        contact = await self.contact_repository.delete_contact(contact_id, user)
+        if self.cache is not None:
+            await self.cache.invalidate(user.id, contact_id)
+        if contact is not None:
+            await self._publish("deleted", user.id, contact_id)
+        return contact
+
+    async def find_duplicates(self, user: User, limit: int):
+        candidates = await self.contact_repository.get_duplicate_candidates(user)
+        # Matching is CPU bound, keep the event loop responsive for large books
+        groups = await asyncio.to_thread(
+            find_duplicates,
+            candidates,
+            settings.DUPLICATES_MIN_SCORE,
+            settings.DUPLICATES_MAX_BLOCK_SIZE,
+        )
+        groups = groups[:limit]
+        contacts = await self.contact_repository.get_contacts_by_ids(
+            [contact_id for ids, _ in groups for contact_id in ids], user
+        )
+        by_id = {contact.id: contact for contact in contacts}
+        return [
+            {"score": score, "contacts": [by_id[i] for i in ids if i in by_id]}
+            for ids, score in groups
+        ]
+
+    async def merge_contacts(self, contact_id: int, duplicate_ids, user: User):
+        contact = await self.contact_repository.merge_contacts(
+            contact_id, duplicate_ids, user
+        )
+        if contact is None:
+            return None
+        if self.cache is not None:
+            for merged_id in {contact_id, *duplicate_ids}:
+                await self.cache.invalidate(user.id, merged_id)
+        for duplicate_id in sorted(set(duplicate_ids) - {contact_id}):
+            await self._publish("deleted", user.id, duplicate_id)
+        await self._publish("updated", user.id, contact_id, contact)
+        return contact
+
+    async def get_birthdays(
+        self, days: int, skip: int, limit: int, user: User, fields=None
+    ):
+        return await self.contact_repository.get_birthdays(
+            days, skip, limit, user, fields
+        )
+
+    async def count_contacts(self, user: User):
+        return await self.contact_repository.count_contacts(user)
+
+    async def get_stats(self, user: User):
+        return await self.contact_repository.get_stats(user)
+
+    async def count_search(self, q: str, user: User, bound: int):
+        return await self.contact_repository.count_search(q, user, bound)
+
+    async def count_birthdays(self, days: int, user: User, bound: int):
+        return await self.contact_repository.count_birthdays(days, user, bound)
 
-    async def get_birthdays(self, days: int, skip: int, limit: int, user: User):
-        return await self.contact_repository.get_birthdays(days, skip, limit, user)
+    async def get_changes(
+        self, user: User, since, lag: int, limit: int, retention: int = None
+    ):
+        return await self.contact_repository.get_changes(
+            user, since, lag, limit, retention
+        )
@@ -0,0 +1,157 @@
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Tuple
+
+from src.repository.contacts import Candidate
+
+# fmt: off
+SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"), "l": "4", **dict.fromkeys("mn", "5"), "r": "6",
+}
+# fmt: on
+
+# Transliteration of Ukrainian letters, so that phonetic keys also work for
+# names written in Cyrillic
+TRANSLIT = str.maketrans(
+    {
+        **dict(zip("абвгґдезиіїйклмнопрстуфцчшщ", "abvhgdeziiiiklmnoprstufccss")),
+        **{"є": "ie", "ж": "zh", "х": "kh", "ю": "iu", "я": "ia", "ь": "", "'": ""},
+    }
+)
+
+
+def soundex(word: str) -> str:
+    """
+    Get the American Soundex code of a word, e.g. "R163" for "Robert".
+
+    Returns an empty string for words without latin letters.
+    """
+    letters = [c for c in word.lower().translate(TRANSLIT) if "a" <= c <= "z"]
+    if not letters:
+        return ""
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0], "")
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if letter not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def email_local_part(email: str) -> str:
+    """Get the mailbox of an email, without "+tags" and dots."""
+    local = email.split("@", 1)[0].split("+", 1)[0]
+    return local.replace(".", "")
+
+
+def blocking_keys(candidate: Candidate) -> List[Tuple[str, str]]:
+    """
+    Get the keys of the blocks a Contact is compared within.
+
+    Only Contacts that share at least one key are ever compared.
+    """
+    keys = []
+    if candidate.phone_normalized:
+        keys.append(("phone", candidate.phone_normalized))
+    if candidate.email_normalized:
+        keys.append(("email", email_local_part(candidate.email_normalized)))
+    surname = soundex(candidate.surname)
+    if surname:
+        keys.append(("surname", surname + candidate.name[:1].lower()))
+    return keys
+
+
+def similarity(a: Candidate, b: Candidate, min_score: float = 0) -> float:
+    """
+    Score how likely two Contacts are the same person, from 0 to 1.
+
+    The full name is compared fuzzily, equal phone numbers, emails and
+    birthdays add to the score. The same name and birthday are enough for a
+    match, a shared phone number or email alone is not.
+
+    Pairs that can't reach `min_score` score 0 without the costly fuzzy name
+    comparison.
+    """
+    score = 0.0
+    if a.phone_normalized and a.phone_normalized == b.phone_normalized:
+        score += 0.2
+    if a.email_normalized and a.email_normalized == b.email_normalized:
+        score += 0.2
+    elif a.email_normalized and b.email_normalized:
+        if email_local_part(a.email_normalized) == email_local_part(b.email_normalized):
+            score += 0.1
+    if a.birthday is not None and a.birthday == b.birthday:
+        score += 0.2
+    if score + 0.5 < min_score:
+        return 0.0
+    name_a = f"{a.name} {a.surname}".lower()
+    name_b = f"{b.name} {b.surname}".lower()
+    score += 0.5 * SequenceMatcher(None, name_a, name_b).ratio()
+    return round(min(score, 1.0), 3)
+
+
+def find_duplicates(
+    candidates: Iterable[Candidate], min_score: float, max_block_size: int
+) -> List[Tuple[List[int], float]]:
+    """
+    Group Contacts that are likely the same person.
+
+    Contacts are only compared within blocks of a shared blocking key, which
+    keeps the work near linear in the number of Contacts. Blocks larger than
+    `max_block_size` (e.g. a shared office phone) are not compared at all.
+    Pairs scoring at least `min_score` are joined into groups.
+
+    Args:
+        candidates: The Contacts of one User.
+        min_score: The minimal similarity of a duplicate pair.
+        max_block_size: The maximal number of Contacts compared in one block.
+
+    Returns:
+        Groups of Contact ids with their best pair score, best first.
+    """
+    by_id: Dict[int, Candidate] = {}
+    blocks: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for candidate in candidates:
+        by_id[candidate.id] = candidate
+        for key in blocking_keys(candidate):
+            blocks[key].append(candidate.id)
+
+    parent = {}
+
+    def find(contact_id: int) -> int:
+        root = contact_id
+        while parent.get(root, root) != root:
+            root = parent[root]
+        parent[contact_id] = root
+        return root
+
+    compared = set()
+    best: Dict[int, float] = {}
+    for ids in blocks.values():
+        if len(ids) < 2 or len(ids) > max_block_size:
+            continue
+        for i, first in enumerate(ids):
+            for second in ids[i + 1 :]:
+                if (first, second) in compared:
+                    continue
+                compared.add((first, second))
+                score = similarity(by_id[first], by_id[second], min_score)
+                if score < min_score:
+                    continue
+                root_a, root_b = find(first), find(second)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+                    score = max(score, best.pop(root_b, 0))
+                best[root_a] = max(score, best.get(root_a, 0))
+
+    groups = defaultdict(list)
+    for contact_id in parent:
+        groups[find(contact_id)].append(contact_id)
+    result = [(sorted(ids), best[root]) for root, ids in groups.items()]
+    result.sort(key=lambda group: (-group[1], group[0][0]))
+    return result
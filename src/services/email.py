@@ -1,3 +1,4 @@
+import logging
 from pathlib import Path
 
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
@@ -6,6 +7,9 @@ from pydantic import EmailStr
 
 from src.services.auth import create_email_token
 from src.conf.config import settings
+from src.services.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 conf = ConnectionConfig(
     MAIL_USERNAME=settings.MAIL_USERNAME,
@@ -22,6 +26,7 @@ conf = ConnectionConfig(
 )
 
 
+@traced
 async def send_email(email: EmailStr, username: str, host: str):
     try:
         token_verification = create_email_token({"sub": email})
@@ -38,5 +43,27 @@ async def send_email(email: EmailStr, username: str, host: str):
 
         fm = FastMail(conf)
         await fm.send_message(message, template_name="verify_email.html")
-    except ConnectionErrors as err:
-        print(err)
+    except ConnectionErrors:
+        logger.exception("Failed to send verification email")
+
+
+@traced
+async def send_birthday_digest(
+    email: EmailStr, username: str, days: int, contacts: list[dict]
+):
+    try:
+        message = MessageSchema(
+            subject="Upcoming birthdays",
+            recipients=[email],
+            template_body={
+                "username": username,
+                "days": days,
+                "contacts": contacts,
+            },
+            subtype=MessageType.html,
+        )
+
+        fm = FastMail(conf)
+        await fm.send_message(message, template_name="birthday_digest.html")
+    except ConnectionErrors:
+        logger.exception("Failed to send birthday digest")
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Callable, Dict, List, Set
+
+import redis.asyncio
+
+from src.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class ContactEventBroker:
+    """
+    In-process fan-out of contact change events to per-user subscribers.
+
+    Every subscriber has a bounded queue. A subscriber that does not keep up
+    is dropped instead of buffering events without limit, and is told so with
+    a final ``dropped`` event, after which it should resync with the changes
+    feed.
+
+    Listeners, such as in-process caches, get every dispatched event. Users
+    they need events of without a subscriber are registered with `watch`.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._listeners: List[Callable[[int, dict], None]] = []
+        self._watched: Set[int] = set()
+
+    def _listening(self, user_id: int) -> bool:
+        return user_id in self._subscribers or user_id in self._watched
+
+    def add_listener(self, callback: Callable[[int, dict], None]) -> None:
+        self._listeners.append(callback)
+
+    async def watch(self, user_id: int) -> None:
+        """Receive events of a User for the listeners, even with no subscriber."""
+        self._watched.add(user_id)
+
+    async def unwatch(self, user_id: int) -> None:
+        self._watched.discard(user_id)
+
+    async def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def _remove(self, user_id: int, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(user_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[user_id]
+
+    async def unsubscribe(self, user_id: int, subscription: Subscription) -> None:
+        self._remove(user_id, subscription)
+
+    def dispatch(self, user_id: int, event: dict) -> None:
+        for listener in self._listeners:
+            try:
+                listener(user_id, event)
+            except Exception:
+                logger.exception("Contact event listener failed")
+        for subscription in list(self._subscribers.get(user_id, ())):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.dropped = True
+                self._remove(user_id, subscription)
+
+    async def publish(self, user_id: int, event: dict) -> None:
+        self.dispatch(user_id, event)
+
+    async def stream(self, user_id: int, heartbeat: float) -> AsyncIterator[str]:
+        """
+        Yield server-sent events for one subscriber until it disconnects.
+
+        Args:
+            user_id: The id of the User to receive events for.
+            heartbeat: Seconds of silence after which a comment line is sent.
+        """
+        subscription = await self.subscribe(user_id)
+        try:
+            yield f"retry: {int(heartbeat * 1000)}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if subscription.dropped:
+                    yield "event: dropped\ndata: {}\n\n"
+                    return
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            await self.unsubscribe(user_id, subscription)
+
+
+class RedisContactEventBroker(ContactEventBroker):
+    """
+    Contact event broker that fans out across workers through Redis pub/sub.
+
+    A worker only subscribes to the channels of users that have a local
+    subscriber or are watched, so events of other users are never delivered
+    to it.
+    """
+
+    def __init__(self, url: str, queue_size: int = 100):
+        super().__init__(queue_size)
+        self.redis = redis.asyncio.from_url(url)
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+
+    @staticmethod
+    def channel(user_id: int) -> str:
+        return f"contacts:{user_id}"
+
+    async def subscribe(self, user_id: int) -> Subscription:
+        first = not self._listening(user_id)
+        subscription = await super().subscribe(user_id)
+        if first:
+            await self.pubsub.subscribe(self.channel(user_id))
+        return subscription
+
+    async def unsubscribe(self, user_id: int, subscription: Subscription) -> None:
+        await super().unsubscribe(user_id, subscription)
+        if not self._listening(user_id):
+            await self.pubsub.unsubscribe(self.channel(user_id))
+
+    async def watch(self, user_id: int) -> None:
+        first = not self._listening(user_id)
+        await super().watch(user_id)
+        if first:
+            await self.pubsub.subscribe(self.channel(user_id))
+
+    async def unwatch(self, user_id: int) -> None:
+        await super().unwatch(user_id)
+        if not self._listening(user_id):
+            await self.pubsub.unsubscribe(self.channel(user_id))
+
+    async def publish(self, user_id: int, event: dict) -> None:
+        try:
+            await self.redis.publish(self.channel(user_id), json.dumps(event))
+        except redis.RedisError:
+            logger.exception("Failed to publish contact event")
+
+    async def listen(self) -> None:
+        """Dispatch events received from Redis to local subscribers."""
+        while True:
+            if not self.pubsub.subscribed:
+                await asyncio.sleep(1)
+                continue
+            message = await self.pubsub.get_message(timeout=None)
+            if message is None:
+                continue
+            user_id = int(message["channel"].decode().split(":", 1)[1])
+            self.dispatch(user_id, json.loads(message["data"]))
+
+
+if settings.EVENTS_REDIS_URL:
+    broker = RedisContactEventBroker(
+        settings.EVENTS_REDIS_URL, settings.EVENTS_QUEUE_SIZE
+    )
+else:
+    broker = ContactEventBroker(settings.EVENTS_QUEUE_SIZE)
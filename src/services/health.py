@@ -0,0 +1,143 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import redis.asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.conf.config import settings
+from src.database.db import DatabaseSessionManager, sessionmanager
+
+
+def pool_status(engines: List[AsyncEngine]) -> dict:
+    """
+    Get how many pooled connections are checked out, over all engines.
+
+    Read straight from the pools, so it is always current and costs no I/O.
+    """
+    checked_out = capacity = 0
+    for engine in engines:
+        pool = engine.sync_engine.pool
+        if not hasattr(pool, "checkedout"):
+            continue
+        checked_out += pool.checkedout()
+        capacity += pool.size() + max(pool._max_overflow, 0)
+    return {
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "saturation": checked_out / capacity if capacity else 0.0,
+    }
+
+
+class HealthProber:
+    """
+    Check dependencies in the background and keep the latest results.
+
+    Probes answer from the kept state instead of touching the dependencies,
+    so frequent probing neither costs pool slots nor slows down under load.
+    The database and Redis are required for readiness, SMTP is reported only.
+    """
+
+    def __init__(
+        self,
+        manager: DatabaseSessionManager,
+        redis_urls: List[str],
+        smtp: tuple[str, int] | None,
+        timeout: float,
+    ):
+        self.manager = manager
+        self.redis_clients = {url: redis.asyncio.from_url(url) for url in redis_urls}
+        self.smtp = smtp
+        self.timeout = timeout
+        self.checks: Dict[str, dict] = {}
+        self.checked_at: float | None = None
+
+    async def _check_db(self) -> None:
+        async with self.manager.session() as session:
+            await session.execute(text("SELECT 1"))
+            for shard in self.manager.contact_sessions(session):
+                if shard is not session:
+                    await shard.execute(text("SELECT 1"))
+
+    async def _check_redis(self) -> None:
+        for client in self.redis_clients.values():
+            await client.ping()
+
+    async def _check_smtp(self) -> None:
+        _, writer = await asyncio.open_connection(*self.smtp)
+        writer.close()
+        await writer.wait_closed()
+
+    async def _run_check(self, check: Callable[[], Awaitable[None]]) -> dict:
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(check(), self.timeout)
+        except Exception as e:
+            return {"ok": False, "error": str(e) or type(e).__name__}
+        return {"ok": True, "latency_ms": round((time.monotonic() - start) * 1000, 1)}
+
+    async def probe(self) -> None:
+        """Run all checks once, concurrently, and keep their results."""
+        checks = {"db": self._check_db}
+        if self.redis_clients:
+            checks["redis"] = self._check_redis
+        if self.smtp:
+            checks["smtp"] = self._check_smtp
+        results = await asyncio.gather(*map(self._run_check, checks.values()))
+        self.checks = dict(zip(checks, results))
+        self.checked_at = time.monotonic()
+
+    async def run(self, interval: float) -> None:
+        """Probe every `interval` seconds until cancelled."""
+        while True:
+            await self.probe()
+            await asyncio.sleep(interval)
+
+    def readiness(self, max_age: float, max_saturation: float) -> dict:
+        """
+        Get the readiness of this worker from the last probe and the pools.
+
+        Args:
+            max_age: Seconds after which the last probe is considered stale.
+            max_saturation: Pool saturation from which the worker is not ready.
+
+        Returns:
+            The overall status, the result of each check and the pool state.
+        """
+        pool = pool_status(self.manager.pooled_engines)
+        age = None if self.checked_at is None else time.monotonic() - self.checked_at
+        ready = (
+            age is not None
+            and age <= max_age
+            and all(
+                result["ok"]
+                for name, result in self.checks.items()
+                if name in ("db", "redis")
+            )
+            and pool["saturation"] < max_saturation
+        )
+        return {
+            "status": "ready" if ready else "unavailable",
+            "checked_seconds_ago": None if age is None else round(age, 3),
+            "checks": self.checks,
+            "pool": pool,
+        }
+
+
+prober = HealthProber(
+    sessionmanager,
+    sorted(
+        {
+            url
+            for url in (
+                settings.EVENTS_REDIS_URL,
+                settings.CONTACT_CACHE_REDIS_URL,
+                settings.IDEMPOTENCY_REDIS_URL,
+            )
+            if url
+        }
+    ),
+    (settings.MAIL_SERVER, settings.MAIL_PORT) if settings.HEALTH_CHECK_SMTP else None,
+    settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+)
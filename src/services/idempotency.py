@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Callable, List, Tuple
+
+import redis.asyncio
+from jose import JWTError, jwt
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf import messages
+from src.conf.config import settings
+from src.database.db import sessionmanager
+from src.repository.idempotency import IdempotencyRepository
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_ROUTES = {
+    ("POST", "/api/contacts"),
+    ("POST", "/api/contacts/"),
+    ("POST", "/api/auth/register"),
+}
+
+IN_FLIGHT = object()
+
+Headers = List[Tuple[str, str]]
+
+
+class DatabaseIdempotencyStore:
+    """Idempotency records kept in the ``idempotency_records`` table."""
+
+    def __init__(self, session_factory: Callable):
+        self.session_factory = session_factory
+
+    async def claim(self, key: str, lock_seconds: int):
+        """
+        Claim a key, or get what is already stored for it.
+
+        Returns:
+            None if claimed, IN_FLIGHT, or the stored (status, headers, body).
+        """
+        async with self.session_factory() as session:
+            record = await IdempotencyRepository(session).claim(key, lock_seconds)
+        if record is None:
+            return None
+        if record.status_code is None:
+            return IN_FLIGHT
+        return record.status_code, json.loads(record.headers), record.body
+
+    async def complete(
+        self, key: str, status_code: int, headers: Headers, body: bytes, ttl: int
+    ) -> None:
+        async with self.session_factory() as session:
+            await IdempotencyRepository(session).complete(
+                key, status_code, json.dumps(headers), body, ttl
+            )
+
+    async def release(self, key: str) -> None:
+        async with self.session_factory() as session:
+            await IdempotencyRepository(session).release(key)
+
+
+class RedisIdempotencyStore:
+    """Idempotency records kept in Redis, expiring on their own."""
+
+    def __init__(self, url: str):
+        self.redis = redis.asyncio.from_url(url)
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"idempotency:{key}"
+
+    async def claim(self, key: str, lock_seconds: int):
+        if await self.redis.set(self._key(key), b"", nx=True, ex=lock_seconds):
+            return None
+        stored = await self.redis.get(self._key(key))
+        if stored is None:
+            # Expired between the two calls
+            return await self.claim(key, lock_seconds)
+        if stored == b"":
+            return IN_FLIGHT
+        stored = json.loads(stored)
+        return stored["status"], stored["headers"], stored["body"].encode("latin-1")
+
+    async def complete(
+        self, key: str, status_code: int, headers: Headers, body: bytes, ttl: int
+    ) -> None:
+        stored = {
+            "status": status_code,
+            "headers": headers,
+            "body": body.decode("latin-1"),
+        }
+        await self.redis.set(self._key(key), json.dumps(stored), ex=ttl)
+
+    async def release(self, key: str) -> None:
+        await self.redis.delete(self._key(key))
+
+
+def request_owner(headers: dict) -> str | None:
+    """
+    Get whom an idempotency key belongs to.
+
+    Returns:
+        The username of a bearer token, an empty string for anonymous requests,
+        or None if the token is invalid and the request must not be deduplicated.
+    """
+    authorization = headers.get(b"authorization")
+    if authorization is None:
+        return ""
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    try:
+        payload = jwt.decode(
+            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
+        )
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+
+class IdempotencyMiddleware:
+    """
+    Replay responses of POST requests retried with the same Idempotency-Key.
+
+    The first response is stored by (owner, key, body hash). A duplicate
+    arriving while the first request is in flight waits for its response,
+    later duplicates get the stored response without running the endpoint.
+    Server errors are not stored, so such requests can be retried.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store,
+        ttl: int,
+        lock_seconds: int,
+        wait_seconds: float,
+        poll_seconds: float = 0.05,
+    ):
+        self.app = app
+        self.store = store
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or (scope["method"], scope["path"]) not in IDEMPOTENT_ROUTES
+        ):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key")
+        owner = request_owner(headers)
+        if not idempotency_key or owner is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        key = hashlib.sha256(
+            b"\n".join([owner.encode(), idempotency_key, hashlib.sha256(body).digest()])
+        ).hexdigest()
+
+        try:
+            stored = await self._claim(key)
+        except Exception:
+            logger.exception("Idempotency store is unavailable")
+            stored = None
+            key = None
+        if stored is IN_FLIGHT:
+            await self._respond(
+                send,
+                409,
+                [("content-type", "application/json")],
+                json.dumps({"detail": messages.IDEMPOTENCY_IN_PROGRESS}).encode(),
+            )
+            return
+        if stored is not None:
+            status_code, stored_headers, stored_body = stored
+            await self._respond(
+                send,
+                status_code,
+                stored_headers + [("idempotent-replayed", "true")],
+                stored_body,
+            )
+            return
+
+        await self._run(key, scope, body, send)
+
+    async def _claim(self, key: str):
+        deadline = asyncio.get_running_loop().time() + self.wait_seconds
+        while True:
+            stored = await self.store.claim(key, self.lock_seconds)
+            if stored is not IN_FLIGHT:
+                return stored
+            if asyncio.get_running_loop().time() >= deadline:
+                return IN_FLIGHT
+            await asyncio.sleep(self.poll_seconds)
+
+    async def _run(self, key: str | None, scope: Scope, body: bytes, send: Send):
+        received = False
+        finished = False
+        response = {"status": 500, "headers": [], "body": b""}
+
+        async def receive_body() -> Message:
+            nonlocal received
+            if received:
+                return {"type": "http.disconnect"}
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send_and_store(message: Message) -> None:
+            nonlocal finished
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (name.decode("latin-1"), value.decode("latin-1"))
+                    for name, value in message.get("headers", ())
+                ]
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+                # Store before background tasks of the endpoint start running
+                if not message.get("more_body") and key is not None:
+                    finished = True
+                    await self._finish(key, response)
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_and_store)
+        except Exception:
+            if key is not None and not finished:
+                await self._finish(key, {"status": 500})
+            raise
+
+    async def _finish(self, key: str, response: dict) -> None:
+        try:
+            if response["status"] >= 500:
+                await self.store.release(key)
+            else:
+                await self.store.complete(
+                    key,
+                    response["status"],
+                    response["headers"],
+                    response["body"],
+                    self.ttl,
+                )
+        except Exception:
+            logger.exception("Failed to store idempotent response")
+
+    @staticmethod
+    async def _respond(send: Send, status_code: int, headers: Headers, body: bytes):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": [
+                    (name.encode("latin-1"), value.encode("latin-1"))
+                    for name, value in headers
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+if settings.IDEMPOTENCY_REDIS_URL:
+    store = RedisIdempotencyStore(settings.IDEMPOTENCY_REDIS_URL)
+else:
+    store = DatabaseIdempotencyStore(sessionmanager.session)
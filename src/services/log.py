@@ -0,0 +1,167 @@
+import contextvars
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+access_logger = logging.getLogger("src.access")
+
+# Fields of the request being handled, shared by everything it logs. The dict
+# is mutated in place, so fields bound later (e.g. the user) are seen by all
+# code running for the request, including copies of the context.
+request_context: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "request_context", default=None
+)
+
+# Attributes of every LogRecord, anything else was passed with `extra`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+
+def bind(**fields) -> None:
+    """Add fields to the logging context of the current request, if any."""
+    context = request_context.get()
+    if context is not None:
+        context.update(fields)
+
+
+class ContextFilter(logging.Filter):
+    """Copy the request context onto records, in the thread that logs them."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = request_context.get()
+        if context is not None:
+            for key, value in context.items():
+                if key == "scope":
+                    # The route is only known once the request has been routed
+                    route = value.get("route")
+                    if route is not None:
+                        record.route = route.path_format
+                elif not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(level: str, stream=None) -> QueueListener:
+    """
+    Send all logging through a queue to a background writer thread.
+
+    Callers only format records as JSON, with the request context they were
+    logged in, and put them on an in-memory queue, so writing to a slow
+    stdout or pipe never blocks the event loop.
+
+    Args:
+        level: The level of the root logger.
+        stream: The stream to write to, stdout by default.
+
+    Returns:
+        The started QueueListener, to be stopped on shutdown so that queued
+        records are flushed.
+    """
+    writer = logging.StreamHandler(stream or sys.stdout)
+    records = queue.SimpleQueue()
+    handler = QueueHandler(records)
+    handler.addFilter(ContextFilter())
+    # QueueHandler.prepare() formats in the calling thread, where the
+    # traceback is still available; the writer only writes the line
+    handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        if isinstance(existing, QueueHandler):
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = QueueListener(records, writer, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class AccessLogMiddleware:
+    """
+    Give every request an id and log a sampled access line when it's done.
+
+    The id is taken from the X-Request-ID header, or generated, and echoed in
+    the response. Server errors and slow requests are always logged, other
+    requests with probability `sample_rate`.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float, slow_seconds: float):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+        request_id = request_id or uuid.uuid4().hex
+        token = request_context.set({"request_id": request_id, "scope": scope})
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            duration = time.perf_counter() - start
+            if (
+                status_code >= 500
+                or duration >= self.slow_seconds
+                or random.random() < self.sample_rate
+            ):
+                access_logger.info(
+                    "%s %s %s",
+                    scope["method"],
+                    scope["path"],
+                    status_code,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round(duration * 1000, 2),
+                        "sample_rate": self.sample_rate,
+                    },
+                )
+            request_context.reset(token)
@@ -0,0 +1,191 @@
+import asyncio
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.conf.config import settings
+from src.services.auth import is_admin_token
+
+PROFILE_SUFFIX = ".folded"
+_UNSAFE = re.compile(r"[^A-Za-z0-9]+")
+_PROFILE_ID = re.compile(r"[0-9]+-[A-Za-z0-9-]*")
+
+# Innermost matching frame decides the phase a sample is attributed to
+PHASES = (
+    ("sql", ("sqlalchemy.", "aiosqlite", "asyncpg", "psycopg2")),
+    ("serialization", ("pydantic", "fastapi.encoders", "json.", "starlette.responses")),
+    ("dependency", ("src.services.auth", "src.database.db", "fastapi.dependencies")),
+)
+
+
+def _phase(modules: List[str]) -> str:
+    for module in reversed(modules):
+        for phase, prefixes in PHASES:
+            if module.startswith(prefixes):
+                return phase
+    return "route"
+
+
+class StackSampler(threading.Thread):
+    """
+    Sample the stacks of one asyncio task from a background thread.
+
+    While the task runs on the event loop its thread stack is sampled,
+    otherwise the chain of coroutines it is suspended in. Other requests
+    served concurrently don't end up in its profile, and time spent awaiting
+    the database is attributed to the await that is waiting.
+    """
+
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, task: asyncio.Task, interval: float
+    ):
+        super().__init__(daemon=True)
+        self.loop = loop
+        self.task = task
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+
+    def _awaiting(self) -> list:
+        # Walk the await chain of a suspended task, outermost coroutine first
+        frames = []
+        coro = self.task.get_coro()
+        while coro is not None:
+            frame = getattr(coro, "cr_frame", None) or getattr(coro, "ag_frame", None)
+            if frame is not None:
+                frames.append(frame)
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "ag_await", None)
+        return frames
+
+    def _running(self) -> list:
+        frames = []
+        frame = sys._current_frames().get(self.thread_id)
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+        return frames
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if self.task.done():
+                continue
+            if asyncio.current_task(self.loop) is self.task:
+                frames = self._running()
+            else:
+                # Waiting on I/O or for its turn: wall time still counts
+                frames = self._awaiting()
+            modules = [frame.f_globals.get("__name__", "?") for frame in frames]
+            names = [
+                f"{module}:{frame.f_code.co_name}"
+                for module, frame in zip(modules, frames)
+            ]
+            self.stacks[";".join([_phase(modules)] + names)] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        """Get the samples in collapsed-stack format, one stack per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class ProfileStore:
+    """Bounded on-disk ring buffer of collapsed-stack profiles."""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = Path(directory)
+        self.max_files = max_files
+
+    @staticmethod
+    def new_id(name: str) -> str:
+        """Make a profile id that sorts by time and names the request."""
+        return f"{time.time_ns()}-{_UNSAFE.sub('-', name).strip('-')}"
+
+    def _paths(self) -> List[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob("*" + PROFILE_SUFFIX))
+
+    def save(self, profile_id: str, collapsed: str) -> None:
+        """Store a profile, dropping the oldest ones beyond `max_files`."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / (profile_id + PROFILE_SUFFIX)).write_text(collapsed)
+        for path in self._paths()[: -self.max_files]:
+            path.unlink(missing_ok=True)
+
+    def list(self) -> List[dict]:
+        return [
+            {"id": path.name[: -len(PROFILE_SUFFIX)], "size": path.stat().st_size}
+            for path in reversed(self._paths())
+        ]
+
+    def load(self, profile_id: str) -> str | None:
+        if not _PROFILE_ID.fullmatch(profile_id):
+            return None
+        path = self.directory / (profile_id + PROFILE_SUFFIX)
+        if not path.is_file():
+            return None
+        return path.read_text()
+
+
+class ProfilingMiddleware:
+    """
+    Profile selected requests end to end and store their flamegraphs.
+
+    A request is profiled when it carries an ``X-Profile`` header with the
+    admin token, or when it is picked at `sample_rate`. The id of the stored
+    profile is returned in the ``X-Profile-Id`` response header.
+    """
+
+    def __init__(
+        self, app: ASGIApp, store: ProfileStore, sample_rate: float, interval: float
+    ):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.interval = interval
+
+    def _selected(self, scope: Scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return is_admin_token(value.decode())
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler(
+            asyncio.get_running_loop(), asyncio.current_task(), self.interval
+        )
+        profile_id = self.store.new_id(f"{scope['method']} {scope['path']}")
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + [
+                    (b"x-profile-id", profile_id.encode())
+                ]
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            await asyncio.to_thread(self.store.save, profile_id, sampler.collapsed())
+
+
+store = ProfileStore(settings.PROFILE_DIR or "profiles", settings.PROFILE_MAX_FILES)
@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.db import contact_sessions, db_now, sessionmanager
+from src.repository.purge import PurgeRepository
+
+logger = logging.getLogger(__name__)
+
+
+class PurgeService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.repository = PurgeRepository(db)
+        self.shards = [PurgeRepository(session) for session in contact_sessions(db)]
+
+    async def _drain(self, step, chunk_size: int, pause: float) -> int:
+        total = 0
+        while True:
+            purged = await step(chunk_size)
+            total += purged
+            if purged < chunk_size:
+                return total
+            await asyncio.sleep(pause)
+
+    async def purge(self, chunk_size: int, pause: float, retention: int) -> dict:
+        """
+        Hard-delete soft-deleted rows in chunks, pausing between chunks.
+
+        Args:
+            chunk_size: The maximum number of rows deleted per transaction.
+            pause: Seconds to wait between chunks.
+            retention: The number of days tombstones are kept for.
+
+        Returns:
+            The number of purged contacts, users, tombstones and expired
+            idempotency records.
+        """
+        purged = {"contacts": 0, "users": 0, "tombstones": 0, "idempotency": 0}
+        for shard in self.shards:
+            purged["contacts"] += await self._drain(
+                shard.purge_contacts, chunk_size, pause
+            )
+
+        while user_ids := await self.repository.get_deleted_user_ids(chunk_size):
+            for shard in self.shards:
+                purged["contacts"] += await self._drain(
+                    lambda size: shard.purge_contacts(size, user_ids),
+                    chunk_size,
+                    pause,
+                )
+                await shard.purge_user_rows(user_ids)
+            purged["users"] += await self.repository.purge_users(user_ids)
+            await asyncio.sleep(pause)
+
+        for shard in self.shards:
+            before = await db_now(shard.db) - timedelta(days=retention)
+            purged["tombstones"] += await self._drain(
+                lambda size: shard.purge_tombstones(before, size), chunk_size, pause
+            )
+
+        now = await db_now(self.db)
+        purged["idempotency"] = await self._drain(
+            lambda size: self.repository.purge_idempotency_records(now, size),
+            chunk_size,
+            pause,
+        )
+        return purged
+
+
+async def run_purge() -> dict:
+    async with sessionmanager.session() as session:
+        return await PurgeService(session).purge(
+            settings.PURGE_CHUNK_SIZE,
+            settings.PURGE_PAUSE_SECONDS,
+            settings.TOMBSTONE_RETENTION_DAYS,
+        )
+
+
+async def purge_scheduler(interval: int):
+    """
+    Run the purge job every `interval` seconds.
+
+    Args:
+        interval: Seconds between the end of one run and the start of the next.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_purge()
+        except Exception:
+            logger.exception("Purge run failed")
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Purge soft-deleted rows").parse_args()
+    print(asyncio.run(run_purge()))
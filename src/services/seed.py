@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import random
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List
+
+from src.database.db import DatabaseSessionManager, reserve_id_block, sessionmanager
+from src.database.models import Contact, User
+from src.repository.birthdays import BirthdayDigestRepository
+from src.repository.bulk import BulkLoadRepository
+from src.services.auth import Hash
+from src.repository.normalize import normalize_email, normalize_phone
+
+# Ordered by popularity, so the head of each list dominates like real names do
+# fmt: off
+FIRST_NAMES = [
+    "Olena", "Andrii", "Iryna", "Oleksandr", "Natalia", "Dmytro", "Olha",
+    "Serhii", "Tetiana", "Mykola", "Yulia", "Volodymyr", "Kateryna", "Ivan",
+    "Svitlana", "Maksym", "Anna", "Yurii", "Maria", "Pavlo", "Oksana", "Taras",
+    "Viktoria", "Roman", "Halyna", "Bohdan", "Sofia", "Artem", "Daryna", "Ihor",
+    "Liudmyla", "Vitalii", "Alina", "Denys", "Khrystyna", "Nazar", "Zoryana",
+    "Yaroslav", "Marta", "Stepan",
+]
+SURNAMES = [
+    "Melnyk", "Shevchenko", "Boiko", "Kovalenko", "Bondarenko", "Tkachenko",
+    "Kovalchuk", "Kravchenko", "Oliinyk", "Shevchuk", "Koval", "Polishchuk",
+    "Bondar", "Tkachuk", "Moroz", "Marchenko", "Lysenko", "Rudenko", "Savchenko",
+    "Petrenko", "Klymenko", "Pavlenko", "Savchuk", "Kuzmenko", "Ponomarenko",
+    "Vasylenko", "Levchenko", "Kharchenko", "Karpenko", "Havrylyuk", "Ivanenko",
+    "Tkach", "Romaniuk", "Demchenko", "Sydorenko", "Mazur", "Kushnir", "Prykhodko",
+]
+DOMAINS = ["gmail.com", "ukr.net", "i.ua", "outlook.com", "meta.ua", "example.com"]
+OPERATOR_CODES = ["50", "63", "66", "67", "68", "73", "93", "95", "96", "97", "98", "99"]
+NOTES = [None, None, None, "Work", "Family", "Neighbour", "Gym", "University"]
+# fmt: on
+
+
+def popularity(size: int, skew: float) -> List[float]:
+    """Zipf weights of `size` items, the first being the most popular."""
+    return [1 / (rank + 1) ** skew for rank in range(size)]
+
+
+def allocate(total: int, weights: List[float]) -> List[int]:
+    """Split `total` proportionally to `weights` with largest remainders."""
+    scale = total / sum(weights)
+    shares = [weight * scale for weight in weights]
+    counts = [int(share) for share in shares]
+    by_remainder = sorted(
+        range(len(weights)), key=lambda i: shares[i] - counts[i], reverse=True
+    )
+    for i in by_remainder[: total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+class SyntheticDataGenerator:
+    """
+    Deterministic generator of realistic Users and Contacts.
+
+    The same seed always yields the same rows. Contacts per User follow a
+    Zipf distribution, names are drawn with Zipf popularity so that search
+    prefixes have realistic selectivity, and birthdays spread over the year
+    with ages between 16 and 90.
+    """
+
+    def __init__(self, seed: int, users: int, contacts: int, skew: float = 1.1):
+        self.rng = random.Random(seed)
+        self.users = users
+        self.skew = skew
+        weights = popularity(users, skew)
+        self.rng.shuffle(weights)
+        self.contacts_per_user = allocate(contacts, weights)
+        self._first_weights = popularity(len(FIRST_NAMES), skew)
+        self._surname_weights = popularity(len(SURNAMES), skew)
+
+    def user(self, index: int, prefix: str, hashed_password: str) -> dict:
+        return {
+            "username": f"{prefix}{index:07d}",
+            "email": f"{prefix}{index:07d}@example.com",
+            "hashed_password": hashed_password,
+            "confirmed": True,
+        }
+
+    def _birthday(self, today: date) -> date:
+        age = self.rng.triangular(16, 90, 30)
+        return today - timedelta(days=int(age * 365.25))
+
+    def contact(self, index: int, today: date) -> dict:
+        rng = self.rng
+        name = rng.choices(FIRST_NAMES, self._first_weights)[0]
+        surname = rng.choices(SURNAMES, self._surname_weights)[0]
+        email = f"{name}.{surname}{index}@{rng.choice(DOMAINS)}".lower()
+        phone = f"0{rng.choice(OPERATOR_CODES)}{rng.randrange(10**7):07d}"
+        return {
+            "name": name,
+            "surname": surname,
+            "email": email,
+            "phone": phone,
+            "birthday": self._birthday(today),
+            "additional_data": rng.choice(NOTES),
+            "phone_normalized": normalize_phone(phone),
+            "email_normalized": normalize_email(email),
+        }
+
+    def contacts(self, today: date) -> Iterator[tuple[int, dict]]:
+        """Yield (user index, contact) pairs, User by User."""
+        index = 0
+        for user_index, count in enumerate(self.contacts_per_user):
+            for _ in range(count):
+                yield user_index, self.contact(index, today)
+                index += 1
+
+
+class SeedService:
+    def __init__(self, manager: DatabaseSessionManager):
+        self.manager = manager
+
+    async def seed(
+        self,
+        generator: SyntheticDataGenerator,
+        batch_size: int = 10000,
+        prefix: str = "user",
+        password: str = "password",
+    ) -> Dict[str, int]:
+        """
+        Bulk-load generated Users and Contacts and build derived tables.
+
+        Args:
+            generator: The generator of the rows.
+            batch_size: The number of rows loaded per statement.
+            prefix: The prefix of generated usernames and emails.
+            password: The password of every generated User.
+
+        Returns:
+            The number of loaded users and contacts.
+        """
+        now = datetime.now().replace(microsecond=0)
+        timestamps = {"created_at": now, "updated_at": now, "deleted_at": None}
+        hashed_password = Hash().get_password_hash(password)
+        contacts_count = sum(generator.contacts_per_user)
+
+        async with self.manager.session() as db:
+            users = BulkLoadRepository(db)
+            first_user_id = await users.max_id(User.__table__) + 1
+            for start in range(0, generator.users, batch_size):
+                await users.load(
+                    User.__table__,
+                    [
+                        dict(
+                            generator.user(index, prefix, hashed_password),
+                            id=first_user_id + index,
+                            **timestamps,
+                        )
+                        for index in range(
+                            start, min(start + batch_size, generator.users)
+                        )
+                    ],
+                )
+            await users.reset_sequence(User.__table__)
+
+            shards = self.manager.contact_sessions(db)
+            if self.manager.shard_count:
+                # Ids have to be unique across shards, reserve them all at once
+                next_id = (
+                    await reserve_id_block(
+                        db,
+                        "contacts",
+                        contacts_count,
+                        lambda: self.manager.max_id("contacts"),
+                    )
+                    - contacts_count
+                    + 1
+                )
+            else:
+                next_id = await BulkLoadRepository(db).max_id(Contact.__table__) + 1
+
+            batches = [[] for _ in shards]
+            for user_index, contact in generator.contacts(now.date()):
+                user_id = first_user_id + user_index
+                shard = (
+                    self.manager.shard_for(User(id=user_id))
+                    if self.manager.shard_count
+                    else 0
+                )
+                batches[shard].append(
+                    dict(contact, id=next_id, user_id=user_id, **timestamps)
+                )
+                next_id += 1
+                if len(batches[shard]) >= batch_size:
+                    await BulkLoadRepository(shards[shard]).load(
+                        Contact.__table__, batches[shard]
+                    )
+                    batches[shard] = []
+            for shard, batch in enumerate(batches):
+                repository = BulkLoadRepository(shards[shard])
+                await repository.load(Contact.__table__, batch)
+                if not self.manager.shard_count:
+                    await repository.reset_sequence(Contact.__table__)
+                await BirthdayDigestRepository(shards[shard]).refresh(
+                    chunk_size=batch_size
+                )
+        return {"users": generator.users, "contacts": contacts_count}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Load synthetic users and contacts for benchmarking"
+    )
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--contacts", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--prefix", default="user")
+    args = parser.parse_args()
+    generator = SyntheticDataGenerator(args.seed, args.users, args.contacts, args.skew)
+    print(
+        asyncio.run(
+            SeedService(sessionmanager).seed(generator, args.batch_size, args.prefix)
+        )
+    )
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+from datetime import timedelta
+
+from src.database.db import DatabaseSessionManager, sessionmanager
+from src.repository.birthdays import BirthdayDigestRepository
+from src.repository.shards import ShardMoveRepository
+from src.repository.users import UserRepository
+
+
+class ShardRebalancer:
+    def __init__(
+        self,
+        manager: DatabaseSessionManager,
+        chunk_size: int = 500,
+        pause: float = 0.1,
+        lag: int = 2,
+    ):
+        self.manager = manager
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.lag = lag
+
+    async def _copy(self, mover: ShardMoveRepository, user_id: int, cursor):
+        while True:
+            copied, cursor = await mover.copy_contacts(user_id, cursor, self.chunk_size)
+            if copied < self.chunk_size:
+                return cursor
+            await asyncio.sleep(self.pause)
+
+    async def move_user(self, user_id: int, target: int) -> bool:
+        """
+        Move the Contacts of a User to another shard while it keeps working.
+
+        Contacts are copied in (updated_at, id) order while the source shard
+        is still live, then the User is pointed to the target shard, then
+        rows written around the switch are copied again before the source
+        rows are deleted in chunks.
+
+        Args:
+            user_id: The id of the User to move.
+            target: The index of the shard to move to.
+
+        Returns:
+            True if the User was moved, False if it already was on `target`.
+        """
+        if not 0 <= target < self.manager.shard_count:
+            raise ValueError(f"Shard {target} does not exist")
+        async with self.manager.session() as session:
+            users = UserRepository(session)
+            user = await users.get_user_by_id(user_id)
+            if user is None:
+                raise ValueError(f"User {user_id} does not exist")
+            source = self.manager.shard_for(user)
+            if source == target:
+                return False
+            source_db = self.manager.shard_session(session, source)
+            target_db = self.manager.shard_session(session, target)
+            mover = ShardMoveRepository(source_db, target_db)
+
+            cursor = await self._copy(mover, user_id, None)
+            user.contacts_shard = target
+            await session.commit()
+
+            # Requests that resolved the shard before the switch may still
+            # commit to the source, copy the last seconds again
+            await asyncio.sleep(self.lag)
+            if cursor is not None:
+                cursor = (cursor[0] - timedelta(seconds=self.lag), 0)
+            await self._copy(mover, user_id, cursor)
+            await mover.copy_tombstones(user_id)
+            await mover.reset_stats(user_id)
+            await BirthdayDigestRepository(target_db).refresh()
+
+            while await mover.delete_source(user_id, self.chunk_size):
+                await asyncio.sleep(self.pause)
+        return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move a user to another shard")
+    parser.add_argument("user_id", type=int)
+    parser.add_argument("shard", type=int)
+    args = parser.parse_args()
+    asyncio.run(ShardRebalancer(sessionmanager).move_user(args.user_id, args.shard))
@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+from typing import List
+
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.db import contact_sessions, sessionmanager, shard_session
+from src.database.models import Contact, ContactStats, User
+from src.repository.stats import ContactStatsRepository
+
+
+class ContactStatsService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def recompute(self, user_ids: List[int] | None = None) -> int:
+        """
+        Rebuild the contact statistics of Users from their Contacts.
+
+        Args:
+            user_ids: Ids of the Users to repair, all Users with Contacts or
+                statistics when None.
+
+        Returns:
+            The number of rebuilt statistics rows.
+        """
+        if user_ids is not None:
+            stmt = select(User).where(User.id.in_(user_ids))
+            users = (await self.db.execute(stmt)).scalars().all()
+            for user in users:
+                await ContactStatsRepository(shard_session(self.db, user)).recompute(
+                    user.id
+                )
+            return len(users)
+
+        rebuilt = 0
+        stmt = union(select(Contact.user_id), select(ContactStats.user_id))
+        for shard in contact_sessions(self.db):
+            repository = ContactStatsRepository(shard)
+            for user_id in (await shard.execute(stmt)).scalars().all():
+                await repository.recompute(user_id)
+                rebuilt += 1
+        return rebuilt
+
+
+async def run_recompute(user_ids: List[int] | None) -> int:
+    async with sessionmanager.session() as session:
+        return await ContactStatsService(session).recompute(user_ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rebuild per-user contact statistics from the contacts"
+    )
+    parser.add_argument("--user-id", type=int, action="append", dest="user_ids")
+    args = parser.parse_args()
+    print(asyncio.run(run_recompute(args.user_ids)))
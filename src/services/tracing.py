@@ -0,0 +1,439 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import queue
+import random
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import settings
+from src.services import log
+
+logger = logging.getLogger(__name__)
+
+# Statements are cut to this length in span attributes
+MAX_STATEMENT_LENGTH = 500
+
+
+class Span:
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: str | None,
+        sampled: bool,
+        attributes: Dict | None = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes or {}
+        self.error = None
+        self.start = time.time_ns()
+        self.end = None
+
+    @property
+    def traceparent(self) -> str:
+        flags = "01" if self.sampled else "00"
+        return f"00-{self.trace_id}-{self.span_id}-{flags}"
+
+
+current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def parse_traceparent(value: str) -> tuple[str, str, bool] | None:
+    """
+    Parse a W3C traceparent header.
+
+    Returns:
+        The trace id, parent span id and sampled flag, or None if the header
+        is malformed.
+    """
+    parts = value.strip().lower().split("-")
+    if len(parts) < 4 or parts[0] == "ff" or len(parts[0]) != 2:
+        return None
+    _, trace_id, parent_id, flags = parts[:4]
+    if len(trace_id) != 32 or len(parent_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        int(trace_id, 16), int(parent_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, sampled
+
+
+class FileSpanExporter:
+    """Append spans to a file as JSON lines, e.g. for offline tests."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def export(self, spans: List[Span]) -> None:
+        with self.path.open("a") as file:
+            for span in spans:
+                file.write(
+                    json.dumps(
+                        {
+                            "trace_id": span.trace_id,
+                            "span_id": span.span_id,
+                            "parent_id": span.parent_id,
+                            "name": span.name,
+                            "start": span.start,
+                            "end": span.end,
+                            "attributes": span.attributes,
+                            "error": span.error,
+                        },
+                        default=str,
+                    )
+                    + "\n"
+                )
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpSpanExporter:
+    """Send spans to an OTLP/HTTP collector, encoded as JSON."""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5):
+        self.endpoint = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def encode(self, spans: List[Span]) -> dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": _otlp_value(self.service_name),
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [
+                                {
+                                    "traceId": span.trace_id,
+                                    "spanId": span.span_id,
+                                    "parentSpanId": span.parent_id or "",
+                                    "name": span.name,
+                                    "kind": 1 if span.parent_id else 2,
+                                    "startTimeUnixNano": str(span.start),
+                                    "endTimeUnixNano": str(span.end),
+                                    "attributes": [
+                                        {"key": key, "value": _otlp_value(value)}
+                                        for key, value in span.attributes.items()
+                                    ],
+                                    "status": (
+                                        {"code": 2, "message": span.error}
+                                        if span.error
+                                        else {"code": 0}
+                                    ),
+                                }
+                                for span in spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def export(self, spans: List[Span]) -> None:
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(self.encode(spans)).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class Tracer:
+    """
+    Record spans of sampled traces and export them in batches.
+
+    Whether a trace is recorded is decided once, at its root, from the
+    caller's traceparent or with probability `sample_rate`. Spans of other
+    traces are never created. Finished spans are queued and exported by a
+    background thread, a full queue drops spans instead of blocking.
+    """
+
+    def __init__(
+        self,
+        exporter,
+        sample_rate: float,
+        batch_size: int = 512,
+        flush_interval: float = 5,
+        max_queue_size: int = 10000,
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: threading.Thread | None = None
+        self._export_lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def start_trace(self, name: str, traceparent: str | None = None, **attributes):
+        """Start the root span of a request, continuing the caller's trace."""
+        parent = parse_traceparent(traceparent) if traceparent else None
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+            sampled = random.random() < self.sample_rate
+        span = Span(name, trace_id, parent_id, sampled, attributes)
+        return span, current_span.set(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span | None]:
+        """Record a child span of the current span, if its trace is sampled."""
+        parent = current_span.get()
+        if parent is None or not parent.sampled:
+            yield None
+            return
+        span = Span(name, parent.trace_id, parent.span_id, True, attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            current_span.reset(token)
+            self.finish(span)
+
+    def finish(self, span: Span) -> None:
+        span.end = time.time_ns()
+        if not span.sampled:
+            return
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._export_loop, name="span-exporter", daemon=True
+            )
+            self._thread.start()
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def _export_loop(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Export everything queued so far, in batches."""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            try:
+                with self._export_lock:
+                    self.exporter.export(batch)
+            except Exception:
+                logger.exception("Failed to export %s spans", len(batch))
+
+
+def traced(function: Callable = None, *, name: str = None):
+    """
+    Record a span around every call of a function or the methods of a class.
+
+    A class is traced by wrapping its public methods, with spans named
+    "Class.method".
+    """
+    if function is None:
+        return functools.partial(traced, name=name)
+    if getattr(function, "__traced__", False):
+        return function
+    if inspect.isclass(function):
+        for attribute, method in list(vars(function).items()):
+            if not attribute.startswith("_") and inspect.isfunction(method):
+                setattr(
+                    function,
+                    attribute,
+                    traced(method, name=f"{function.__name__}.{attribute}"),
+                )
+        return function
+
+    span_name = name or function.__qualname__
+    if inspect.iscoroutinefunction(function):
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            if tracer is None:
+                return await function(*args, **kwargs)
+            with tracer.span(span_name):
+                return await function(*args, **kwargs)
+
+    else:
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if tracer is None:
+                return function(*args, **kwargs)
+            with tracer.span(span_name):
+                return function(*args, **kwargs)
+
+    wrapper.__traced__ = True
+    return wrapper
+
+
+def span(name: str, **attributes):
+    """Record a span around a block, if tracing is enabled."""
+    if tracer is None:
+        return nullcontext()
+    return tracer.span(name, **attributes)
+
+
+def traceparent() -> str | None:
+    """Get the traceparent header value to pass the current trace on."""
+    span = current_span.get()
+    return span.traceparent if span is not None else None
+
+
+class TracedRoute(APIRoute):
+    """A route that records a span around its endpoint."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        endpoint = traced(endpoint, name=f"handler {endpoint.__name__}")
+        super().__init__(path, endpoint, **kwargs)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Record a span for every SQL statement run by `engine`."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        parent = current_span.get()
+        if tracer is None or parent is None or not parent.sampled:
+            return
+        # Statements are leaves, so the span is never made current
+        context._trace_span = Span(
+            "sql",
+            parent.trace_id,
+            parent.span_id,
+            True,
+            {
+                "db.system": conn.dialect.name,
+                "db.statement": statement[:MAX_STATEMENT_LENGTH],
+            },
+        )
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            tracer.finish(span)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(exception_context):
+        context = exception_context.execution_context
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            span.error = repr(exception_context.original_exception)
+            tracer.finish(span)
+
+
+class TracingMiddleware:
+    """Record the root span of every request, continuing incoming traces."""
+
+    def __init__(self, app: ASGIApp, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                incoming = value.decode("latin-1")
+        span, token = self.tracer.start_trace(
+            f"{scope['method']} {scope['path']}",
+            incoming,
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        )
+        log.bind(trace_id=span.trace_id)
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                span.name = f"{scope['method']} {route.path_format}"
+                span.attributes["http.route"] = route.path_format
+            current_span.reset(token)
+            self.tracer.finish(span)
+
+
+def make_exporter():
+    if settings.TRACING_EXPORTER == "otlp":
+        return OtlpSpanExporter(
+            settings.TRACING_OTLP_ENDPOINT, settings.TRACING_SERVICE_NAME
+        )
+    if settings.TRACING_EXPORTER == "file":
+        return FileSpanExporter(settings.TRACING_FILE)
+    return None
+
+
+exporter = make_exporter()
+tracer = (
+    Tracer(
+        exporter,
+        settings.TRACING_SAMPLE_RATE,
+        settings.TRACING_BATCH_SIZE,
+        settings.TRACING_FLUSH_SECONDS,
+    )
+    if exporter is not None
+    else None
+)
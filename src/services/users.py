@@ -1,10 +1,16 @@
+import logging
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from libgravatar import Gravatar
 
 from src.repository.users import UserRepository
 from src.schemas.users import UserCreate
+from src.services.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 
+@traced
 class UserService:
     def __init__(self, db: AsyncSession):
         self.repository = UserRepository(db)
@@ -14,14 +20,17 @@ class UserService:
         try:
             g = Gravatar(body.email)
             avatar = g.get_image()
-        except Exception as e:
-            print(e)
+        except Exception:
+            logger.exception("Gravatar lookup failed")
 
         return await self.repository.create_user(body, avatar)
 
     async def get_user_by_id(self, user_id: int):
         return await self.repository.get_user_by_id(user_id)
 
+    async def get_users_by_ids(self, user_ids):
+        return await self.repository.get_users_by_ids(user_ids)
+
     async def get_user_by_username(self, username: str):
         return await self.repository.get_user_by_username(username)
 
@@ -30,3 +39,6 @@ class UserService:
 
     async def confirmed_email(self, email: str):
         return await self.repository.confirmed_email(email)
+
+    async def delete_user(self, user):
+        return await self.repository.delete_user(user)
@@ -10,6 +10,9 @@ from main import app
 from src.database.models import Base, User, Contact
 from src.database.db import get_db
 from src.services.auth import create_access_token, Hash
+from src.services.autocomplete import autocomplete_index
+from src.services.cache import InMemoryCacheBackend, contact_cache
+from tests.query_budget import query_budget as _query_budget
 
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
@@ -23,6 +26,11 @@ TestingSessionLocal = async_sessionmaker(
     autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
 )
 
+# Stands in for Redis, so reads exercise the shared tier too
+if contact_cache is not None:
+    contact_cache.attach(InMemoryCacheBackend())
+autocomplete_index.session_factory = TestingSessionLocal
+
 test_user = {
     "username": "deadpool",
     "email": "deadpool@example.com",
@@ -48,6 +56,11 @@ def init_models_wrap():
             await session.commit()
 
     asyncio.run(init_models())
+    # Ids are reused once the database is recreated
+    if contact_cache is not None:
+        contact_cache.clear()
+        contact_cache.backend.clear()
+    autocomplete_index.clear()
 
 @pytest.fixture(scope="module")
 def client():
@@ -70,3 +83,16 @@ async def get_token():
     token = await create_access_token(data={"sub": test_user["username"]})
     return token
 
+@pytest.fixture()
+def query_budget():
+    """
+    Limit the statements issued by a block, e.g. one request of the client.
+
+        with query_budget("GET /api/contacts/", 2):
+            client.get("/api/contacts/", headers=headers)
+    """
+
+    def budget(label: str, max_statements: int, max_repeats: int = 1):
+        return _query_budget(engine.sync_engine, label, max_statements, max_repeats)
+
+    return budget
@@ -0,0 +1,73 @@
+from collections import Counter
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryRecorder:
+    """Record every SQL statement an engine executes."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.statements: List[str] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(" ".join(statement.split()))
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+def describe(statements: List[str], repeated: set) -> str:
+    lines = []
+    for number, statement in enumerate(statements, 1):
+        marker = "!" if statement in repeated else " "
+        lines.append(f"  {marker}{number:>3}. {statement}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def query_budget(engine: Engine, label: str, max_statements: int, max_repeats: int = 1):
+    """
+    Fail if the block issues more statements than budgeted or repeats one.
+
+    A statement text issued more than `max_repeats` times within the block
+    is reported as a likely N+1 query.
+
+    Args:
+        engine: The (sync) engine to watch.
+        label: What is measured, e.g. ``GET /api/contacts/``.
+        max_statements: The maximum number of statements.
+        max_repeats: How many times one statement text may be issued.
+    """
+    with QueryRecorder(engine) as recorder:
+        yield recorder
+    statements = recorder.statements
+    repeated = {
+        statement
+        for statement, count in Counter(statements).items()
+        if count > max_repeats
+    }
+    problems = []
+    if len(statements) > max_statements:
+        problems.append(
+            f"{label} issued {len(statements)} statements, "
+            f"budget is {max_statements} (+{len(statements) - max_statements})"
+        )
+    for statement in sorted(repeated):
+        problems.append(
+            f"{label} issued the same statement {statements.count(statement)} "
+            f"times, likely N+1: {statement}"
+        )
+    if problems:
+        raise AssertionError(
+            "\n".join(problems)
+            + "\nStatements (! marks repeats):\n"
+            + describe(statements, repeated)
+        )
@@ -0,0 +1,51 @@
+contact = {
+    "name": "Typeahead",
+    "surname": "Kovalenko",
+    "email": "typeahead@example.com",
+    "phone": "0507654321",
+    "birthday": "1990-03-15",
+    "additional_data": "",
+}
+
+
+def test_autocomplete_follows_changes(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    created = client.post("/api/contacts/", json=contact, headers=headers).json()
+
+    response = client.get(
+        "/api/contacts/autocomplete", params={"q": "typea"}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == [
+        {"id": created["id"], "display_name": "Typeahead Kovalenko"}
+    ]
+
+    # Writes after the index was built are applied to it
+    second = client.post(
+        "/api/contacts/",
+        json=dict(contact, name="Typist", email="typist@example.com"),
+        headers=headers,
+    ).json()
+    response = client.get(
+        "/api/contacts/autocomplete",
+        params={"q": "typ kov", "limit": 5},
+        headers=headers,
+    )
+    assert [item["id"] for item in response.json()] == [created["id"], second["id"]]
+
+    client.put(
+        f"/api/contacts/{second['id']}",
+        json=dict(contact, name="Renamed", email="typist@example.com"),
+        headers=headers,
+    )
+    client.delete(f"/api/contacts/{created['id']}", headers=headers)
+    response = client.get(
+        "/api/contacts/autocomplete", params={"q": "typ"}, headers=headers
+    )
+    assert [item["id"] for item in response.json()] == [second["id"]]
+    response = client.get(
+        "/api/contacts/autocomplete", params={"q": "+38050765"}, headers=headers
+    )
+    assert response.json() == [
+        {"id": second["id"], "display_name": "Renamed Kovalenko"}
+    ]
@@ -0,0 +1,81 @@
+from src.conf import messages
+from tests.conftest import test_user
+
+
+def test_batch(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    response = client.post(
+        "/api/contacts",
+        json={
+            "name": "Batch",
+            "surname": "Contact",
+            "email": "batch@example.com",
+            "phone": "0501234567",
+            "birthday": "2000-01-01",
+            "additional_data": "",
+        },
+        headers=headers,
+    )
+    assert response.status_code == 201, response.text
+    response = client.post(
+        "/api/batch",
+        json={
+            "requests": [
+                {"path": "/api/users/me"},
+                {"path": "/api/contacts/", "params": {"limit": 10, "count": True}},
+                {"path": "/api/contacts/9999"},
+                {"method": "POST", "path": "/api/contacts/birthdays", "body": {"days": 7}},
+            ]
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    me, contacts, missing, birthdays = response.json()
+    assert me["status"] == 200
+    assert me["body"]["username"] == test_user["username"]
+    assert contacts["status"] == 200
+    assert [c["name"] for c in contacts["body"]] == ["Batch"]
+    assert contacts["headers"]["x-total-count"] == "1"
+    assert missing["status"] == 404
+    assert missing["body"]["detail"] == messages.CONTACT_NOT_FOUND
+    assert birthdays["status"] == 200
+
+
+def test_batch_path_not_allowed(client, get_token):
+    response = client.post(
+        "/api/batch",
+        json={"requests": [{"path": "/api/contacts/events"}]},
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 422, response.text
+    assert response.json()["detail"] == messages.BATCH_PATH_NOT_ALLOWED
+
+
+def test_batch_unauthorized(client):
+    response = client.post("/api/batch", json={"requests": [{"path": "/api/users/me"}]})
+    assert response.status_code == 401, response.text
+
+
+def test_batch_continues_after_server_error(client, get_token, monkeypatch):
+    async def fail(*args, **kwargs):
+        raise RuntimeError("Database went away")
+
+    monkeypatch.setattr("src.services.contacts.ContactService.get_contacts", fail)
+    response = client.post(
+        "/api/batch",
+        json={
+            "requests": [
+                {"path": "/api/contacts/"},
+                {"path": "/api/users/me"},
+                {"path": "/api/contacts/search", "params": {"q": "batch"}},
+            ]
+        },
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 200, response.text
+    failed, me, found = response.json()
+    assert failed["status"] == 500
+    assert me["status"] == 200, me
+    assert me["body"]["username"] == test_user["username"]
+    assert found["status"] == 200, found
+    assert [c["name"] for c in found["body"]] == ["Batch"]
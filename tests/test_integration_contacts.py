@@ -1,5 +1,19 @@
-from datetime import date
+import asyncio
+import time
+from datetime import date, timedelta
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql
+
 from src.conf import messages
+from src.conf.config import Settings, settings
+from src.database.models import BirthdayDigest, Contact, clock_now
+from src.repository.birthdays import BirthdayDigestRepository, next_birthday
+from src.repository.jobs import JobRunRepository
+from src.repository.normalize import normalize_phone
+from tests.conftest import TestingSessionLocal
 
 test_contact={
     "name": "Testname",
@@ -89,3 +103,276 @@ def test_repeat_delete_contact(client, get_token):
     data = response.json()
     assert data["detail"] == messages.CONTACT_NOT_FOUND
 
+def test_next_birthday():
+    assert next_birthday(date(2000, 4, 23), date(2025, 4, 1)) == date(2025, 4, 23)
+    assert next_birthday(date(2000, 4, 23), date(2025, 4, 23)) == date(2025, 4, 23)
+    assert next_birthday(date(2000, 4, 23), date(2025, 4, 24)) == date(2026, 4, 23)
+    assert next_birthday(date(2000, 2, 29), date(2025, 1, 1)) == date(2025, 2, 28)
+    assert next_birthday(date(2000, 2, 29), date(2027, 12, 31)) == date(2028, 2, 29)
+
+def test_get_birthdays(client, get_token):
+    soon = (date.today() + timedelta(days=3)).replace(year=2000)
+    later = (date.today() + timedelta(days=30)).replace(year=2000)
+    for name, birthday in (("Later", later), ("Soon", soon)):
+        contact = test_contact.copy()
+        contact["name"] = name
+        contact["birthday"] = str(birthday)
+        response = client.post(
+            "/api/contacts",
+            json=contact,
+            headers={"Authorization": f"Bearer {get_token}"},
+        )
+        assert response.status_code == 201, response.text
+
+    response = client.post(
+        "/api/contacts/birthdays",
+        json={"days": 7},
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 200, response.text
+    assert [c["name"] for c in response.json()] == ["Soon"]
+
+    response = client.post(
+        "/api/contacts/birthdays",
+        json={"days": 60},
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 200, response.text
+    assert [c["name"] for c in response.json()] == ["Soon", "Later"]
+
+def test_get_contacts_count(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    response = client.get("/api/contacts", params={"count": True}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["X-Total-Count"] == "2"
+    assert response.headers["X-Total-Count-Exact"] == "true"
+
+    response = client.get("/api/contacts", headers=headers)
+    assert "X-Total-Count" not in response.headers
+
+    response = client.get(
+        "/api/contacts/search", params={"q": "soon", "count": True}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["X-Total-Count"] == "1"
+
+    response = client.post(
+        "/api/contacts/birthdays",
+        params={"count": True},
+        json={"days": 60},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["X-Total-Count"] == "2"
+
+def test_search_count_is_bounded(client, get_token, monkeypatch):
+    monkeypatch.setattr("src.api.contacts.settings.CONTACTS_COUNT_BOUND", 1)
+    response = client.get(
+        "/api/contacts/search",
+        params={"q": "test", "count": True},
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["X-Total-Count"] == "1"
+    assert response.headers["X-Total-Count-Exact"] == "false"
+
+def test_get_contacts_fields(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    response = client.get(
+        "/api/contacts",
+        params={"fields": "name,phone", "count": True},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["X-Total-Count"] == "2"
+    data = response.json()
+    assert set(data[0]) == {"id", "name", "phone"}
+
+    contact_id = data[0]["id"]
+    response = client.get(
+        f"/api/contacts/{contact_id}", params={"fields": "surname"}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == {"id": contact_id, "surname": test_contact["surname"]}
+
+    response = client.post(
+        "/api/contacts/birthdays",
+        params={"fields": "name"},
+        json={"days": 7},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == [{"id": response.json()[0]["id"], "name": "Soon"}]
+
+def test_get_contacts_unknown_fields(client, get_token):
+    response = client.get(
+        "/api/contacts",
+        params={"fields": "name,hashed_password"},
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 422, response.text
+    assert "hashed_password" in response.json()["detail"]
+
+def test_get_changes(client, get_token, monkeypatch):
+    monkeypatch.setattr("src.api.contacts.settings.SYNC_SAFETY_LAG_SECONDS", 0)
+    headers = {"Authorization": f"Bearer {get_token}"}
+    response = client.post("/api/contacts", json=test_contact, headers=headers)
+    assert response.status_code == 201, response.text
+    removed_id = response.json()["id"]
+    time.sleep(1.1)
+
+    response = client.get("/api/contacts/changes", headers=headers)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [c["name"] for c in data["upserts"]] == ["Later", "Soon", "Testname"]
+    assert data["deletions"] == []
+    assert data["has_more"] is False
+
+    later = data["upserts"][0]
+    updated = {key: later[key] for key in test_contact}
+    updated["additional_data"] = "updated"
+    response = client.put(f"/api/contacts/{later['id']}", json=updated, headers=headers)
+    assert response.status_code == 200, response.text
+    response = client.delete(f"/api/contacts/{removed_id}", headers=headers)
+    assert response.status_code == 204, response.text
+    time.sleep(1.1)
+
+    response = client.get(
+        "/api/contacts/changes", params={"since": data["next"]}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    changes = response.json()
+    assert [c["additional_data"] for c in changes["upserts"]] == ["updated"]
+    assert changes["deletions"] == [removed_id]
+
+    response = client.get(
+        "/api/contacts/changes", params={"since": changes["next"]}, headers=headers
+    )
+    assert response.json()["upserts"] == []
+    assert response.json()["deletions"] == []
+
+def test_changes_stamped_with_statement_time():
+    # now() would be the start of the writing transaction
+    stmt = select(clock_now()).compile(dialect=postgresql.dialect())
+    assert "clock_timestamp()" in str(stmt)
+
+def test_sync_lag_covers_statement_timeout():
+    values = settings.model_dump()
+    values.update(DB_STATEMENT_TIMEOUT_MS=5000, SYNC_SAFETY_LAG_SECONDS=2)
+    with pytest.raises(ValidationError, match="SYNC_SAFETY_LAG_SECONDS"):
+        Settings(**values)
+    values.update(SYNC_SAFETY_LAG_SECONDS=5)
+    assert Settings(**values).SYNC_SAFETY_LAG_SECONDS == 5
+
+def test_get_changes_wrong_token(client, get_token):
+    response = client.get(
+        "/api/contacts/changes",
+        params={"since": "not-a-token"},
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 422, response.text
+    assert response.json()["detail"] == messages.WRONG_SYNC_TOKEN
+
+def test_normalize_phone():
+    assert normalize_phone("098 567-45-77") == "+380985674577"
+    assert normalize_phone("+1 (555) 010-9999") == "+15550109999"
+    assert normalize_phone("00380985674577") == "+380985674577"
+    assert normalize_phone("12") is None
+
+def test_lookup_contacts(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    contact = dict(test_contact, name="Caller", email="Caller@Example.com", phone="+380971112233")
+    response = client.post("/api/contacts", json=contact, headers=headers)
+    assert response.status_code == 201, response.text
+    contact_id = response.json()["id"]
+    response = client.get(
+        "/api/contacts/lookup", params={"phone": "097-111-22-33"}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert [c["name"] for c in response.json()] == ["Caller"]
+    response = client.get(
+        "/api/contacts/lookup",
+        params={"email": "caller@example.COM", "fields": "name"},
+        headers=headers,
+    )
+    assert response.json() == [{"id": contact_id, "name": "Caller"}]
+    response = client.get(
+        "/api/contacts/lookup", params={"phone": "0971112234"}, headers=headers
+    )
+    assert response.json() == []
+    client.delete(f"/api/contacts/{contact_id}", headers=headers)
+    response = client.get(
+        "/api/contacts/lookup", params={"phone": "+380971112233"}, headers=headers
+    )
+    assert response.json() == []
+
+def test_lookup_contacts_requires_value(client, get_token):
+    response = client.get(
+        "/api/contacts/lookup", headers={"Authorization": f"Bearer {get_token}"}
+    )
+    assert response.status_code == 422, response.text
+    assert response.json()["detail"] == messages.LOOKUP_VALUE_REQUIRED
+
+def test_lookup_empty_email_skips_unnormalized(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    response = client.post(
+        "/api/contacts", json=dict(test_contact, name="Legacy"), headers=headers
+    )
+    contact_id = response.json()["id"]
+
+    async def forget_normalized_email():
+        # Contacts created before the column was added, not yet backfilled
+        async with TestingSessionLocal() as session:
+            await session.execute(
+                update(Contact)
+                .where(Contact.id == contact_id)
+                .values(email_normalized=None)
+            )
+            await session.commit()
+
+    asyncio.run(forget_normalized_email())
+    response = client.get(
+        "/api/contacts/lookup", params={"email": ""}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == []
+    client.delete(f"/api/contacts/{contact_id}", headers=headers)
+
+@pytest.mark.asyncio
+async def test_refresh_birthday_digest():
+    async with TestingSessionLocal() as session:
+        repository = BirthdayDigestRepository(session)
+        await repository.refresh()
+        next_year = date.today() + timedelta(days=360)
+        assert await repository.refresh(next_year) == 2
+        upcoming = await repository.get_upcoming(1, 30, 0, 10, today=next_year)
+        assert [c.name for c in upcoming] == ["Soon"]
+
+def test_birthdays_roll_stale_digest_forward(client, get_token):
+    async def make_stale():
+        # As if the daily refresh hadn't run for more than a year
+        async with TestingSessionLocal() as session:
+            await session.execute(
+                update(BirthdayDigest).values(
+                    next_birthday=date.today() - timedelta(days=400)
+                )
+            )
+            await session.commit()
+
+    asyncio.run(make_stale())
+    response = client.post(
+        "/api/contacts/birthdays",
+        json={"days": 7},
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 200, response.text
+    assert [c["name"] for c in response.json()] == ["Soon"]
+
+@pytest.mark.asyncio
+async def test_daily_job_is_claimed_once():
+    today = date.today()
+    async with TestingSessionLocal() as session:
+        jobs = JobRunRepository(session)
+        assert await jobs.claim("test_job", today) is True
+        assert await jobs.claim("test_job", today) is False
+        assert await jobs.claim("test_job", today + timedelta(days=1)) is True
@@ -0,0 +1,67 @@
+contacts = [
+    {
+        "name": "Taras",
+        "surname": "Shevchenko",
+        "email": "taras@example.com",
+        "phone": "0501234567",
+        "birthday": "1990-03-09",
+        "additional_data": "",
+    },
+    {
+        "name": "Taras",
+        "surname": "Shevchenco",
+        "email": "taras.work@example.com",
+        "phone": "+380501234567",
+        "birthday": "1990-03-09",
+        "additional_data": "Poet",
+    },
+    {
+        "name": "Lesya",
+        "surname": "Ukrainka",
+        "email": "lesya@example.com",
+        "phone": "0679876543",
+        "birthday": "1991-02-25",
+        "additional_data": "",
+    },
+]
+
+
+def test_find_and_merge_duplicates(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    ids = [
+        client.post("/api/contacts/", json=contact, headers=headers).json()["id"]
+        for contact in contacts
+    ]
+
+    response = client.get("/api/contacts/duplicates", headers=headers)
+    assert response.status_code == 200, response.text
+    groups = response.json()
+    assert len(groups) == 1
+    assert [contact["id"] for contact in groups[0]["contacts"]] == ids[:2]
+    assert groups[0]["score"] >= 0.6
+
+    response = client.post(
+        f"/api/contacts/{ids[0]}/merge",
+        json={"duplicate_ids": [ids[1]]},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    merged = response.json()
+    assert merged["email"] == "taras@example.com"
+    assert merged["additional_data"] == "Poet"
+
+    assert client.get(f"/api/contacts/{ids[1]}", headers=headers).status_code == 404
+    assert client.get("/api/contacts/duplicates", headers=headers).json() == []
+    assert client.get("/api/contacts/stats", headers=headers).json()["total"] == 2
+
+
+def test_merge_missing_contact(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    contact_id = client.get("/api/contacts/", headers=headers).json()[0]["id"]
+    response = client.post(
+        f"/api/contacts/{contact_id}/merge",
+        json={"duplicate_ids": [999999]},
+        headers=headers,
+    )
+    assert response.status_code == 404
+    assert len(client.get("/api/contacts/", headers=headers).json()) == 2
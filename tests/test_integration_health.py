@@ -0,0 +1,68 @@
+import socket
+import time
+
+import pytest
+import pytest_asyncio
+
+from src.database.db import DatabaseSessionManager
+from src.services.health import HealthProber
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest_asyncio.fixture()
+async def manager(tmp_path):
+    manager = DatabaseSessionManager(f"sqlite+aiosqlite:///{tmp_path}/health.db")
+    yield manager
+    await manager.engine.dispose()
+
+
+def test_liveness(client):
+    response = client.get("/api/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+
+@pytest.mark.asyncio
+async def test_readiness_from_probe(manager):
+    prober = HealthProber(manager, [], ("127.0.0.1", unused_port()), timeout=1)
+    assert prober.readiness(max_age=10, max_saturation=0.9)["status"] == "unavailable"
+
+    await prober.probe()
+    state = prober.readiness(max_age=10, max_saturation=0.9)
+    assert state["status"] == "ready"
+    assert state["checks"]["db"]["ok"]
+    # SMTP is reported, but doesn't take the worker out of rotation
+    assert not state["checks"]["smtp"]["ok"]
+    assert state["pool"]["checked_out"] == 0
+
+    assert prober.readiness(max_age=0, max_saturation=0.9)["status"] == "unavailable"
+
+
+@pytest.mark.asyncio
+async def test_readiness_requires_redis(manager):
+    prober = HealthProber(
+        manager, [f"redis://127.0.0.1:{unused_port()}"], None, timeout=1
+    )
+    await prober.probe()
+    state = prober.readiness(max_age=10, max_saturation=0.9)
+    assert state["status"] == "unavailable"
+    assert not state["checks"]["redis"]["ok"]
+
+
+def test_readiness_endpoint(client, monkeypatch):
+    prober = HealthProber(DatabaseSessionManager("sqlite+aiosqlite://"), [], None, 1)
+    monkeypatch.setattr("src.api.utils.prober", prober)
+    response = client.get("/api/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checked_seconds_ago"] is None
+
+    prober.checks = {"db": {"ok": True, "latency_ms": 1.0}}
+    prober.checked_at = time.monotonic()
+    response = client.get("/api/health/ready")
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "ready"
@@ -0,0 +1,95 @@
+import asyncio
+from unittest.mock import Mock
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database.models import IdempotencyRecord
+from src.services import idempotency
+from src.services.idempotency import DatabaseIdempotencyStore, IdempotencyMiddleware
+from tests.conftest import TestingSessionLocal
+
+contact = {
+    "name": "Retry",
+    "surname": "Contact",
+    "email": "retry@example.com",
+    "phone": "0501234567",
+    "birthday": "2000-01-01",
+    "additional_data": "",
+}
+
+
+@pytest.fixture()
+def test_store(monkeypatch):
+    monkeypatch.setattr(idempotency.store, "session_factory", TestingSessionLocal)
+
+
+def test_create_contact_is_replayed(client, get_token, test_store):
+    headers = {"Authorization": f"Bearer {get_token}", "Idempotency-Key": "abc"}
+    first = client.post("/api/contacts/", json=contact, headers=headers)
+    assert first.status_code == 201, first.text
+    assert "idempotent-replayed" not in first.headers
+    second = client.post("/api/contacts/", json=contact, headers=headers)
+    assert second.status_code == 201, second.text
+    assert second.headers["idempotent-replayed"] == "true"
+    assert second.json() == first.json()
+
+    other = client.post(
+        "/api/contacts/", json=dict(contact, name="Other"), headers=headers
+    )
+    assert other.json()["id"] != first.json()["id"]
+
+    response = client.get("/api/contacts/", headers=headers)
+    assert sorted(c["name"] for c in response.json()) == ["Other", "Retry"]
+
+
+def test_register_is_replayed(client, test_store, monkeypatch):
+    mock_send_email = Mock()
+    monkeypatch.setattr("src.api.auth.send_email", mock_send_email)
+    user = {"username": "retry", "email": "retry@example.com", "password": "12345678"}
+    headers = {"Idempotency-Key": "register-1"}
+    first = client.post("/api/auth/register", json=user, headers=headers)
+    assert first.status_code == 201, first.text
+    second = client.post("/api/auth/register", json=user, headers=headers)
+    assert second.status_code == 201, second.text
+    assert second.json() == first.json()
+    assert mock_send_email.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_waits_for_first(tmp_path):
+    # Sessions of the shared test engine all use one connection, so they
+    # don't see each other's transactions as separate ones
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'keys.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(IdempotencyRecord.__table__.create)
+    calls = []
+    app = FastAPI()
+
+    @app.post("/api/contacts/")
+    async def create():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return {"calls": len(calls)}
+
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=DatabaseIdempotencyStore(async_sessionmaker(engine)),
+        ttl=60,
+        lock_seconds=10,
+        wait_seconds=5,
+    )
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as http:
+        responses = await asyncio.gather(
+            *[
+                http.post("/api/contacts/", json={}, headers={"Idempotency-Key": "k"})
+                for _ in range(2)
+            ]
+        )
+    await engine.dispose()
+    assert calls == [1]
+    assert [r.json() for r in responses] == [{"calls": 1}, {"calls": 1}]
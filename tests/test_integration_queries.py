@@ -0,0 +1,71 @@
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import select
+
+from src.database.models import User
+from tests.conftest import TestingSessionLocal, engine
+from tests.query_budget import query_budget
+
+contact = {
+    "name": "Budget",
+    "surname": "Contact",
+    "email": "budget@example.com",
+    "phone": "0501234567",
+    "birthday": "2000-01-01",
+    "additional_data": "",
+}
+
+
+def test_contact_routes_budget(client, get_token, query_budget):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    # The first contact of a user also initializes its counter
+    client.post("/api/contacts/", json=contact, headers=headers)
+
+    with query_budget("POST /api/contacts/", 7):
+        response = client.post("/api/contacts/", json=contact, headers=headers)
+    contact_id = response.json()["id"]
+    with query_budget("GET /api/contacts/", 2):
+        client.get("/api/contacts/", headers=headers)
+    with query_budget("GET /api/contacts/search", 2):
+        client.get("/api/contacts/search", params={"q": "Bud"}, headers=headers)
+    with query_budget("GET /api/contacts/stats", 2):
+        client.get("/api/contacts/stats", headers=headers)
+    with query_budget("GET /api/contacts/{contact_id}", 2):
+        client.get(f"/api/contacts/{contact_id}", headers=headers)
+    with query_budget("GET /api/contacts/{contact_id} cached", 1):
+        client.get(f"/api/contacts/{contact_id}", headers=headers)
+    with query_budget("PUT /api/contacts/{contact_id}", 4):
+        client.put(f"/api/contacts/{contact_id}", json=contact, headers=headers)
+    with query_budget("DELETE /api/contacts/{contact_id}", 7):
+        client.delete(f"/api/contacts/{contact_id}", headers=headers)
+
+
+def test_user_routes_budget(client, get_token, query_budget, monkeypatch):
+    monkeypatch.setattr("src.api.auth.send_email", Mock())
+    with query_budget("POST /api/auth/register", 4):
+        client.post(
+            "/api/auth/register",
+            json={
+                "username": "budget",
+                "email": "budget@example.com",
+                "password": "12345678",
+            },
+        )
+    with query_budget("GET /api/users/me", 1):
+        client.get("/api/users/me", headers={"Authorization": f"Bearer {get_token}"})
+
+
+def test_repeated_statement_is_reported():
+    async def load_users_one_by_one():
+        async with TestingSessionLocal() as session:
+            for user_id in (1, 2, 3):
+                await session.execute(select(User).filter_by(id=user_id))
+
+    with pytest.raises(AssertionError) as error:
+        with query_budget(engine.sync_engine, "users loop", 5):
+            asyncio.run(load_users_one_by_one())
+    message = str(error.value)
+    assert "same statement 3 times, likely N+1" in message
+    assert "!  1. SELECT users.id" in message
@@ -0,0 +1,86 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from src.database.db import DatabaseSessionManager
+from src.database.models import Base, BirthdayDigest, Contact, User
+from src.schemas.contacts import ContactResponse
+from src.services.seed import SeedService, SyntheticDataGenerator, allocate
+
+
+async def make_manager(path, shards=0):
+    manager = DatabaseSessionManager(
+        f"sqlite+aiosqlite:///{path}/main.db",
+        [f"sqlite+aiosqlite:///{path}/shard{i}.db" for i in range(shards)],
+    )
+    async with manager.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    for shard in range(manager.shard_count):
+        await manager.create_shard_schema(shard)
+    return manager
+
+
+async def dispose(manager):
+    await manager.engine.dispose()
+    for engine in manager.shard_engines:
+        await engine.dispose()
+
+
+def test_allocate():
+    assert allocate(10, [3, 1, 1]) == [6, 2, 2]
+    assert sum(allocate(1000, [1 / (i + 1) for i in range(7)])) == 1000
+
+
+def test_generator_is_deterministic_and_skewed():
+    first = SyntheticDataGenerator(seed=7, users=50, contacts=5000)
+    second = SyntheticDataGenerator(seed=7, users=50, contacts=5000)
+    assert first.contacts_per_user == second.contacts_per_user
+    assert max(first.contacts_per_user) > 10 * min(first.contacts_per_user)
+    today = date(2026, 1, 1)
+    assert list(first.contacts(today))[:20] == list(second.contacts(today))[:20]
+
+
+@pytest.mark.asyncio
+async def test_seed(tmp_path):
+    manager = await make_manager(tmp_path)
+    generator = SyntheticDataGenerator(seed=1, users=5, contacts=300)
+    assert await SeedService(manager).seed(generator, batch_size=64) == {
+        "users": 5,
+        "contacts": 300,
+    }
+    async with manager.session() as db:
+        assert (await db.execute(select(func.count(User.id)))).scalar_one() == 5
+        counts = (
+            (await db.execute(select(func.count(Contact.id)).group_by(Contact.user_id)))
+            .scalars()
+            .all()
+        )
+        assert sorted(counts, reverse=True) == sorted(
+            generator.contacts_per_user, reverse=True
+        )
+        digests = await db.execute(select(func.count()).select_from(BirthdayDigest))
+        assert digests.scalar_one() == 300
+        contact = (await db.execute(select(Contact).limit(1))).scalar_one()
+        ContactResponse.model_validate(contact)
+        assert contact.phone_normalized.startswith("+380")
+        # Rows added afterwards continue the id sequence
+        db.add(User(username="next", email="next@example.com", hashed_password=""))
+        await db.commit()
+    await dispose(manager)
+
+
+@pytest.mark.asyncio
+async def test_seed_sharded(tmp_path):
+    manager = await make_manager(tmp_path, shards=2)
+    generator = SyntheticDataGenerator(seed=1, users=6, contacts=120)
+    await SeedService(manager).seed(generator, batch_size=50)
+    async with manager.session() as db:
+        users = (await db.execute(select(User))).scalars().all()
+        total = 0
+        for user in users:
+            shard = manager.shard_session(db, manager.shard_for(user))
+            stmt = select(func.count(Contact.id)).filter_by(user_id=user.id)
+            total += (await shard.execute(stmt)).scalar_one()
+        assert total == 120
+    await dispose(manager)
@@ -0,0 +1,170 @@
+from datetime import date
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import inspect, select
+
+from src.database.db import DatabaseSessionManager
+from src.database.models import Base, Contact, User
+from src.repository.contacts import ContactRepository
+from src.repository.shards import ShardMoveRepository
+from src.schemas.contacts import ContactBase
+from src.services.shards import ShardRebalancer
+
+
+@pytest_asyncio.fixture()
+async def manager(tmp_path):
+    manager = DatabaseSessionManager(
+        f"sqlite+aiosqlite:///{tmp_path}/main.db",
+        [f"sqlite+aiosqlite:///{tmp_path}/shard{i}.db" for i in range(3)],
+        id_block_size=2,
+    )
+    async with manager.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    for shard in range(manager.shard_count):
+        await manager.create_shard_schema(shard)
+    async with manager.session() as session:
+        session.add_all(
+            User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="")
+            for i in range(4)
+        )
+        await session.commit()
+    yield manager
+    await manager.engine.dispose()
+    for engine in manager.shard_engines:
+        await engine.dispose()
+
+
+def contact_body(i: int) -> ContactBase:
+    return ContactBase(
+        name=f"Name{i}",
+        surname="Surname",
+        email=f"name{i}@example.com",
+        phone="0981234567",
+        birthday=date(2000, 1, 1),
+        additional_data=None,
+    )
+
+
+async def shard_contact_ids(manager, shard: int, user_id: int):
+    async with manager.session() as session:
+        stmt = select(Contact.id).filter_by(user_id=user_id)
+        result = await manager.shard_session(session, shard).execute(stmt)
+        return sorted(result.scalars().all())
+
+
+async def create_contacts(manager, count: int):
+    async with manager.session() as session:
+        users = (await session.execute(select(User))).scalars().all()
+        repository = ContactRepository(session)
+        for i in range(count):
+            for user in users:
+                await repository.create_contact(contact_body(i), user)
+        return users
+
+
+@pytest.mark.asyncio
+async def test_contacts_are_routed_by_user(manager):
+    users = await create_contacts(manager, 3)
+
+    all_ids = []
+    for user in users:
+        shard = manager.shard_for(user)
+        ids = await shard_contact_ids(manager, shard, user.id)
+        assert len(ids) == 3
+        for other in set(range(manager.shard_count)) - {shard}:
+            assert await shard_contact_ids(manager, other, user.id) == []
+        all_ids += ids
+        async with manager.session() as session:
+            repository = ContactRepository(session)
+            contacts = await repository.get_contacts(0, 10, user)
+            assert sorted(c.id for c in contacts) == ids
+            assert await repository.count_contacts(user) == 3
+    assert len(set(all_ids)) == len(all_ids)
+
+
+@pytest.mark.asyncio
+async def test_move_user_between_shards(manager):
+    users = await create_contacts(manager, 5)
+    user = users[0]
+    source = manager.shard_for(user)
+    target = (source + 1) % manager.shard_count
+    ids = await shard_contact_ids(manager, source, user.id)
+
+    rebalancer = ShardRebalancer(manager, chunk_size=2, pause=0, lag=0)
+    assert await rebalancer.move_user(user.id, target) is True
+
+    assert await shard_contact_ids(manager, source, user.id) == []
+    assert await shard_contact_ids(manager, target, user.id) == ids
+    async with manager.session() as session:
+        user = await session.get(User, user.id)
+        assert user.contacts_shard == target
+        repository = ContactRepository(session)
+        contacts = await repository.get_contacts(0, 10, user)
+        assert sorted(c.id for c in contacts) == ids
+        assert await repository.count_contacts(user) == 5
+        assert len(await repository.get_birthdays(366, 0, 10, user)) == 5
+
+
+@pytest.mark.asyncio
+async def test_enable_shards_with_existing_contacts(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path}/main.db"
+    unsharded = DatabaseSessionManager(url)
+    async with unsharded.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with unsharded.session() as session:
+        user = User(username="user", email="user@example.com", hashed_password="")
+        session.add(user)
+        await session.commit()
+        for i in range(3):
+            await ContactRepository(session).create_contact(contact_body(i), user)
+    await unsharded.dispose()
+
+    manager = DatabaseSessionManager(
+        url, [f"sqlite+aiosqlite:///{tmp_path}/shard0.db"], id_block_size=2
+    )
+    await manager.create_shard_schema(0)
+    async with manager.session() as session:
+        user = await session.get(User, user.id)
+        for i in range(3):
+            await ContactRepository(session).create_contact(contact_body(i), user)
+        # Copy the contacts from before sharding with their ids
+        mover = ShardMoveRepository(session, manager.shard_session(session, 0))
+        assert (await mover.copy_contacts(user.id, None, 10))[0] == 3
+
+    assert await shard_contact_ids(manager, 0, user.id) == [1, 2, 3, 4, 5, 6]
+    await manager.dispose()
+
+
+def foreign_keys(conn):
+    inspector = inspect(conn)
+    return {
+        key["referred_table"]
+        for table in inspector.get_table_names()
+        for key in inspector.get_foreign_keys(table)
+    }
+
+
+@pytest.mark.asyncio
+async def test_add_shard(manager, tmp_path):
+    await create_contacts(manager, 2)
+    async with manager.session() as session:
+        user = (await session.execute(select(User).limit(1))).scalar_one()
+        # Pin the User before the hash spreads over one more shard
+        user.contacts_shard = manager.shard_for(user)
+        await session.commit()
+    ids = await shard_contact_ids(manager, user.contacts_shard, user.id)
+
+    shard_urls = [f"sqlite+aiosqlite:///{tmp_path}/shard{i}.db" for i in range(4)]
+    grown = DatabaseSessionManager(
+        f"sqlite+aiosqlite:///{tmp_path}/main.db", shard_urls, id_block_size=2
+    )
+    await grown.create_shard_schema(3)
+    async with grown.shard_engines[3].connect() as conn:
+        # Users live in the main database only
+        assert await conn.run_sync(foreign_keys) == {"contacts"}
+
+    rebalancer = ShardRebalancer(grown, chunk_size=2, pause=0, lag=0)
+    assert await rebalancer.move_user(user.id, 3) is True
+    assert await shard_contact_ids(grown, 3, user.id) == ids
+    await grown.dispose()
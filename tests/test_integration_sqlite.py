@@ -0,0 +1,88 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select, text
+
+from src.database.db import DatabaseSessionManager, is_sqlite_file
+from src.database.models import Base, Contact, User
+from src.repository.contacts import ContactRepository
+from src.schemas.contacts import ContactBase
+
+
+async def make_manager(path, sqlite_tuned=True):
+    manager = DatabaseSessionManager(
+        f"sqlite+aiosqlite:///{path}/main.db", sqlite_tuned=sqlite_tuned
+    )
+    async with manager.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with manager.session() as db:
+        db.add(User(username="owner", email="owner@example.com", hashed_password=""))
+        await db.commit()
+    return manager
+
+
+def test_is_sqlite_file():
+    assert is_sqlite_file("sqlite+aiosqlite:///./test.db")
+    assert not is_sqlite_file("sqlite+aiosqlite://")
+    assert not is_sqlite_file("sqlite+aiosqlite:///:memory:")
+    assert not is_sqlite_file("postgresql+asyncpg://u:p@localhost/db")
+
+
+@pytest.mark.asyncio
+async def test_pragmas_and_routing(tmp_path):
+    manager = await make_manager(tmp_path)
+    async with manager.session() as db:
+        assert (await db.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        assert (await db.execute(text("PRAGMA synchronous"))).scalar() == 1
+        await db.commit()
+
+        # Reads go to the read-only pool until the transaction writes
+        reader = db.sync_session.read_bind
+        assert db.get_bind() is reader
+        assert db.sync_session.get_bind(clause=select(User)) is reader
+        user = (await db.execute(select(User))).scalar_one()
+        db.add(
+            Contact(
+                name="A", surname="B", email="a@example.com", phone="1", user_id=user.id
+            )
+        )
+        await db.flush()
+        assert db.get_bind() is manager.engine.sync_engine
+        count = select(func.count(Contact.id))
+        assert (await db.execute(count)).scalar_one() == 1
+        await db.rollback()
+        assert db.get_bind() is reader
+        assert (await db.execute(count)).scalar_one() == 0
+
+        async with manager.pooled_engines[0].connect() as conn:
+            assert (await conn.execute(text("PRAGMA query_only"))).scalar() == 1
+    await manager.dispose()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_keep_statistics(tmp_path):
+    manager = await make_manager(tmp_path)
+
+    async def create(i):
+        async with manager.session() as db:
+            user = (await db.execute(select(User))).scalar_one()
+            body = ContactBase(
+                name=f"Name{i}",
+                surname="Surname",
+                email=f"contact{i}@example.com",
+                phone=f"050{i:07d}",
+                birthday=date(1990, 1 + i % 12, 1),
+                additional_data="",
+            )
+            await ContactRepository(db).create_contact(body, user)
+
+    async def read():
+        async with manager.session() as db:
+            await db.execute(select(func.count(Contact.id)))
+
+    await asyncio.gather(*(create(i) for i in range(30)), *(read() for _ in range(30)))
+    async with manager.session() as db:
+        user = (await db.execute(select(User))).scalar_one()
+        assert (await ContactRepository(db).get_stats(user))["total"] == 30
+    await manager.dispose()
@@ -0,0 +1,111 @@
+import asyncio
+
+from sqlalchemy import update
+
+from src.database.models import ContactStats
+from src.repository.stats import ContactFacts, ContactStatsRepository
+from src.services.stats import ContactStatsService
+from tests.conftest import TestingSessionLocal
+
+contacts = [
+    {
+        "name": "Stats",
+        "surname": "One",
+        "email": "one@example.com",
+        "phone": "0501234567",
+        "birthday": "1990-03-15",
+        "additional_data": "",
+    },
+    {
+        "name": "Stats",
+        "surname": "Two",
+        "email": "two@Example.com",
+        "phone": "0501234568",
+        "birthday": "1985-03-01",
+        "additional_data": "",
+    },
+    {
+        "name": "Stats",
+        "surname": "Three",
+        "email": "three@mail.org",
+        "phone": "0501234569",
+        "birthday": "1970-07-20",
+        "additional_data": "",
+    },
+]
+
+
+def test_stats_follow_changes(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    ids = [
+        client.post("/api/contacts/", json=contact, headers=headers).json()["id"]
+        for contact in contacts
+    ]
+
+    stats = client.get("/api/contacts/stats", headers=headers).json()
+    assert stats["total"] == 3
+    assert stats["birth_months"]["3"] == 2
+    assert stats["birth_months"]["7"] == 1
+    assert sum(stats["birth_months"].values()) == 3
+    assert stats["email_domains"] == [
+        {"domain": "example.com", "count": 2},
+        {"domain": "mail.org", "count": 1},
+    ]
+    assert stats["added_last_7_days"] == 3
+    assert stats["added_last_30_days"] == 3
+
+    client.put(
+        f"/api/contacts/{ids[2]}",
+        json=dict(contacts[2], email="three@example.com", birthday="2000-12-31"),
+        headers=headers,
+    )
+    client.delete(f"/api/contacts/{ids[0]}", headers=headers)
+
+    stats = client.get("/api/contacts/stats", headers=headers).json()
+    assert stats["total"] == 2
+    assert stats["birth_months"]["3"] == 1
+    assert stats["birth_months"]["7"] == 0
+    assert stats["birth_months"]["12"] == 1
+    assert stats["email_domains"] == [{"domain": "example.com", "count": 2}]
+    assert stats["added_last_7_days"] == 2
+
+
+def test_recompute_repairs_stats(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    expected = client.get("/api/contacts/stats", headers=headers).json()
+
+    async def corrupt_and_recompute():
+        async with TestingSessionLocal() as session:
+            await session.execute(
+                update(ContactStats).values(total=99, email_domains={})
+            )
+            await session.commit()
+            return await ContactStatsService(session).recompute()
+
+    assert asyncio.run(corrupt_and_recompute()) == 1
+    assert client.get("/api/contacts/stats", headers=headers).json() == expected
+
+
+def test_record_after_concurrent_insert(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    before = client.get("/api/contacts/stats", headers=headers).json()
+
+    async def record_as_first_writer():
+        async with TestingSessionLocal() as session:
+            repository = ContactStatsRepository(session)
+            locked = repository._locked
+
+            # The row is missing when locked, then inserted by someone else
+            async def missing_once(user_id):
+                repository._locked = locked
+                return None, await repository._today()
+
+            repository._locked = missing_once
+            await repository.record(1, added=[ContactFacts(5, "race.org", None)])
+            await session.commit()
+
+    asyncio.run(record_as_first_writer())
+    stats = client.get("/api/contacts/stats", headers=headers).json()
+    assert stats["total"] == before["total"] + 1
+    assert stats["birth_months"]["5"] == before["birth_months"]["5"] + 1
+    assert {"domain": "race.org", "count": 1} in stats["email_domains"]
@@ -1,6 +1,13 @@
+from datetime import date
 from unittest.mock import patch
 
+import pytest
+
 from conftest import test_user
+from src.database.models import User, Contact
+from src.services.auth import create_access_token
+from src.services.purge import PurgeService
+from tests.conftest import TestingSessionLocal
 
 def test_get_me(client, get_token):
     token = get_token
@@ -12,6 +19,47 @@ def test_get_me(client, get_token):
     assert data["email"] == test_user["email"]
     assert "avatar" in data
 
+@pytest.mark.asyncio
+async def test_delete_me(client):
+    async with TestingSessionLocal() as session:
+        user = User(
+            username="todelete",
+            email="todelete@example.com",
+            hashed_password="hashed",
+            confirmed=True,
+            avatar="",
+        )
+        session.add(user)
+        await session.flush()
+        session.add_all(
+            Contact(
+                name=f"Name{i}",
+                surname="Surname",
+                email=f"name{i}@example.com",
+                phone="0981234567",
+                birthday=date(2000, 1, 1),
+                user_id=user.id,
+            )
+            for i in range(3)
+        )
+        await session.commit()
+
+    token = await create_access_token(data={"sub": "todelete"})
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.delete("api/users/me", headers=headers)
+    assert response.status_code == 204, response.text
+    response = client.get("api/users/me", headers=headers)
+    assert response.status_code == 401, response.text
+
+    async with TestingSessionLocal() as session:
+        purged = await PurgeService(session).purge(chunk_size=2, pause=0, retention=30)
+    assert purged == {
+        "contacts": 3,
+        "users": 1,
+        "tombstones": 0,
+        "idempotency": 0,
+    }
+
 # @patch("src.services.upload_file.UploadFileService.upload_file")
 # def test_update_avatar_user(mock_upload_file, client, get_token):
 #     # Мокаємо відповідь від сервісу завантаження файлів
@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.conf import messages
+from src.services.admission import (
+    AdaptiveLimiter,
+    AdmissionMiddleware,
+    Priority,
+    request_priority,
+)
+
+
+def test_request_priority():
+    assert request_priority("/api/auth/login") == Priority.CRITICAL
+    assert request_priority("/api/healthchecker") == Priority.CRITICAL
+    assert request_priority("/api/contacts/") == Priority.INTERACTIVE
+    assert request_priority("/api/batch/") == Priority.BULK
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run_window(limiter, clock, latency, requests=10, priority=Priority.INTERACTIVE):
+    for _ in range(requests):
+        assert limiter.try_acquire(priority)
+        limiter.release(latency, priority)
+    clock.now += 1
+    assert limiter.try_acquire(priority)
+    limiter.release(latency, priority)
+
+
+def test_limit_adapts_to_latency():
+    clock = Clock()
+    limiter = AdaptiveLimiter(10, 2, 12, tolerance=2, window=1, clock=clock)
+    for _ in range(5):
+        run_window(limiter, clock, 0.01)
+    assert limiter.limit == 12
+    assert limiter.baseline == pytest.approx(0.01)
+    for _ in range(5):
+        run_window(limiter, clock, 1)
+    assert limiter.limit == pytest.approx(12 * 0.9**5)
+
+
+def test_limit_cut_once_per_window():
+    clock = Clock()
+    limiter = AdaptiveLimiter(10, 2, 10, tolerance=2, window=1, clock=clock)
+    run_window(limiter, clock, 0.01)
+    run_window(limiter, clock, 1, requests=100)
+    assert limiter.limit == 9
+
+
+def test_critical_requests_do_not_cut_limit():
+    clock = Clock()
+    limiter = AdaptiveLimiter(10, 2, 10, tolerance=2, window=1, clock=clock)
+    run_window(limiter, clock, 0.01)
+    # A burst of logins, slow because of password hashing
+    for _ in range(20):
+        run_window(limiter, clock, 1, priority=Priority.CRITICAL)
+    assert limiter.limit == 10
+
+
+def test_lower_priorities_are_shed_first():
+    limiter = AdaptiveLimiter(10, 2, 10)
+    assert all(limiter.try_acquire(Priority.BULK) for _ in range(5))
+    assert not limiter.try_acquire(Priority.BULK)
+    assert all(limiter.try_acquire(Priority.INTERACTIVE) for _ in range(4))
+    assert not limiter.try_acquire(Priority.INTERACTIVE)
+    assert limiter.try_acquire(Priority.CRITICAL)
+    assert not limiter.try_acquire(Priority.CRITICAL)
+
+
+@pytest.mark.asyncio
+async def test_excess_requests_are_shed():
+    release = asyncio.Event()
+    app = FastAPI()
+
+    @app.get("/api/contacts/")
+    async def contacts():
+        await release.wait()
+        return []
+
+    @app.get("/api/healthchecker")
+    async def healthchecker():
+        return {}
+
+    app.add_middleware(
+        AdmissionMiddleware,
+        limiter=AdaptiveLimiter(2, 1, 2),
+        retry_after=3,
+    )
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as http:
+        pending = asyncio.ensure_future(http.get("/api/contacts/"))
+        await asyncio.sleep(0.05)
+        shed = await http.get("/api/contacts/")
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == "3"
+        assert shed.json()["detail"] == messages.SERVICE_OVERLOADED
+        assert (await http.get("/api/healthchecker")).status_code == 200
+        release.set()
+        assert (await pending).status_code == 200
@@ -0,0 +1,170 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from src.services.autocomplete import AutocompleteIndex, PrefixIndex, query_words
+from src.services.events import ContactEventBroker
+
+rows = [
+    (1, "Anna", "Kovalenko", "anna@example.com", "050 123 45 67"),
+    (2, "Andrii", "Shevchenko", "andrii@mail.org", "+380671112233"),
+    (3, "Olena", "Anders", "olena@example.com", "0931234567"),
+]
+
+
+class Loader:
+    def __init__(self, rows, delay=0.0):
+        self.rows = rows
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, session):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        assert session.open
+        return list(self.rows)
+
+
+class Session:
+    def __init__(self):
+        self.open = True
+
+
+@contextlib.asynccontextmanager
+async def session_factory():
+    session = Session()
+    try:
+        yield session
+    finally:
+        session.open = False
+
+
+def ids(suggestions):
+    return [suggestion["id"] for suggestion in suggestions]
+
+
+def test_query_words():
+    assert query_words("  Anna  Ko ") == ["anna", "ko"]
+    assert query_words("+38 (050) 12") == ["3805012"]
+
+
+def test_prefix_search():
+    index = PrefixIndex.build(rows)
+    assert ids(index.search("an", 10)) == [3, 2, 1]
+    assert index.search("ann", 10) == [{"id": 1, "display_name": "Anna Kovalenko"}]
+    assert ids(index.search("an sh", 10)) == [2]
+    assert ids(index.search("ANDRII@", 10)) == [2]
+    # Phone numbers match as entered and in E.164 form
+    assert ids(index.search("050123", 10)) == [1]
+    assert ids(index.search("+38050123", 10)) == [1]
+    assert ids(index.search("067", 10)) == []
+    assert ids(index.search("38067", 10)) == [2]
+    assert ids(index.search("an", 2)) == [3, 2]
+    assert index.search("", 10) == []
+
+
+def test_incremental_updates():
+    index = PrefixIndex.build(rows)
+    size = len(index)
+    index.add(4, "Anton", "Bondar", "anton@example.com", "0990000000")
+    assert ids(index.search("ant", 10)) == [4]
+    index.add(4, "Taras", "Bondar", "taras@example.com", "0990000000")
+    assert ids(index.search("ant", 10)) == []
+    assert ids(index.search("tar", 10)) == [4]
+    index.remove(4)
+    index.remove(4)
+    assert len(index) == size
+    assert ids(index.search("bond", 10)) == []
+
+
+@pytest.mark.asyncio
+async def test_built_once_and_kept_up_to_date():
+    autocomplete = AutocompleteIndex(
+        max_terms=1000, ttl=60, session_factory=session_factory
+    )
+    load = Loader(rows, delay=0.01)
+    results = await asyncio.gather(
+        *(autocomplete.search(7, "an", 10, load) for _ in range(5))
+    )
+    assert load.calls == 1
+    assert all(ids(result) == [3, 2, 1] for result in results)
+
+    contact = {
+        "name": "Anton",
+        "surname": "Bondar",
+        "email": "anton@example.com",
+        "phone": "0990000000",
+    }
+    autocomplete.apply(7, {"type": "created", "id": 4, "contact": contact})
+    autocomplete.apply(7, {"type": "deleted", "id": 1})
+    assert ids(await autocomplete.search(7, "an", 10, load)) == [3, 2, 4]
+    assert load.calls == 1
+    # Events of users without an index are ignored
+    autocomplete.apply(8, {"type": "deleted", "id": 1})
+    assert autocomplete.stats()["users"] == 1
+
+
+@pytest.mark.asyncio
+async def test_build_racing_a_write_is_not_kept():
+    autocomplete = AutocompleteIndex(
+        max_terms=1000, ttl=60, session_factory=session_factory
+    )
+    load = Loader(rows, delay=0.05)
+    search = asyncio.ensure_future(autocomplete.search(7, "an", 10, load))
+    await asyncio.sleep(0.01)
+    autocomplete.apply(7, {"type": "deleted", "id": 1})
+    await search
+    await autocomplete.search(7, "an", 10, load)
+    assert load.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_evicted_over_budget():
+    terms = len(PrefixIndex.build(rows))
+    autocomplete = AutocompleteIndex(
+        max_terms=2 * terms, ttl=60, session_factory=session_factory
+    )
+    load = Loader(rows)
+    for user_id in (1, 2, 1, 3):
+        await autocomplete.search(user_id, "an", 10, load)
+    assert autocomplete.stats()["evictions"] == 1
+    await autocomplete.search(1, "an", 10, load)
+    assert load.calls == 3
+    await autocomplete.search(2, "an", 10, load)
+    assert load.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_broker_events_reach_the_index():
+    broker = ContactEventBroker()
+    autocomplete = AutocompleteIndex(
+        max_terms=1000, ttl=60, session_factory=session_factory, broker=broker
+    )
+    load = Loader(rows)
+    await autocomplete.search(7, "an", 10, load)
+    assert broker._watched == {7}
+
+    # Published by this worker, or received from Redis
+    await broker.publish(7, {"type": "deleted", "id": 2})
+    broker.dispatch(7, {"type": "deleted", "id": 3})
+    assert ids(await autocomplete.search(7, "an", 10, load)) == [1]
+    assert load.calls == 1
+
+    autocomplete.clear()
+    await autocomplete.search(8, "an", 10, load)
+    assert broker._watched == {8}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_break_shared_build():
+    autocomplete = AutocompleteIndex(
+        max_terms=1000, ttl=60, session_factory=session_factory
+    )
+    load = Loader(rows, delay=0.05)
+    first = asyncio.ensure_future(autocomplete.search(7, "an", 10, load))
+    second = asyncio.ensure_future(autocomplete.search(7, "an", 10, load))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert ids(await second) == [3, 2, 1]
+    assert load.calls == 1
@@ -0,0 +1,148 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from src.services.cache import ContactCache, InMemoryCacheBackend, LocalOnlyCacheBackend
+
+
+def make_contact(contact_id, name="Cached"):
+    return {
+        "id": contact_id,
+        "name": name,
+        "surname": "Contact",
+        "email": "cached@example.com",
+        "phone": "0501234567",
+        "birthday": date(2000, 1, 1),
+        "additional_data": None,
+        "created_at": None,
+        "updated_at": None,
+    }
+
+
+class Loader:
+    def __init__(self, name="Cached", delay=0.0):
+        self.name = name
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return make_contact(1, self.name)
+
+
+@pytest.mark.asyncio
+async def test_tiers_and_stats():
+    backend = InMemoryCacheBackend()
+    first = ContactCache(backend, max_size=10, local_ttl=60, ttl=60)
+    second = ContactCache(backend, max_size=10, local_ttl=60, ttl=60)
+    load = Loader()
+
+    assert (await first.get(1, 1, load)).name == "Cached"
+    assert (await first.get(1, 1, load)).name == "Cached"
+    assert (await second.get(1, 1, load)).name == "Cached"
+    assert load.calls == 1
+    assert first.stats()["local_hits"] == 1
+    assert first.stats()["hit_ratio"] == 0.5
+    assert second.stats()["remote_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidation_reaches_other_workers():
+    backend = InMemoryCacheBackend()
+    first = ContactCache(backend, max_size=10, local_ttl=60, ttl=60)
+    second = ContactCache(backend, max_size=10, local_ttl=60, ttl=60)
+    await first.get(1, 1, Loader())
+    await second.get(1, 1, Loader())
+
+    await first.invalidate(1, 1)
+    updated = Loader("Updated")
+    assert (await second.get(1, 1, updated)).name == "Updated"
+    assert updated.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once():
+    cache = ContactCache(InMemoryCacheBackend(), max_size=10, local_ttl=60, ttl=60)
+    load = Loader(delay=0.05)
+    contacts = await asyncio.gather(*[cache.get(1, 1, load) for _ in range(5)])
+    assert load.calls == 1
+    assert {contact.name for contact in contacts} == {"Cached"}
+
+
+@pytest.mark.asyncio
+async def test_missing_contact_and_lru_bound():
+    cache = ContactCache(InMemoryCacheBackend(), max_size=2, local_ttl=60, ttl=60)
+
+    async def missing():
+        return None
+
+    assert await cache.get(1, 404, missing) is None
+    for contact_id in (1, 2, 3):
+        await cache.get(1, contact_id, Loader())
+    assert cache.stats()["local_size"] == 2
+
+
+@pytest.mark.asyncio
+async def test_local_only_backend_keeps_nothing_shared():
+    cache = ContactCache(LocalOnlyCacheBackend(), max_size=10, local_ttl=60, ttl=60)
+    other = ContactCache(LocalOnlyCacheBackend(), max_size=10, local_ttl=60, ttl=60)
+    load = Loader()
+    await cache.get(1, 1, load)
+    await other.get(1, 1, load)
+    assert load.calls == 2
+
+    await cache.invalidate(1, 1)
+    updated = Loader("Updated")
+    assert (await cache.get(1, 1, updated)).name == "Updated"
+    assert cache.stats()["remote_hits"] == 0
+
+
+class SlowPubSubBackend(InMemoryCacheBackend):
+    """Invalidations haven't reached the other workers yet."""
+
+    async def publish(self, message: str) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_stale_load_is_not_written_back():
+    backend = SlowPubSubBackend()
+    writer = ContactCache(backend, max_size=10, local_ttl=60, ttl=60)
+    reader = ContactCache(backend, max_size=10, local_ttl=60, ttl=60)
+    # The reader loads the Contact from before the write on the other worker
+    pending = asyncio.ensure_future(reader.get(1, 1, Loader(delay=0.05)))
+    await asyncio.sleep(0.01)
+    await writer.invalidate(1, 1)
+    assert (await pending).name == "Cached"
+
+    other = ContactCache(backend, max_size=10, local_ttl=60, ttl=60)
+    assert (await other.get(1, 1, Loader("Updated"))).name == "Updated"
+    assert other.stats()["remote_hits"] == 0
+
+
+def test_attach_replaces_subscription():
+    first, second = InMemoryCacheBackend(), InMemoryCacheBackend()
+    cache = ContactCache(first, max_size=10, local_ttl=60, ttl=60)
+    cache.attach(second)
+    assert first._subscribers == []
+    assert second._subscribers == [cache._on_invalidate]
+
+
+def test_get_contact_after_update(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    contact = make_contact(None)
+    del contact["id"], contact["created_at"], contact["updated_at"]
+    contact["birthday"] = str(contact["birthday"])
+    contact["additional_data"] = ""
+    contact_id = client.post("/api/contacts", json=contact, headers=headers).json()["id"]
+    assert client.get(f"/api/contacts/{contact_id}", headers=headers).json()["name"] == "Cached"
+    response = client.put(
+        f"/api/contacts/{contact_id}", json=dict(contact, name="Renamed"), headers=headers
+    )
+    assert response.status_code == 200, response.text
+    response = client.get(f"/api/contacts/{contact_id}", params={"fields": "name"}, headers=headers)
+    assert response.json() == {"id": contact_id, "name": "Renamed"}
+    client.delete(f"/api/contacts/{contact_id}", headers=headers)
+    assert client.get(f"/api/contacts/{contact_id}", headers=headers).status_code == 404
@@ -0,0 +1,150 @@
+import asyncio
+import zlib
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from src.services.compression import (
+    CompressionGovernor,
+    CompressionMiddleware,
+    negotiate,
+)
+
+
+class FixedGovernor(CompressionGovernor):
+    def __init__(self, effort: int):
+        super().__init__(high=0.7, critical=0.9)
+        self.fixed = effort
+
+    def effort(self) -> int:
+        return self.fixed
+
+
+def make_app(effort: int = CompressionGovernor.NORMAL) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/small")
+    async def small():
+        return {"name": "Alice"}
+
+    @app.get("/large")
+    async def large():
+        return [{"name": f"Contact{i}", "surname": "Surname"} for i in range(200)]
+
+    @app.get("/localized")
+    async def localized():
+        return JSONResponse({"name": "Alice"}, headers={"Vary": "Accept-Language"})
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"data: {'x' * 500} {i}\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    app.add_middleware(
+        CompressionMiddleware, min_size=1024, governor=FixedGovernor(effort)
+    )
+    return app
+
+
+def test_negotiate():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("deflate") is None
+    assert negotiate("gzip;q=0, *") != "gzip"
+    assert negotiate("*") is not None
+    assert negotiate("identity") is None
+
+
+def test_governor_backs_off_under_load():
+    governor = CompressionGovernor(high=0.5, critical=0.8, interval=3600)
+    assert governor.effort() == CompressionGovernor.NORMAL
+    governor.load = 0.6
+    assert governor.effort() == CompressionGovernor.FAST
+    governor.load = 0.95
+    assert governor.effort() == CompressionGovernor.OFF
+
+
+@pytest.mark.asyncio
+async def test_large_responses_are_compressed():
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < 1024
+        assert len(response.json()) == 200
+
+        response = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.json() == {"name": "Alice"}
+
+        response = await client.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+
+
+@pytest.mark.asyncio
+async def test_vary_is_merged():
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/localized", headers={"Accept-Encoding": "gzip"})
+    assert response.headers.get_list("vary") == ["Accept-Language, Accept-Encoding"]
+
+
+@pytest.mark.asyncio
+async def test_streaming_responses_are_compressed_per_chunk():
+    # Driven directly, as the test transports buffer the whole body
+    app = make_app()
+    messages = []
+
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/stream",
+        "raw_path": b"/stream",
+        "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")],
+        "scheme": "http",
+        "server": ("test", 80),
+        "root_path": "",
+    }
+    await app(scope, receive, send)
+
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    decompressor = zlib.decompressobj(31)
+    events = [
+        decompressor.decompress(message["body"])
+        for message in messages[1:]
+        if message["body"]
+    ]
+    # Every chunk decodes on its own thanks to the sync flush
+    assert [event for event in events if event][:3] == [
+        f"data: {'x' * 500} {i}\n\n".encode() for i in range(3)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_compression_is_skipped_under_critical_load():
+    transport = httpx.ASGITransport(app=make_app(CompressionGovernor.OFF))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert len(response.json()) == 200
@@ -0,0 +1,61 @@
+from datetime import date
+
+from src.services.duplicates import (
+    Candidate,
+    blocking_keys,
+    email_local_part,
+    find_duplicates,
+    similarity,
+    soundex,
+)
+
+
+def candidate(id, name, surname, email=None, phone=None, birthday=None):
+    return Candidate(id, name, surname, email, phone, birthday)
+
+
+def test_soundex():
+    assert soundex("Robert") == soundex("Rupert") == "R163"
+    assert soundex("Ashcraft") == "A261"
+    assert soundex("Tymczak") == "T522"
+    assert soundex("Шевченко") == soundex("Shevchenko")
+    assert soundex("123") == ""
+
+
+def test_blocking_keys():
+    assert email_local_part("john.smith+work@example.com") == "johnsmith"
+    assert blocking_keys(
+        candidate(1, "John", "Smith", "j.smith@example.com", "+380501234567")
+    ) == [
+        ("phone", "+380501234567"),
+        ("email", "jsmith"),
+        ("surname", "S530j"),
+    ]
+
+
+def test_similarity():
+    john = candidate(1, "John", "Smith", "john@example.com", "+380501234567")
+    jon = candidate(2, "Jon", "Smith", "john@mail.org", "+380501234567")
+    anna = candidate(3, "Anna", "Smith", "anna@example.com", "+380501234567")
+    assert similarity(john, jon) >= 0.6
+    # A shared family phone alone doesn't make a duplicate
+    assert similarity(john, anna) < 0.6
+    # The same name and birthday are enough
+    born = candidate(4, "John", "Smith", birthday=date(1990, 1, 1))
+    assert similarity(born, born._replace(id=5)) >= 0.6
+    assert similarity(born, born._replace(birthday=None), min_score=0.6) == 0
+
+
+def test_find_duplicates():
+    birthday = date(1990, 1, 1)
+    candidates = [
+        candidate(1, "John", "Smith", "john@example.com", "+380501234567", birthday),
+        candidate(2, "Jon", "Smith", "john.smith@mail.org", "+380501234567"),
+        candidate(3, "John", "Smyth", "john@example.com", None, birthday),
+        candidate(4, "Anna", "Smith", "anna@example.com", "+380501234567"),
+        candidate(5, "Petro", "Ivanenko", "petro@example.com", "+380671112233"),
+    ]
+    groups = find_duplicates(candidates, min_score=0.6, max_block_size=10)
+    assert [ids for ids, _ in groups] == [[1, 2, 3]]
+    # Oversized blocks are not compared
+    assert find_duplicates(candidates, min_score=0.6, max_block_size=1) == []
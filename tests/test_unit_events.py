@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+import pytest
+
+from src.services.events import ContactEventBroker
+
+
+@pytest.mark.asyncio
+async def test_stream_receives_published_events():
+    broker = ContactEventBroker(queue_size=10)
+    stream = broker.stream(1, heartbeat=10)
+    assert (await anext(stream)).startswith("retry:")
+
+    pending = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0)
+    await broker.publish(1, {"type": "created", "id": 5})
+    await broker.publish(2, {"type": "created", "id": 6})
+    message = await pending
+    assert message.startswith("event: created\n")
+    assert json.loads(message.split("data: ", 1)[1]) == {"type": "created", "id": 5}
+
+    await stream.aclose()
+    assert broker._subscribers == {}
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_heartbeats():
+    broker = ContactEventBroker()
+    stream = broker.stream(1, heartbeat=0.01)
+    await anext(stream)
+    assert await anext(stream) == ": ping\n\n"
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_dropped():
+    broker = ContactEventBroker(queue_size=2)
+    stream = broker.stream(1, heartbeat=10)
+    await anext(stream)
+    pending = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0)
+    for contact_id in range(4):
+        await broker.publish(1, {"type": "updated", "id": contact_id})
+
+    assert broker._subscribers == {}
+    assert (await pending).startswith("event: dropped\n")
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
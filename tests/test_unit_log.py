@@ -0,0 +1,83 @@
+import io
+import json
+import logging
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.services import log
+from src.services.log import AccessLogMiddleware, setup_logging
+
+
+@pytest.fixture()
+def output():
+    stream = io.StringIO()
+    listener = setup_logging("INFO", stream)
+
+    def lines():
+        listener.stop()
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        return [r for r in records if r["logger"] in ("test", "src.access")]
+
+    yield lines
+    logging.getLogger().handlers = [
+        handler
+        for handler in logging.getLogger().handlers
+        if not isinstance(handler, logging.handlers.QueueHandler)
+    ]
+
+
+def make_app(sample_rate: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    async def read_item(item_id: int):
+        log.bind(user_id=7)
+        logging.getLogger("test").warning("looking up", extra={"item": item_id})
+        return {}
+
+    @app.get("/api/broken")
+    async def broken():
+        raise RuntimeError("boom")
+
+    app.add_middleware(AccessLogMiddleware, sample_rate=sample_rate, slow_seconds=10)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_records_carry_request_context(output):
+    transport = httpx.ASGITransport(app=make_app(sample_rate=1))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/items/3", headers={"X-Request-ID": "abc"})
+    assert response.headers["x-request-id"] == "abc"
+
+    event, access = output()
+    assert event["message"] == "looking up"
+    assert event["level"] == "WARNING"
+    assert event["item"] == 3
+    assert event["request_id"] == "abc"
+    assert event["user_id"] == 7
+    assert event["route"] == "/api/items/{item_id}"
+    assert access["logger"] == "src.access"
+    assert access["status"] == 200
+    assert access["route"] == "/api/items/{item_id}"
+    assert access["user_id"] == 7
+
+
+@pytest.mark.asyncio
+async def test_access_log_is_sampled_but_errors_are_kept(output):
+    transport = httpx.ASGITransport(
+        app=make_app(sample_rate=0), raise_app_exceptions=False
+    )
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/items/3")
+        await client.get("/api/broken")
+    assert len(response.headers["x-request-id"]) == 32
+
+    records = output()
+    assert [record["message"] for record in records] == [
+        "looking up",
+        "GET /api/broken 500",
+    ]
+    assert records[0]["request_id"] == response.headers["x-request-id"]
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.conf.config import settings
+from src.services.profiling import ProfileStore, ProfilingMiddleware
+
+
+def make_app(store, sample_rate=0.0):
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        deadline = time.monotonic() + 0.05
+        while time.monotonic() < deadline:
+            pass
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    app.add_middleware(
+        ProfilingMiddleware, store=store, sample_rate=sample_rate, interval=0.001
+    )
+    return app
+
+
+def test_profile_requested_by_admin(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    store = ProfileStore(str(tmp_path), max_files=10)
+    client = TestClient(make_app(store))
+
+    assert "x-profile-id" not in client.get("/slow").headers
+    assert "x-profile-id" not in client.get("/slow", headers={"X-Profile": "no"}).headers
+    assert store.list() == []
+
+    response = client.get("/slow", headers={"X-Profile": "secret"})
+    profile_id = response.headers["x-profile-id"]
+    assert [p["id"] for p in store.list()] == [profile_id]
+    lines = store.load(profile_id).splitlines()
+    assert lines
+    assert any(line.startswith("route;") and ":slow" in line for line in lines)
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+
+
+def test_profile_store_is_bounded(tmp_path):
+    store = ProfileStore(str(tmp_path), max_files=2)
+    client = TestClient(make_app(store, sample_rate=1.0))
+    ids = [client.get("/slow").headers["x-profile-id"] for _ in range(3)]
+    assert [p["id"] for p in store.list()] == ids[:0:-1]
+    assert store.load(ids[0]) is None
+    assert store.load("../../etc/passwd") is None
+
+
+def test_profiles_endpoint_requires_admin(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    assert client.get("/api/profiles/").status_code == 403
+    response = client.get("/api/profiles/", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200, response.text
+    response = client.get("/api/profiles/1-missing", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 404
+
+
+def test_admin_token_falls_back_to_profile_setting(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+    monkeypatch.setattr(settings, "PROFILE_ADMIN_TOKEN", "legacy")
+    response = client.get("/api/cache/stats", headers={"X-Admin-Token": "legacy"})
+    assert response.status_code == 200, response.text
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    response = client.get("/api/cache/stats", headers={"X-Admin-Token": "legacy"})
+    assert response.status_code == 403
@@ -0,0 +1,133 @@
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import APIRouter, FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.services import tracing
+from src.services.tracing import (
+    FileSpanExporter,
+    OtlpSpanExporter,
+    TracedRoute,
+    Tracer,
+    TracingMiddleware,
+    instrument_engine,
+    parse_traceparent,
+    traced,
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@traced
+class ItemService:
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def get_item(self, item_id: int):
+        async with self.engine.connect() as conn:
+            return (await conn.execute(text("SELECT :id"), {"id": item_id})).scalar()
+
+
+@pytest_asyncio.fixture()
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument_engine(engine)
+    yield engine
+    await engine.dispose()
+
+
+def make_app(engine, tracer: Tracer) -> FastAPI:
+    router = APIRouter(prefix="/api", route_class=TracedRoute)
+
+    @router.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": await ItemService(engine).get_item(item_id)}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+    return app
+
+
+def make_tracer(tmp_path, monkeypatch, sample_rate: float) -> Tracer:
+    tracer = Tracer(
+        FileSpanExporter(tmp_path / "spans.jsonl"), sample_rate, flush_interval=3600
+    )
+    monkeypatch.setattr(tracing, "tracer", tracer)
+    return tracer
+
+
+def read_spans(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    if not path.exists():
+        return {}
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    return {span["name"]: span for span in spans}
+
+
+def test_parse_traceparent():
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (
+        TRACE_ID,
+        PARENT_ID,
+        True,
+    )
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00")[2] is False
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}") is None
+    assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+    assert parse_traceparent(f"00-{TRACE_ID}-xyz0000000000000-01") is None
+
+
+@pytest.mark.asyncio
+async def test_spans_continue_incoming_trace(engine, tmp_path, monkeypatch):
+    tracer = make_tracer(tmp_path, monkeypatch, sample_rate=0)
+    transport = httpx.ASGITransport(app=make_app(engine, tracer))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(
+            "/api/items/5", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+        )
+    assert response.json() == {"id": 5}
+    tracer.flush()
+
+    spans = read_spans(tmp_path)
+    root = spans["GET /api/items/{item_id}"]
+    handler = spans["handler read_item"]
+    service = spans["ItemService.get_item"]
+    sql = spans["sql"]
+    assert {span["trace_id"] for span in spans.values()} == {TRACE_ID}
+    assert root["parent_id"] == PARENT_ID
+    assert root["attributes"]["http.status_code"] == 200
+    assert handler["parent_id"] == root["span_id"]
+    assert service["parent_id"] == handler["span_id"]
+    assert sql["parent_id"] == service["span_id"]
+    assert sql["attributes"]["db.statement"] == "SELECT ?"
+    assert root["start"] <= sql["start"] <= sql["end"] <= root["end"]
+
+
+@pytest.mark.asyncio
+async def test_unsampled_traces_are_not_recorded(engine, tmp_path, monkeypatch):
+    tracer = make_tracer(tmp_path, monkeypatch, sample_rate=0)
+    transport = httpx.ASGITransport(app=make_app(engine, tracer))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.get("/api/items/5")
+        await client.get(
+            "/api/items/5", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00"}
+        )
+    tracer.flush()
+    assert read_spans(tmp_path) == {}
+
+
+def test_otlp_encoding():
+    span = tracing.Span("sql", TRACE_ID, PARENT_ID, True, {"rows": 3})
+    span.end = span.start + 1000
+    encoded = OtlpSpanExporter("http://collector:4318", "contacts").encode([span])
+    resource = encoded["resourceSpans"][0]
+    assert resource["resource"]["attributes"][0]["value"] == {"stringValue": "contacts"}
+    otlp_span = resource["scopeSpans"][0]["spans"][0]
+    assert otlp_span["traceId"] == TRACE_ID
+    assert otlp_span["parentSpanId"] == PARENT_ID
+    assert otlp_span["attributes"] == [{"key": "rows", "value": {"intValue": "3"}}]